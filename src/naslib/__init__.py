@@ -65,6 +65,11 @@ class NasDrivers(object):
 
     __metaclass__ = NasDriversMeta
 
+    # the probe always exits 0, otherwise the status of the last "test" would
+    # turn the stdout into stderr (see SSHClient.run)
+    discovery_cmd = 'for path in %s; do /usr/bin/test -f "$path" && ' \
+                    'echo "$path"; done; true'
+
     @classmethod
     def get_drivers(cls):
         """ Returns the cls._drivers dict that is dynamically set by the
@@ -73,18 +78,40 @@ class NasDrivers(object):
         return cls._drivers  # pylint: disable=I0011,E1101
 
     @classmethod
-    def get_driver(cls, ssh):
-        """ Uses the verify_discovery method of each driver to see which
-        type of NAS server it is connecting to.
+    def get_driver(cls, ssh, discovery_cache=None):
+        """ Checks the discovery_path of all drivers through a single remote
+        command to see which type of NAS server it is connecting to. Only the
+        driver found is instantiated. If a DiscoveryCache is given, the driver
+        previously discovered for the same server is taken from it.
         """
-        drivs = cls.get_drivers()
-        for driver_dict in drivs.values():
-            driver = driver_dict['driver'](ssh)
-            if driver.verify_discovery():
-                return driver
-
-        raise UnableToDiscoverDriver(
+        cached = discovery_cache.get(ssh) if discovery_cache else None
+        drivers_dict = cls.get_drivers().get((cached or {}).get('driver'))
+        if drivers_dict is not None:
+            driver_class = drivers_dict['driver']
+        else:
+            driver_class = cls.discover_driver_class(ssh)
+        if driver_class is None:
+            raise UnableToDiscoverDriver(
                 'Unable to discover a driver for the current NAS server')
+        if discovery_cache is None:
+            return driver_class(ssh)
+        if drivers_dict is None:
+            discovery_cache.update(ssh, driver=driver_class.__name__)
+        return driver_class(ssh, discovery_cache=discovery_cache)
+
+    @classmethod
+    def discover_driver_class(cls, ssh):
+        """ Returns the driver class whose discovery_path exists in the NAS
+        server or None if none of them is found.
+        """
+        classes = [d['driver'] for d in cls.get_drivers().values()
+                   if getattr(d['driver'], 'discovery_path', None)]
+        if not classes:
+            return None
+        paths = ' '.join(["'%s'" % c.discovery_path for c in classes])
+        out = ssh.run(cls.discovery_cmd % paths)[1]
+        found = set([i.strip() for i in out.splitlines() if i.strip()])
+        return next((c for c in classes if c.discovery_path in found), None)
 
     @classmethod
     def get_mock(cls, name):
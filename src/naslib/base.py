@@ -15,6 +15,7 @@ from abc import ABCMeta, abstractmethod
 from .baseresources import FileSystemResourceBase, ShareResourceBase, \
     DiskResourceBase, PoolResourceBase, CacheResourceBase, ResourceBase, \
     SnapshotResourceBase, NasServerResourceBase
+from .listcache import ResourceListCache
 from .log import NasLogger
 from .nasexceptions import NasImplementationError
 
@@ -109,6 +110,8 @@ class NasBase(object):
                     ResourceClass(self))
         self.output_history = []
         self.ssh = ssh
+        # opt-in cache of the list() results, enabled by setting its ttl
+        self.list_cache = ResourceListCache()
         #self._set_ssh(host, username, password, port)
 
     def __str__(self):
@@ -133,6 +136,22 @@ class NasBase(object):
     def warn(self, msg):
         self.logger.trace.warn("%s: %s" % (self.__class__.__name__, msg))
 
+    def map(self, func, args_list):
+        """ Calls func(*args) for each item of "args_list". Returns a list
+        with either the result or the exception of each call, in the same
+        order. The drivers that can run them concurrently override it.
+
+        >>> NasBase.map.im_func(None, lambda x: 10 / x, [(2,), (0,)])
+        [5, ZeroDivisionError('integer division or modulo by zero',)]
+        """
+        results = []
+        for args in args_list:
+            try:
+                results.append(func(*args))
+            except Exception as err:  # pylint: disable=I0011,W0703
+                results.append(err)
+        return results
+
     @abstractmethod
     def execute(self, cmd, timeout=None):
         """ Basic method to properly execute NFS commands.
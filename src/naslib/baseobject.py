@@ -231,6 +231,7 @@ class NasObject(ExclusiveExceptions):
     __metaclass__ = NasObjectMeta
 
     identifier_keys = ('name',)
+    index_keys = ()
 
     def __init__(self, resource, name):
         """ This constructor requires the resource parent as the first
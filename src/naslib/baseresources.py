@@ -25,9 +25,11 @@ the resourceitems module.
 
 from abc import ABCMeta, abstractmethod
 
-from .nasexceptions import NasImplementationError, \
+from .displayparser import DisplayLineParser
+from .nasexceptions import NasImplementationError, NasException, \
     NasUnexpectedOutputException, NasIncompleteParsedInformation
 from .objects import Share, FileSystem, Disk, Pool, Cache, Snapshot, NasServer
+from .resourcelist import IndexedResourceList, ShareResourceList
 
 
 class ResourceBase(object):
@@ -36,6 +38,7 @@ class ResourceBase(object):
     __metaclass__ = ABCMeta
     _base_attr_name = None
     nas_object_class = None
+    resource_list_class = IndexedResourceList
     display_regex = None
 
     def __init__(self, nas):
@@ -85,23 +88,23 @@ class ResourceBase(object):
         """
         return self._nas
 
-    def parse_displayed_line(self, line):
+    def _display_parser(self):
+        """ Returns a new DisplayLineParser of the defined cls.display_regex,
+        to parse the lines of a single output.
+        """
+        return DisplayLineParser(self.display_regex)
+
+    def parse_displayed_line(self, line, parser=None):
         """ Uses the defined cls.display_regex to parse a line from a generic
-        output.
-        """
-        if isinstance(self.display_regex, list):
-            match = None
-            for regex in self.display_regex:
-                match = regex.match(line)
-                if match:
-                    break
-        else:
-            match = self.display_regex.match(line)
-        if not match:
+        output. The "parser" of the whole output can be given, so its display
+        format is detected only once.
+        """
+        data = (parser or self._display_parser()).parse(line)
+        if data is None:
             raise NasUnexpectedOutputException('It\'s not possible to parse '
                 'the output received from %s, as it may be corrupted. Line '
                 'output: "%s".' % (str(self.nas), line))
-        return match.groupdict()
+        return data
 
     def _build_nas_object_list(self, lines):
         r""" Helper to build a list of ResourceItems objects based on the
@@ -143,10 +146,11 @@ class ResourceBase(object):
         True
         """
         obj_list = []
+        parser = self._display_parser()
         for line in [i.strip() for i in lines if i]:
-            data = self.parse_displayed_line(line)
+            data = self.parse_displayed_line(line, parser)
             obj_list.append(self._build_nas_object(**data))
-        return obj_list
+        return self._indexed(obj_list)
 
     def _build_nas_object(self, **kwargs):
         """ Helper to properly instantiate a generic ResourceItem defined on
@@ -155,6 +159,14 @@ class ResourceBase(object):
         klass = self.nas_object_class  # pylint:disable=I0011,E1102
         return klass(self, **kwargs)  # pylint:disable=I0011, E1102
 
+    def _indexed(self, objects):
+        """ Helper to build the IndexedResourceList returned by list() given
+        the NasObjects, indexed by the keys of the nas_object_class attribute.
+        """
+        klass = self.nas_object_class
+        return self.resource_list_class(objects, klass.identifier_keys,
+                                        klass.index_keys)
+
     def _build_identifier_dict(self, *args, **kwargs):
         identifier_keys = self.nas_object_class.identifier_keys
         given = (len(args) + len(kwargs))
@@ -191,24 +203,54 @@ class ResourceBase(object):
         @return: None
         """
 
+    def _each(self, method, args_list):
+        """ Calls the method for each one of the tuples of arguments of
+        "args_list" through the map() of the NAS driver. Returns a list with
+        either the result or the NasException of each call, in the same
+        order. Any other exception is raised.
+        """
+        results = self.nas.map(method, [tuple(a) for a in args_list])
+        for result in results:
+            if isinstance(result, Exception) and \
+                    not isinstance(result, NasException):
+                raise result
+        return results
+
+    def _lookup(self, identifier):
+        """ Hook for resources that can query the NAS server for a single item
+        given the identifier dict, instead of listing all of them. Returns the
+        list of items retrieved by the query, or None in case the resource
+        doesn't support it, so get() falls back to list() and scans the items.
+        """
+        return None
+
     def get(self, *args, **kwargs):
         """ Gets a generic resource item from NAS server given an identifier
         as arguments.
         """
         identifier = self._build_identifier_dict(*args, **kwargs)
-        try:
-            objects = self.list()
-        except NasIncompleteParsedInformation as err:
-            objects = err.parsed_data
-        try:
-            item = [s for s in objects if all([getattr(s, i) == v for
-                                               i, v in identifier.items()])][0]
-        except IndexError:
+        objects = self._lookup(identifier)
+        if objects is None:
+            try:
+                objects = self.list()
+            except NasIncompleteParsedInformation as err:
+                objects = err.parsed_data
+        if not isinstance(objects, IndexedResourceList):
+            objects = self._indexed(objects)
+        item = objects.find(**identifier)
+        if item is None:
             ident = ', '.join(identifier.values())
             name = self._base_attr_name  # pylint: disable=I0011,E1101
             msg = 'The "%s" %s does not exist in %s.' % (ident, name,
                                                          self.nas.name)
             raise self.nas_object_class.DoesNotExist(msg)
+        self._check_incomplete(item)
+        return item
+
+    def _check_incomplete(self, item):
+        """ Raises NasIncompleteParsedInformation if any of the non lazy
+        attributes of the given item is None.
+        """
         missing = [a for a in item.non_lazy_attributes
                    if getattr(item, a) is None]
         if missing:
@@ -217,7 +259,56 @@ class ResourceBase(object):
             raise NasIncompleteParsedInformation(msg % (self.nas.name,
                                                         '\n'.join(missing)),
                                                  item)
-        return item
+
+    def _get_many(self, identifiers):
+        """ Lists the resource items only once to find all the given
+        identifiers. Each identifier is either a tuple of the identifier
+        values or a single value for resources identified only by name.
+        Returns a dict of the found items by identifier and a list of the
+        identifiers that don't exist.
+        """
+        if not identifiers:
+            return {}, []
+        try:
+            objects = self.list()
+        except NasIncompleteParsedInformation as err:
+            objects = err.parsed_data
+        if not isinstance(objects, IndexedResourceList):
+            objects = self._indexed(objects)
+        found = {}
+        not_found = []
+        for identifier in identifiers:
+            args = identifier if isinstance(identifier, tuple) \
+                   else (identifier,)
+            item = objects.find(**self._build_identifier_dict(*args))
+            if item is None:
+                not_found.append(identifier)
+                continue
+            self._check_incomplete(item)
+            found[identifier] = item
+        return found, not_found
+
+    def get_many(self, identifiers):
+        """ Gets many resource items from NAS server listing them only once.
+        Returns a dict of the items by the given identifiers. Raises
+        DoesNotExist if any of the identifiers doesn't exist.
+        """
+        found, not_found = self._get_many(identifiers)
+        if not_found:
+            ident = '; '.join([', '.join(i) if isinstance(i, tuple) else i
+                               for i in not_found])
+            name = self._base_attr_name  # pylint: disable=I0011,E1101
+            msg = 'The "%s" %s does not exist in %s.' % (ident, name,
+                                                         self.nas.name)
+            raise self.nas_object_class.DoesNotExist(msg)
+        return found
+
+    def exists_many(self, identifiers):
+        """ Checks whether many resource items exist on NAS server listing
+        them only once. Returns a dict of booleans by the given identifiers.
+        """
+        found = self._get_many(identifiers)[0]
+        return dict([(i, i in found) for i in identifiers])
 
     def exists(self, *args, **kwargs):
         """ Checks whether a generic resource item on SFS server exists or not
@@ -317,6 +408,21 @@ class FileSystemResourceBase(NasResourceStorageBase):
         file system.
         """
 
+    def create_many(self, filesystems):
+        """ Creates a file system for each one of the tuples of create()
+        arguments of "filesystems". Returns a list with either the FileSystem
+        created or the exception of the failure of each one, in the same
+        order.
+        """
+        return self._each(self.create, filesystems)
+
+    def delete_many(self, names):
+        """ Deletes the file systems of the given names. Returns a list with
+        either None or the exception of the failure of each one, in the same
+        order.
+        """
+        return self._each(self.delete, [(n,) for n in names])
+
 
 class ShareResourceBase(ResourceBase):
     """ This is the base class for a Share resource of a NFS server.
@@ -324,6 +430,7 @@ class ShareResourceBase(ResourceBase):
     __metaclass__ = ABCMeta
     _base_attr_name = "share"
     nas_object_class = Share
+    resource_list_class = ShareResourceList
 
     @abstractmethod
     def create(self, name, client, options):
@@ -335,6 +442,34 @@ class ShareResourceBase(ResourceBase):
         """ Abstract method to delete shares.
         """
 
+    def create_many(self, name, clients):
+        """ Creates the shares of the given path for each one of the tuples
+        (client, options) of "clients". Returns a list with either the Share
+        created or the exception of the failure of each client, in the same
+        order. The drivers override it to do it in less round trips.
+        """
+        results = []
+        for client, options in clients:
+            try:
+                results.append(self.create(name, client, options))
+            except NasException as err:
+                results.append(err)
+        return results
+
+    def delete_many(self, name, clients):
+        """ Deletes the shares of the given path for each one of the
+        "clients". Returns a list with either None for the deleted share or
+        the exception of the failure of each client, in the same order.
+        """
+        results = []
+        for client in clients:
+            try:
+                self.delete(name, client)
+                results.append(None)
+            except NasException as err:
+                results.append(err)
+        return results
+
 
 class CacheResourceBase(NasResourceStorageBase):
     """ This is the base class for a Cache resource of a NFS server.
@@ -381,6 +516,20 @@ class SnapshotResourceBase(ResourceBase):
         """ Abstract method to restore snapshots.
         """
 
+    def create_many(self, snapshots):
+        """ Creates a snapshot for each one of the tuples (name, filesystem,
+        cache) of "snapshots". Returns a list with either the Snapshot created
+        or the exception of the failure of each one, in the same order.
+        """
+        return self._each(self.create, snapshots)
+
+    def delete_many(self, snapshots):
+        """ Deletes the snapshots of the tuples (name, filesystem) of
+        "snapshots". Returns a list with either None or the exception of the
+        failure of each one, in the same order.
+        """
+        return self._each(self.delete, snapshots)
+
 
 class NasServerResourceBase(ResourceBase):
     """ This is the base class for a UnityXT NAS Server.
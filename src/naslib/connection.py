@@ -18,9 +18,10 @@ import socket
 
 from . import NasDrivers
 from .unityxt.main import UnityXT
+from .unityxt.session import UnitySessionPool
 from .log import NasLogger
 from .nasexceptions import NasConnectionException
-from .ssh import SSHClient
+from .ssh import SSHClient, SSHConnectionPool
 
 
 class NasConnection(object):
@@ -32,26 +33,39 @@ class NasConnection(object):
     logger = NasLogger.instance()
 
     def __init__(self, host, username, password=None, port=22,
-            nas_type='veritas'):
+            nas_type='veritas', use_pool=True, discovery_cache=None,
+            list_cache_ttl=None):
         """ The driver_name argument is required, e.g.: NasDrivers.sfs. The
         remaining ones are arguments for the SSH connection.
             host - A string containing the ssh host
             username - A string containing the ssh username
             password - A string containing the ssh password
             port - An integer indicating the ssh port
+            use_pool - Re-use the SSH connections through the process-wide
+                       SSHConnectionPool, or the Unity REST sessions through
+                       the process-wide UnitySessionPool
+            discovery_cache - A DiscoveryCache instance to persist the
+                              driver discovery between connections
+            list_cache_ttl - Seconds to cache the list() results of the
+                             resources, disabled if None
         """
         self.driver = None
+        self.discovery_cache = discovery_cache
+        self.list_cache_ttl = list_cache_ttl
         self.nas_type = nas_type
         if self.nas_type == 'veritas':
-            self.ssh = SSHClient(host, username, password, port)
+            pool = SSHConnectionPool.instance() if use_pool else None
+            self.ssh = SSHClient(host, username, password, port, pool=pool)
         else:
-            self.unityxt = UnityXT(host, username, password)
+            pool = UnitySessionPool.instance() if use_pool else None
+            self.unityxt = UnityXT(host, username, password,
+                                   session_pool=pool)
 
     @property
     def driver_instance(self):
         """ Retrieves the NFS class by NasDrivers.
         """
-        return NasDrivers.get_driver(self.ssh)
+        return NasDrivers.get_driver(self.ssh, self.discovery_cache)
 
     def __enter__(self):
         """ When entering into "with" statement, the NFS driver is
@@ -71,17 +85,20 @@ class NasConnection(object):
                 self.logger.trace.debug("%s\n%s: %s" % (tb, exc_type, exc_val))
                 raise NasConnectionException(exc_val), None, exc_tb
 
-            return self.driver_instance
+            driver = self.driver_instance
         else:
             self.unityxt.login()
-            return self.unityxt
+            driver = self.unityxt
+        driver.list_cache.ttl = self.list_cache_ttl
+        return driver
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """ When exiting from the "with" statement the SSH connection is closed
         and if was because an error, the correspond exception will be raised.
         """
         if self.nas_type == 'veritas':
-            self.ssh.close()
+            # a connection that failed is never given back to the pool
+            self.ssh.close(discard=exc_type is not None)
         else:
             self.unityxt.logout()
         # XXX: should we treat an exception while trying to close the
@@ -0,0 +1,137 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the DiscoveryCache class, an on-disk cache of the
+driver discovered for a NAS server and the capabilities of the SSH session
+(e.g.: is_bash, is_master), so they don't need to be checked remotely again
+on every new connection.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from .log import NasLogger
+
+
+DISCOVERY_CACHE_DIR = os.path.expanduser('~/.naslib/discovery')
+DISCOVERY_CACHE_TTL = 24 * 60 * 60
+
+
+class DiscoveryCache(object):
+    """ Stores one JSON file per host, port and user in the given directory.
+    Each entry also keeps the fingerprint of the host key, so the entry is
+    invalidated if the host key changes, and the time it was created, so it
+    expires after "ttl" seconds.
+
+    >>> import tempfile, shutil
+    >>> directory = tempfile.mkdtemp()
+    >>> class Ssh(object):
+    ...     host, port, user = "host", 22, "support"
+    ...     fingerprint = "aa:bb"
+    ...     def host_key_fingerprint(self):
+    ...         return self.fingerprint
+    ...
+    >>> ssh = Ssh()
+    >>> cache = DiscoveryCache(directory, ttl=60)
+    >>> cache.get(ssh) is None
+    True
+    >>> cache.update(ssh, driver='Va', is_bash=True)
+    >>> cache.get(ssh)['driver']
+    u'Va'
+    >>> cache.update(ssh, is_master=True)
+    >>> sorted(cache.get(ssh).items())
+    [(u'driver', u'Va'), (u'is_bash', True), (u'is_master', True)]
+    >>> ssh.fingerprint = "cc:dd"
+    >>> cache.get(ssh) is None
+    True
+    >>> cache.update(ssh, driver='Sfs')
+    >>> cache.invalidate(ssh)
+    >>> cache.get(ssh) is None
+    True
+    >>> shutil.rmtree(directory)
+    """
+    logger = NasLogger.instance()
+
+    def __init__(self, directory=DISCOVERY_CACHE_DIR, ttl=DISCOVERY_CACHE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+
+    def __repr__(self):
+        """ Representation string of this object.
+        >>> DiscoveryCache('/tmp/naslib')
+        <DiscoveryCache /tmp/naslib>
+        """
+        return "<%s %s>" % (self.__class__.__name__, self.directory)
+
+    def _path(self, ssh):
+        """ Returns the file path of the entry for the given SSHClient.
+        """
+        key = "%s:%s:%s" % (ssh.host, ssh.port, ssh.user)
+        return os.path.join(self.directory,
+                            "%s.json" % hashlib.sha1(key).hexdigest())
+
+    def _read(self, ssh):
+        try:
+            with open(self._path(ssh)) as rfile:
+                return json.load(rfile)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _valid_entry(self, ssh):
+        """ Reads the entry, invalidating it if it expired or if the host key
+        has changed.
+        """
+        entry = self._read(ssh)
+        if entry is None:
+            return None
+        if time.time() - entry.get('created', 0) > self.ttl:
+            self.logger.trace.debug('Discovery cache expired for %s' % ssh)
+            self.invalidate(ssh)
+            return None
+        if entry.get('fingerprint') != ssh.host_key_fingerprint():
+            self.logger.trace.debug('The host key of %s has changed, the '
+                                    'discovery cache is invalidated' % ssh)
+            self.invalidate(ssh)
+            return None
+        return entry
+
+    def get(self, ssh):
+        """ Returns the dict of cached values for the given SSHClient or None
+        if there's no valid entry.
+        """
+        entry = self._valid_entry(ssh)
+        return entry.get('values', {}) if entry is not None else None
+
+    def update(self, ssh, **values):
+        """ Saves the given values in the entry of the given SSHClient.
+        """
+        entry = self._valid_entry(ssh) or \
+            dict(created=time.time(), fingerprint=ssh.host_key_fingerprint())
+        entry.setdefault('values', {}).update(values)
+        path = self._path(ssh)
+        try:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            tmp_path = "%s.%s.tmp" % (path, os.getpid())
+            with open(tmp_path, 'w') as wfile:
+                json.dump(entry, wfile)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as err:
+            self.logger.trace.debug('Unable to save the discovery cache for '
+                                    '%s: %s' % (ssh, err))
+
+    def invalidate(self, ssh):
+        """ Removes the entry of the given SSHClient.
+        """
+        try:
+            os.remove(self._path(ssh))
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,70 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the DisplayLineParser class, used by the NAS
+resources to parse the lines of a listing output through their
+"display_regex". The display format of the output is detected once, so the
+lines don't pay for the attempts of the other formats.
+"""
+
+
+class DisplayLineParser(object):
+    """ Parses the lines of a single output given the "display_regex" of a
+    resource, which can be either a regular expression or a list of them in
+    priority order. The display format is detected by the first line that
+    matches any of them, and its regular expression is the first one tried
+    for the next lines. The other formats are only tried for the lines that
+    don't match it.
+
+    >>> import re
+    >>> parser = DisplayLineParser([re.compile(r"^(?P<name>\w+)\s+\w+$"),
+    ...                     re.compile(r"^(?P<name>\w+)\s+(?P<size>\d+)\s+\w+$")])
+    >>> parser.parse('fs1 10 online')
+    {'name': 'fs1', 'size': '10'}
+    >>> parser.parse('fs2 20 online')
+    {'name': 'fs2', 'size': '20'}
+    >>> parser.parse('fs3 online')
+    {'name': 'fs3'}
+    >>> parser.regexes.index(parser.current)
+    1
+    >>> parser.parse('fs4 x y z') is None
+    True
+    """
+
+    def __init__(self, display_regex):
+        self.regexes = display_regex if isinstance(display_regex, list) \
+                       else [display_regex]
+        self.current = None
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> DisplayLineParser([None, None])
+        <DisplayLineParser formats=2>
+        """
+        return "<%s formats=%s>" % (self.__class__.__name__,
+                                    len(self.regexes))
+
+    def parse(self, line):
+        """ Returns the dict of the named groups parsed from the line or None
+        if it doesn't match any of the display formats.
+        """
+        current = self.current
+        if current is not None:
+            match = current.match(line)
+            if match:
+                return match.groupdict()
+        for regex in self.regexes:
+            if regex is current:
+                continue
+            match = regex.match(line)
+            if match:
+                if current is None:
+                    self.current = regex
+                return match.groupdict()
+        return None
@@ -14,6 +14,7 @@ are imported to register into the Sfs class.
 
 import re
 import time
+import uuid
 
 from ...base import NasBase, register_resources
 from ...log import NasLogger
@@ -22,6 +23,7 @@ from ...nasexceptions import NasExecCommandException, NasBadUserException, \
 from .resources import FileSystemResource, ShareResource, DiskResource, \
                         PoolResource, CacheResource, SnapshotResource
 from .parsers import SfsAdminShowParser
+from .utils import VxPrintSnapshot, DiskGroupAlignments
 
 # Strings that could show up in stderr but don't mean there was an actual error
 STDERRS_TO_IGNORE = [re.compile(r'.*Waiting\s+for\s+other\s+command\s+\(.*\)'
@@ -49,16 +51,28 @@ class Sfs(NasBase):
     discovery_path = '/opt/VRTSnasgw/clish/bin/clish'
     retries = 3
     time_between_retries = 10  # seconds
+    # the markers start on a new line even if the output of the command
+    # doesn't end with one, the extra empty line is removed when splitting
+    batch_item_cmd = ("%(cmd)s; printf '\\n%%s %%d\\n' \"%(marker)s\" $?; "
+                      "printf '\\n%%s\\n' \"%(marker)s\" 1>&2")
+    batch_marker_regex = re.compile(r'^(NASLIB_BATCH_\w+_\d+)(?:\s+(\d+))?$')
 
     logger = NasLogger.instance()
 
     def __init__(self, *args, **kwargs):
-        """ Just includes a new cache attribute (_is_bash) to this SFS object.
+        """ Just includes new cache attributes (_is_bash, _is_master) to this
+        SFS object. An optional DiscoveryCache can be given through the
+        "discovery_cache" keyword argument to persist them between
+        connections.
         """
+        self.discovery_cache = kwargs.pop('discovery_cache', None)
         super(Sfs, self).__init__(*args, **kwargs)
         self.sfs_user = "master"
         self._is_bash = None
         self._is_master = None
+        self._cached_capabilities = set()
+        self.vxprint_snapshot = VxPrintSnapshot(self)
+        self.disk_group_alignments = DiskGroupAlignments(self)
 
     @property
     def is_bash(self):
@@ -68,9 +82,12 @@ class Sfs(NasBase):
         if self._is_bash is not None and not self.ssh.is_connected():
             # resets the cache in case the connection is dropped
             self._is_bash = None
+        if self._is_bash is None:
+            self._is_bash = self._get_cached_capability('is_bash')
         if self._is_bash is None:
             out = self.ssh.run(self.is_bash_cmd)[1]
             self._is_bash = self.string_is_bash_test == out.strip()
+            self._cache_capability('is_bash', self._is_bash)
         return self._is_bash
 
     @property
@@ -82,6 +99,9 @@ class Sfs(NasBase):
         if self._is_master is not None and not self.ssh.is_connected():
             # resets the cache in case the connection is dropped
             self._is_master = None
+        cache_key = 'is_master:%s' % self.sfs_user
+        if self._is_master is None:
+            self._is_master = self._get_cached_capability(cache_key)
         if self._is_master is None:
             cmd = self.check_privileges_cmd % self.sfs_user
             out = self.ssh.run(cmd)[1]
@@ -96,8 +116,25 @@ class Sfs(NasBase):
                 self._is_master = False
                 return self._is_master
             self._is_master = privileges == self.master_privileges
+            self._cache_capability(cache_key, self._is_master)
         return self._is_master
 
+    def _get_cached_capability(self, name):
+        """ Gets a session capability from the discovery cache, if any.
+        """
+        if self.discovery_cache is None:
+            return None
+        value = (self.discovery_cache.get(self.ssh) or {}).get(name)
+        if value is not None:
+            self._cached_capabilities.add(name)
+        return value
+
+    def _cache_capability(self, name, value):
+        """ Saves a session capability in the discovery cache, if any.
+        """
+        if self.discovery_cache is not None:
+            self.discovery_cache.update(self.ssh, **{name: value})
+
     def verify_discovery(self):
         """ Checks if discovery path for given Veritas NAS is present on
         Veritas NAS box and based on the clish location set the nassfs driver
@@ -117,35 +154,116 @@ class Sfs(NasBase):
             _, out, err = self._run(cmd, timeout=timeout, env=env)
             self.debug('Ran command: "%s", out: "%s", err: "%s"' % (cmd, out,
                                                                     err))
-            if (err and not any(r.search(err) for r in STDERRS_TO_IGNORE)) or\
-            self.error_regex.search(out):
-                new_out = self._strip_lines(out) + self._strip_lines(err)
-                raise NasExecCommandException('\n'.join(new_out))
-            if self.info_regex.search(out):
-                self.warn("Info message got from %s: %s" % (self.name, out))
-
-                if self.session_disconnect_regex.search(out):
-                    # When SFS provides this INFO message, it's usually because
-                    # a connection issue. It might be intermittent and that's
-                    # why it will retry to execute for "self.retries" times
-                    # after "self.time_between_retries" seconds.
-                    num_retries += 1
-                    if num_retries > self.retries:
-                        raise NasExecCommandException(
-                            "Failed after %s retries. %s output: %s" %
-                            (num_retries, self.name, out))
-                    time.sleep(self.time_between_retries)
-                    s = {1: 'st', 2: 'nd', 3: 'rd'}
-                    time_retry = "%s%s" % (num_retries,
-                                           s.get(num_retries, 'th'))
-                    self.debug('Retrying for the %s time to run the following '
-                               'command: %s' % (time_retry, cmd))
-                    return _execute(num_retries)
+            if self._check_output(out, err):
+                # When SFS provides this INFO message, it's usually because
+                # a connection issue. It might be intermittent and that's
+                # why it will retry to execute for "self.retries" times
+                # after "self.time_between_retries" seconds.
+                num_retries += 1
+                if num_retries > self.retries:
+                    raise NasExecCommandException(
+                        "Failed after %s retries. %s output: %s" %
+                        (num_retries, self.name, out))
+                time.sleep(self.time_between_retries)
+                s = {1: 'st', 2: 'nd', 3: 'rd'}
+                time_retry = "%s%s" % (num_retries,
+                                       s.get(num_retries, 'th'))
+                self.debug('Retrying for the %s time to run the following '
+                           'command: %s' % (time_retry, cmd))
+                return _execute(num_retries)
             return out
 
-        out = _execute()
+        try:
+            out = _execute()
+        except NasExecCommandException:
+            self._recheck_console()
+            raise
         return self._strip_lines(out)
 
+    def execute_batch(self, cmds, timeout=None, env=None,
+                      raise_on_error=True):
+        """ Runs several SFS commands through a single SSH execution, each one
+        followed by a unique delimiter in both stdout and stderr, so the
+        output can be split back per command. Every command output is checked
+        independently as in the execute() method and the result is a list
+        with the stripped lines of each command, in the same order. If
+        raise_on_error is False, the exception of a failed command is
+        returned in its position instead of being raised.
+        """
+        if not cmds:
+            return []
+        self._check_console()
+        token = "NASLIB_BATCH_%s" % uuid.uuid4().hex
+        markers = ["%s_%s" % (token, i) for i in range(len(cmds))]
+        batch_cmd = '; '.join([self.batch_item_cmd % dict(
+                               cmd=self._clish_cmd(cmd, env), marker=marker)
+                               for cmd, marker in zip(cmds, markers)])
+        self.debug('Running batch of %s commands: %s' % (len(cmds), cmds))
+        _, out, err = self.ssh.run(batch_cmd, timeout=timeout)
+        outs = self._split_batch_output(out, markers)
+        errs = self._split_batch_output(err, markers)
+        results = []
+        for cmd, marker in zip(cmds, markers):
+            if marker not in outs:
+                raise NasExecCommandException('Unable to get the output of '
+                    'the command "%s" from the batch execution. Output: %s %s'
+                    % (cmd, out, err))
+            cmd_out, status = outs[marker]
+            cmd_err = errs.get(marker, ('', None))[0]
+            if status:
+                # as the SSHClient.run() method does for a single execution
+                cmd_err = '\n'.join([o for o in (cmd_out, cmd_err) if o])
+                cmd_out = ''
+            self.debug('Ran command: "%s", out: "%s", err: "%s"' % (cmd,
+                                                            cmd_out, cmd_err))
+            try:
+                if self._check_output(cmd_out, cmd_err):
+                    # session disconnected, the single execution retries it
+                    results.append(self.execute(cmd, timeout, env))
+                else:
+                    results.append(self._strip_lines(cmd_out))
+            except NasExecCommandException as err:
+                self._recheck_console()
+                if raise_on_error:
+                    raise
+                results.append(err)
+        return results
+
+    def _split_batch_output(self, output, markers):
+        """ Splits a batch execution output in a dict {marker: (output,
+        status)}. The empty line printed before each marker is not part of the
+        output. The status is the exit status printed after the marker in
+        stdout, None if there's no one (stderr).
+        """
+        result = {}
+        lines = []
+        for line in output.splitlines():
+            match = self.batch_marker_regex.match(line.strip())
+            if match and match.group(1) in markers:
+                if lines and not lines[-1]:
+                    lines.pop()
+                status = match.group(2)
+                result[match.group(1)] = ('\n'.join(lines),
+                                          int(status) if status else None)
+                lines = []
+                continue
+            lines.append(line)
+        return result
+
+    def _check_output(self, out, err):
+        """ Raises NasExecCommandException if the output of a command shows an
+        error. It returns True if the session got disconnected and the
+        command must be run again.
+        """
+        if (err and not any(r.search(err) for r in STDERRS_TO_IGNORE)) or\
+        self.error_regex.search(out):
+            new_out = self._strip_lines(out) + self._strip_lines(err)
+            raise NasExecCommandException('\n'.join(new_out))
+        if self.info_regex.search(out):
+            self.warn("Info message got from %s: %s" % (self.name, out))
+            return bool(self.session_disconnect_regex.search(out))
+        return False
+
     def _run(self, cmd, timeout=None, env=None):
         """ Runs a SFS command through SSH connection. It checks first where
         the user is get into (bash or SFS console) after connecting, before
@@ -153,6 +271,38 @@ class Sfs(NasBase):
         SFS console. This Sfs wrapper should only allow users to connect
         through bash console.
         """
+        self._check_console()
+        return self.ssh.run(self._clish_cmd(cmd, env), timeout=timeout)
+
+    def _check_console(self):
+        """ Ensures the user has a bash console with "Master" privileges.
+        """
+        try:
+            self._check_user()
+        except (NasBadUserException, NasBadPrivilegesException):
+            if self.discovery_cache is not None:
+                self.discovery_cache.invalidate(self.ssh)
+            raise
+
+    def _recheck_console(self):
+        """ Called when a command fails. The session capabilities taken from
+        the discovery cache might be stale (e.g. the privileges of the user
+        were removed), so they are discarded and checked again remotely,
+        raising the proper exception if the console isn't valid anymore.
+        """
+        if not self._cached_capabilities:
+            return
+        self.discovery_cache.update(self.ssh,
+                                    **dict.fromkeys(self._cached_capabilities))
+        self._cached_capabilities.clear()
+        self._is_bash = None
+        self._is_master = None
+        self._check_console()
+
+    def _check_user(self):
+        """ Raises the proper exception if the user has no bash console or no
+        "Master" privileges.
+        """
         if not self.is_bash:
             # raise exception so we can avoid unexpected errors forward.
             raise NasBadUserException('The user "%s" should have their '
@@ -160,9 +310,12 @@ class Sfs(NasBase):
         if not self.is_master:
             raise NasBadPrivilegesException('The "%s" user should have '
                                         '"Master" privileges.' % self.sfs_user)
+
+    def _clish_cmd(self, cmd, env=None):
+        """ Wraps a SFS command into the clish command line.
+        """
         clish_cmd = self.clish_base_cmd % (self.sfs_user, cmd)
         if env is not None:
             environment_vars = ' '.join(['%s=%s' % t for t in env.items()])
             clish_cmd = "%s %s" % (environment_vars, clish_cmd)
-
-        return self.ssh.run(clish_cmd, timeout=timeout)
+        return clish_cmd
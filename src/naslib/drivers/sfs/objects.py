@@ -16,6 +16,7 @@ special features.
 from ...objects import FileSystem, Snapshot, Cache, Pool
 from ...baseobject import Attr, LazyAttr
 
+from .parsers import records_as_dicts
 from .resourceprops import SfsSize
 from .utils import VxCommands, VxCommandsException
 
@@ -51,11 +52,13 @@ class SfsFileSystem(FileSystem):
             self.vx.debug("Getting the %s fs properties from vxprint" %
                           self.name)
             try:
-                vxprint_data = self.vx.vxprint()
+                vxprint_data = self.resource.nas.vxprint_snapshot.data
             except VxCommandsException:
                 return {}
             try:
-                self._properties = vxprint_data[self.name]
+                # the snapshot keeps compact records, the properties are
+                # given as the dicts of VxCommands.vxprint()
+                self._properties = records_as_dicts(vxprint_data[self.name])
             except KeyError:
                 self.vx.debug("The %s fs not found in vxprint output" %
                               self.name)
@@ -65,7 +68,8 @@ class SfsFileSystem(FileSystem):
     @property
     def disk_alignment(self):
         """ Returns the disk alignment size of the disk group from the
-        following commands output: vxdisk and vxdg.
+        following commands output: vxdisk and vxdg. The disk groups alignments
+        are shared by all the file systems of the NAS connection.
         """
         if self._disk_alignment is not None:
             return self._disk_alignment
@@ -86,31 +90,20 @@ class SfsFileSystem(FileSystem):
             return SfsSize.block_size
 
         try:
-            self.vx.debug("Getting the disk group id of fs %s" % self.name)
-            group_id = self.vx.get_disk_group_id(disk)
-            self.vx.debug("Getting the %s disk group properties of fs %s" %
-                          (group_id, self.name))
-            props = self.vx.get_group_properties(group_id)
-            if 'alignment' not in props:
-                self.vx.debug("Error while trying get the alignment size from "
-                              "disk group properties of fs %s. Using %s bytes "
-                              "as default." % (self.name, SfsSize.block_size))
-                return SfsSize.block_size
-            self.vx.debug("Parsing the alignment %s" % props['alignment'])
-            alignment_str = "%s %s" % tuple(props['alignment'])
-            match = self.vx.align_regex.match(alignment_str)
-            if not match:
-                self.vx.debug("Error while trying to parse the alignment size "
-                              "of fs %s. Using %s bytes as default." %
-                              (self.name, SfsSize.block_size))
-                return SfsSize.block_size
-            alignment = match.groups()[0]
+            self.vx.debug("Getting the disk group alignment of disk %s of fs "
+                          "%s" % (disk, self.name))
+            alignment = self.resource.nas.disk_group_alignments.get(disk)
         except VxCommandsException:
             self.vx.debug("Error while trying to retrieve the alignment size "
                           "of fs %s. Using %s bytes as default." % (self.name,
                           SfsSize.block_size))
             return SfsSize.block_size
-        self._disk_alignment = int(alignment)
+        if alignment is None:
+            self.vx.debug("Error while trying to get the alignment size of fs "
+                          "%s. Using %s bytes as default." % (self.name,
+                          SfsSize.block_size))
+            return SfsSize.block_size
+        self._disk_alignment = alignment
         return self._disk_alignment
 
 
@@ -128,10 +121,22 @@ class SfsCache(Cache):
 
     def get_pool(self):
         """ Retrieves a Pool object related to this cache object by parsing
-        information from the output of the vxprint command on SFS.
+        information from the output of the vxprint command on SFS. The disks
+        and pools of all the objects are shared by the NAS connection.
+
+        **NOTE** Assuming here that the cache object was created with only
+        a single pool, as VxCommands.get_pool_by_cache() does. As that
+        method, it raises VxCommandsException if the pool can't be found.
         """
-        vx = VxCommands(self.resource.nas)
-        return Pool(self.resource, vx.get_pool_by_cache(self.name))
+        try:
+            pool = self.resource.nas.vxprint_snapshot.get_pool(self.name)
+        except KeyError:
+            raise VxCommandsException('The cache "%s" was not found in the '
+                                      'vxprint output.' % self.name)
+        if pool is None:
+            raise VxCommandsException('No pools were found for the cache "%s" '
+                                      'in the vxprint output.' % self.name)
+        return Pool(self.resource, pool)
 
 
 class SfsSnapshot(Snapshot):
@@ -153,3 +158,4 @@ class SfsSnapshot(Snapshot):
             for snapshot in snapshots:
                 if snapshot == self.name:
                     return cache
+
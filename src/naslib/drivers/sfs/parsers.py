@@ -11,6 +11,8 @@
 "vxprint", "vxdg", "vxdisk", etc.
 """
 
+from itertools import izip
+
 
 class SfsAdminShowParser(object):
     r""" This is a parser for the output coming from SFS console command
@@ -223,17 +225,161 @@ class VxPropertiesOutputParser(VxPropertiesSimpleOutputParser):
         return value_data or value_list
 
 
+class VxRecord(object):
+    """ Compact record of a row of a "vx*" command output, as an alternative
+    to a dict. The values are kept in a tuple and the column titles are
+    shared by all the records of the same header, through the classes built
+    by record_class(). The "length" column is converted to int once, when
+    it's a number. It supports the dict-style access for backward
+    compatibility, as well as attribute access.
+
+    >>> Row = record_class(['ty', 'name', 'assoc', 'length', 'device'])
+    >>> row = Row(['sd', 'disk_1-02', 'advol-01', '1560281088'])
+    >>> row['name'], row.length, row.get('device')
+    ('disk_1-02', 1560281088, None)
+    >>> 'device' in row, 'assoc' in row
+    (False, True)
+    >>> row == {'ty': 'sd', 'name': 'disk_1-02', 'assoc': 'advol-01',
+    ...         'length': 1560281088}
+    True
+    >>> sorted(row.keys())
+    ['assoc', 'length', 'name', 'ty']
+    """
+    __slots__ = ('_values',)
+    _fields = ()
+    _index = {}
+    int_fields = ('length',)
+
+    def __init__(self, values):
+        values = tuple(values[:len(self._fields)])
+        for field in self.int_fields:
+            i = self._index.get(field)
+            if i is not None and i < len(values) and values[i].isdigit():
+                values = values[:i] + (int(values[i]),) + values[i + 1:]
+        self._values = values
+
+    def __getitem__(self, key):
+        i = self._index[key]
+        if i >= len(self._values):
+            raise KeyError(key)
+        return self._values[i]
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __contains__(self, key):
+        return self._index.get(key, len(self._values)) < len(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._fields[:len(self._values)])
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return zip(self._fields, self._values)
+
+    def as_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, VxRecord):
+            other = other.as_dict()
+        return self.as_dict() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self.as_dict())
+
+
+_record_classes = {}
+
+
+def record_class(header):
+    """ Returns the VxRecord subclass for the given header titles, built only
+    once for each header.
+    """
+    fields = tuple(header)
+    klass = _record_classes.get(fields)
+    if klass is None:
+        klass = type('VxRecord', (VxRecord,), dict(
+            __slots__=(), _fields=fields,
+            _index=dict([(f, i) for i, f in enumerate(fields)])))
+        _record_classes[fields] = klass
+    return klass
+
+
+def records_as_dicts(data):
+    """ Converts the VxRecord rows found at any level of a parsed "vx*"
+    output to the dicts of the default parsing mode, having every value as
+    the string it was parsed from.
+
+    >>> Row = record_class(['ty', 'name', 'length'])
+    >>> data = records_as_dicts({'v': Row(['v', 'vol', '1024']),
+    ...                          'sd': [Row(['sd', 'vol-01', '-'])]})
+    >>> data['v'] == {'ty': 'v', 'name': 'vol', 'length': '1024'}
+    True
+    >>> type(data['sd'][0]), data['sd'][0]['length']
+    (<type 'dict'>, '-')
+    """
+    if isinstance(data, VxRecord):
+        return dict([(k, str(v) if isinstance(v, (int, long)) else v)
+                     for k, v in data.items()])
+    if isinstance(data, dict):
+        return dict([(k, records_as_dicts(v)) for k, v in data.items()])
+    if isinstance(data, list):
+        return [records_as_dicts(v) for v in data]
+    return data
+
+
 class VxGenericListOutput(object):
     """ This is a parser for outputs coming from generic "vx*" commands that
     lists data.
     """
 
-    def __init__(self, output, unique_key='name'):
+    def __init__(self, output, unique_key='name', records=False):
         """ Just requires the output from a generic "vx*" command. It should
-        have a list format (e.g: vxprint, vxdisk listtag, etc.).
+        have a list format (e.g: vxprint, vxdisk listtag, etc.). The output
+        can be either a string or an iterator of lines, as the one returned by
+        SSHClient.run_stream(), which is consumed only once while parsing.
+        If "records" is True, each row is parsed as a compact VxRecord
+        instead of a dict.
+
+        >>> lines = iter(["DEVICE  NAME  VALUE", "disk_1  pool  p1", "",
+        ...               "disk_2  pool  p2"])
+        >>> parser = VxGenericListOutput(lines, 'device')
+        >>> data = parser.parse()
+        >>> sorted(data.keys())
+        ['disk_1', 'disk_2']
+        >>> data['disk_2']['value']
+        'p2'
+        >>> data = VxGenericListOutput("DEVICE NAME VALUE\\ndisk_1 pool p1",
+        ...                            'device', records=True).parse()
+        >>> data['disk_1'].value
+        'p1'
         """
-        self.output = output.strip()
+        if isinstance(output, basestring):
+            self.output = output.strip()
+            self._stream = None
+        else:
+            self.output = None
+            self._stream = iter(output)
         self.unique_key = unique_key
+        self.records = records
         self._header = []
 
     @property
@@ -241,25 +387,59 @@ class VxGenericListOutput(object):
         """ Retrieves the header titles as a list.
         """
         if not self._header:
-            header = self._get_header_line().split()
-            self._header = [i.strip().lower() for i in header]
+            self._read_header(self._lines())
         return self._header
 
-    def _get_header_line(self):
-        """ Returns the header line information.
+    def _lines(self):
+        """ Returns an iterator of the output lines.
         """
-        lines = [i.strip() for i in self.output.splitlines() if i.strip()]
-        return lines[0]
+        if self._stream is not None:
+            return self._stream
+        return iter(self.output.splitlines())
+
+    def _is_header_line(self, line):  # pylint: disable=I0011,W0613
+        """ Checks whether a non empty line is the header line.
+        """
+        return True
+
+    def _read_header(self, lines):
+        """ Consumes the given lines iterator up to the header line, so the
+        remaining lines are the data ones, and returns the header titles.
+        """
+        if self._header and self._stream is not None:
+            # the header line was already consumed from the output iterator
+            return self._header
+        for line in lines:
+            line = line.strip()
+            if line and self._is_header_line(line):
+                self._header = [i.lower() for i in line.split()]
+                break
+        return self._header
 
     def parse(self):
-        """ Parses the output from cleaned lines and builds the dict data.
+        """ Parses the output in a single pass over its lines and builds the
+        dict data.
         """
         data = {}
-        for line in self.output.splitlines()[1:]:
-            d = dict(zip(self.header, line.split()))
-            data[d[self.unique_key]] = d
+        unique_key = self.unique_key
+        lines = self._lines()
+        header = self._read_header(lines)
+        make_row = self._row_builder(header)
+        for line in lines:
+            values = line.split()
+            if values:
+                row = make_row(values)
+                data[row[unique_key]] = row
         return data
 
+    def _row_builder(self, header):
+        """ Returns the function that builds a row from the values of a line,
+        either as a dict or as a VxRecord.
+        """
+        if self.records:
+            return record_class(header)
+        return lambda values: dict(izip(header, values))
+
 
 class VxPrintOutput(VxGenericListOutput):
     """ This is a parser for outputs coming from vxprint command that has
@@ -298,36 +478,31 @@ class VxPrintOutput(VxGenericListOutput):
 '-', 'putil0': '-', 'ploffs': '-'}, 'v': {'kstate': 'ENABLED', 'name': \
 'advol', 'ty': 'v', 'state': 'ACTIVE', 'length': '1560281088', 'assoc': \
 'fsgen', 'tutil0': '-', 'putil0': '-', 'ploffs': '-'}}
+    >>> lines = iter(vxprint_output.splitlines())
+    >>> VxPrintOutput(lines).parse() == data
+    True
+    >>> data = VxPrintOutput("TY NAME ASSOC\\nv vol vg\\ndc vol_dco vol\\n"
+    ...                      "v vol_dcl gen\\nsd d-01 vol_dcl-01 sda").parse()
+    >>> data['vol']['v']['assoc'], data['vol']['dc']['v']['name']
+    ('vg', 'vol_dcl')
+    >>> data['vol']['dc']['sd'][0]['device']
+    'sda'
+    >>> records = VxPrintOutput(vxprint_output, records=True).parse()
+    >>> records['advol']['v'].length
+    1560281088
+    >>> records['advol']['sd'][0]['name']
+    'disk_1-02'
 
     """
 
-    def _get_header_line(self):
-        """ Returns the header line information.
-        """
-        lines = [i.strip() for i in self.output.splitlines() if i.strip()]
-        header_line = None
-        for line in lines:
-            if line.startswith('TY'):
-                header_line = line
-                break
-        return header_line
-
-    @property
-    def blocks(self):
-        """ Retrieves a list of information blocks extracted from the "vxprint"
-        output.
+    def _is_header_line(self, line):
+        """ The vxprint header is the first line starting with "TY".
         """
-        lines = [i.strip() for i in self.output.splitlines()]
-        header_line = self._get_header_line()
-        if not header_line:
-            return []
-        index = lines.index(header_line) + 1
-        return [i.strip() for i in '\n'.join(lines[index:]).split('\n\n')
-                          if i.strip()]
+        return line.startswith('TY')
 
     def parse(self):
-        """ Parses the output from cleaned lines and builds the dict data.
-        Each key of the dict correspond to the NAME of the resource that could
+        """ Parses the output in a single pass over its lines and builds the
+        dict data. Each key of the dict correspond to the NAME of the resource that could
         be a TY (type) disk, group, plex, volume, etc. Each value for a key
         is a dict containing the whole line information in the table.
 
@@ -376,26 +551,32 @@ class VxPrintOutput(VxGenericListOutput):
 
         """
         data = {}
-        for block in self.blocks:
-            lines = [i.strip() for i in block.splitlines() if i.strip()]
-            first_line = dict(zip(self.header, lines[0].split()))
-            name = first_line['name']
-            block_data = {}
-            data_dict = block_data
-            for line in lines:
-                values = line.split()
-                if values[0] == 'sd':
-                    # sd type will have an extra columna with the device
-                    values_dict = dict(zip(self.header + ['device'], values))
-                    # because it can can have multiple sds
-                    data_dict.setdefault(values[0], [])
-                    data_dict[values[0]].append(values_dict)
-                else:
-                    values_dict = dict(zip(self.header, values))
-                    if values[0] == 'dc':
-                        # dc entries has its own values
-                        block_data['dc'] = {}
-                        data_dict = block_data['dc']
-                    data_dict[values[0]] = values_dict
-            data[name] = block_data
+        lines = self._lines()
+        header = self._read_header(lines)
+        if not header:
+            return data
+        make_row = self._row_builder(header)
+        # sd type will have an extra column with the device
+        make_sd_row = self._row_builder(header + ['device'])
+        block_data = None
+        data_dict = None
+        for line in lines:
+            values = line.split()
+            if not values:
+                block_data = None
+                continue
+            row_type = values[0]
+            is_sd = row_type == 'sd'
+            row = make_sd_row(values) if is_sd else make_row(values)
+            if block_data is None:
+                block_data = data_dict = {}
+                data[row['name']] = block_data
+            if is_sd:
+                # because it can can have multiple sds
+                data_dict.setdefault(row_type, []).append(row)
+            else:
+                if row_type == 'dc':
+                    # dc entries has its own values
+                    data_dict = block_data['dc'] = {}
+                data_dict[row_type] = row
         return data
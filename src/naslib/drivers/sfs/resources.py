@@ -34,6 +34,8 @@ from ...nasexceptions import NasException, NasExecCommandException, \
 from ...baseresources import FileSystemResourceBase, PoolResourceBase, \
                              ShareResourceBase, DiskResourceBase, \
                              CacheResourceBase, SnapshotResourceBase
+from ...errorclassifier import ErrorClassifier
+from ...listcache import cached_list, invalidates_list
 from ...objects import Pool, FileSystem, Share, Cache, Snapshot
 from ...resourceprops import UnitsSize, Size
 from .objects import SfsFileSystem, SfsCache, SfsSnapshot
@@ -62,12 +64,11 @@ class ShareResource(ShareResourceBase):
     faulted_delimiter = "Faulted Shares:"
     faulted_match_format = "%(name) s%(client)s"
 
-    def _build_shares_list(self, lines, faulted_shares_lines):
-        """ Helper to build a list of Shares objects based on the
-        defined "display_regex" as a regular expression for each line of
-        the output of NFS and also checks the Faulted Shares.
+    def _faulted_shares(self, faulted_shares_lines):
+        """ Helper to parse the lines of the Faulted Shares into a set of
+        (path, client) keys.
         """
-        faulted = []
+        faulted = set()
         for line in faulted_shares_lines:
             if not line.strip():
                 continue
@@ -76,17 +77,26 @@ class ShareResource(ShareResourceBase):
                 raise NasUnexpectedOutputException('It\'s not possible to '
                     'parse the output of faulted shares received from %s. '
                     'Line output: "%s".' % (str(self.nas), line))
-            faulted.append(self.faulted_match_format % match.groupdict())
+            faulted.add((match.group('name'), match.group('client')))
+        return faulted
 
+    def _build_shares_list(self, lines, faulted_shares_lines):
+        """ Helper to build a list of Shares objects based on the
+        defined "display_regex" as a regular expression for each line of
+        the output of NFS and also checks the Faulted Shares.
+        """
+        faulted = self._faulted_shares(faulted_shares_lines)
         obj_list = []
+        parser = self._display_parser()
         for line in [i.strip() for i in lines if i]:
-            data = self.parse_displayed_line(line)
-            data['faulted'] = (self.faulted_match_format % data) in faulted
+            data = self.parse_displayed_line(line, parser)
+            data['faulted'] = (data['name'], data['client']) in faulted
             if data['client'] == "*":
                 data['client'] = ""
             obj_list.append(self._build_nas_object(**data))
-        return obj_list
+        return self._indexed(obj_list)
 
+    @cached_list
     def list(self):
         """ Returns a list of Share resources items retrieved by SFS server.
         """
@@ -99,12 +109,18 @@ class ShareResource(ShareResourceBase):
             faulted_shares_lines = faulted_shares.splitlines()
         return self._build_shares_list(lines, faulted_shares_lines)
 
+    def _options_str(self, options):
+        """ Helper to join the share options given as a list of strings.
+        """
+        return ','.join(options) if hasattr(options, '__iter__') else options
+
+    @invalidates_list()
     def create(self, path, client, options):
         """ Creates a share with a given path, clients and options. Options
         must be a list of strings. A share is unique identified by its path
         AND its client. In case of failures it raises a NasCreationException.
         """
-        ops = ','.join(options) if hasattr(options, '__iter__') else options
+        ops = self._options_str(options)
         cmd = "nfs share add %s %s %s" % (ops, path, client)
         try:
             self.nas.execute(cmd, timeout=CREATION_TIMEOUT)
@@ -119,6 +135,7 @@ class ShareResource(ShareResourceBase):
         return self._build_nas_object(name=path, client=client,
                                       options=ops)
 
+    @invalidates_list()
     def delete(self, path, client):
         """ Deletes a Sfs Share given a path and client. A share is unique
         identified by its path AND its client. In case of failures it raises a
@@ -136,6 +153,64 @@ class ShareResource(ShareResourceBase):
             if self.exists(path, client):
                 raise err
 
+    def _execute_many(self, path, cmds, clients, timeout, exists):
+        """ Helper to run the share commands of each client through a single
+        batch execution. Returns the list of outputs or exceptions of each
+        command. If the execution times out, the shares are listed to check
+        which commands took effect, given the expected "exists" result.
+        """
+        try:
+            return self.nas.execute_batch(cmds, timeout=timeout,
+                                          raise_on_error=False)
+        except NasExecutionTimeoutException, err:
+            # maybe the SSH connection was dropped and would be worth to check
+            # which shares were created or deleted
+            shares = self.list()
+            return [[] if (shares.find(path, c) is not None) == exists
+                    else err for c in clients]
+
+    @invalidates_list()
+    def create_many(self, path, clients):
+        """ Overrides the base method to run the "nfs share add" commands of
+        all the clients through a single batch execution.
+        """
+        clients = [(c, self._options_str(o)) for c, o in clients]
+        cmds = ["nfs share add %s %s %s" % (ops, path, client)
+                for client, ops in clients]
+        outputs = self._execute_many(path, cmds, [c for c, _ in clients],
+                                     CREATION_TIMEOUT, True)
+        results = []
+        for (client, ops), cmd, output in zip(clients, cmds, outputs):
+            if isinstance(output, NasExecCommandException):
+                msg = "Share creation failed: %s. Command: %s" % (str(output),
+                                                                  cmd)
+                results.append(Share.CreationException(msg))
+            elif isinstance(output, Exception):
+                results.append(output)
+            else:
+                results.append(self._build_nas_object(name=path, client=client,
+                                                      options=ops))
+        return results
+
+    @invalidates_list()
+    def delete_many(self, path, clients):
+        """ Overrides the base method to run the "nfs share delete" commands
+        of all the clients through a single batch execution.
+        """
+        cmds = ["nfs share delete %s %s" % (path, c) for c in clients]
+        outputs = self._execute_many(path, cmds, clients, DELETION_TIMEOUT,
+                                     False)
+        results = []
+        for cmd, output in zip(cmds, outputs):
+            if isinstance(output, NasExecCommandException):
+                msg = "%s. Command: %s" % (str(output), cmd)
+                results.append(Share.DeletionException(msg))
+            elif isinstance(output, Exception):
+                results.append(output)
+            else:
+                results.append(None)
+        return results
+
 
 class FileSystemResource(FileSystemResourceBase):
     """ This class contains the implementation of the basic methods of a SFS
@@ -189,6 +264,22 @@ class FileSystemResource(FileSystemResourceBase):
     fs_not_exist_regex = re.compile(r".*File\s+system\s+[-\w]+\s+"
                                     r"does\s+not\s+exist.*")
 
+    create_errors = ErrorClassifier([
+        ('invalid_pool', invalid_pool_regex, Pool.DoesNotExist),
+        ('already_exists', sfshf3_already_exists_regex,
+         FileSystem.AlreadyExists),
+        ('already_exists', sfsmp1p3_already_exists_regex,
+         FileSystem.AlreadyExists),
+        ('insufficient_space', insufficient_space_regex,
+         FileSystem.InsufficientSpaceException),
+    ], FileSystem.CreationException)
+
+    lookup_size_regex = re.compile(r"^[\d\.]+[kmgtKGMT]$")
+    lookup_pool_regex = re.compile(r"^[-\w]+$")
+    # the "<node>: <state>" lines of the "General Info" section, the state
+    # being the same value of the "STATUS" column of "storage fs list"
+    node_state_regex = re.compile(r"^(?P<node>[-\w]+):\s+(?P<online>[-\w]+)$")
+
     fs_get_max_number_of_attempts = 3
     fs_get_delay_between_attemps = 15
 
@@ -209,12 +300,13 @@ class FileSystemResource(FileSystemResourceBase):
         """
         vx = VxCommands(self.nas)
         try:
-            vx_data = vx.vxprint()
+            vx_data = self.nas.vxprint_snapshot.data
         except VxCommandsException:
             vx_data = {}
         obj_list = []
+        parser = self._display_parser()
         for line in [i.strip() for i in lines if i]:
-            data = self.parse_displayed_line(line)
+            data = self.parse_displayed_line(line, parser)
             if 'pool' in data and data['pool'] is None:
                 # Sometimes the pool might be an empty value in the line output
                 # because the filesystem might currently be in the process of
@@ -222,18 +314,84 @@ class FileSystemResource(FileSystemResourceBase):
                 # command is executed.
                 self.nas.debug("The line output parsed from SFS is incomplete"
                           ", with an empty pool value. Line output: %s" % line)
-            size_in_blocks = self.get_real_size_in_blocks(data['name'],
-                                                          vx_data, vx)
-            if not size_in_blocks:
-                size_in_bytes = Size(data['size']).num_bytes
-                size_in_blocks = size_in_bytes / SfsSize.block_size
-                vx.debug("Using %s=%s rounded bytes from SFS display." %
-                         (data['size'], size_in_blocks))
-            # replace the data['size'] containing the real and display data
-            data['size'] = (size_in_blocks, data['size'])
-            data['online'] = data['online'] == 'online'
-            obj_list.append(self._build_nas_object(**data))
-        return obj_list
+            obj_list.append(self._build_filesystem(data, vx_data, vx))
+        return self._indexed(obj_list)
+
+    def _build_filesystem(self, data, vx_data, vx):
+        """ Builds a SfsFileSystemItem object from the data parsed from the
+        output of NFS, using the real size from "vxprint" if available.
+        """
+        size_in_blocks = self.get_real_size_in_blocks(data['name'],
+                                                      vx_data, vx)
+        if not size_in_blocks:
+            size_in_bytes = Size(data['size']).num_bytes
+            size_in_blocks = size_in_bytes / SfsSize.block_size
+            vx.debug("Using %s=%s rounded bytes from SFS display." %
+                     (data['size'], size_in_blocks))
+        # replace the data['size'] containing the real and display data
+        data['size'] = (size_in_blocks, data['size'])
+        data['online'] = data['online'] == 'online'
+        return self._build_nas_object(**data)
+
+    @property
+    def _display_keys(self):
+        """ Set of the group names of the "display_regex", i.e., the
+        attributes parsed from the "storage fs list" output.
+        """
+        regexes = self.display_regex if isinstance(self.display_regex, list) \
+                  else [self.display_regex]
+        return set([k for r in regexes for k in r.groupindex])
+
+    def _lookup(self, identifier):
+        """ Overrides the base method to get a single file system by the
+        "storage fs list <name>" command instead of listing all of them.
+        Returns None, so get() falls back to the full listing, in case the
+        output doesn't have the expected properties (e.g.: multi-tier file
+        systems).
+        """
+        name = identifier['name']
+        try:
+            lines = self._properties_lines(name)
+        except FileSystem.DoesNotExist:
+            return []
+        props = VxPropertiesSimpleOutputParser('\n'.join(lines)).parse()
+        states = self._node_states(lines)
+        pool = props.get('List of pools')
+        if 'Secondary' in props or 'Layout' not in props or not states or \
+                not self.lookup_size_regex.match(props.get('Size', '')) or \
+                (pool is not None and not self.lookup_pool_regex.match(pool)):
+            return None
+        online = all([state == 'online' for state in states])
+        data = dict(name=name, size=props['Size'], layout=props['Layout'],
+                    pool=pool, online='online' if online else 'offline')
+        keys = self._display_keys
+        data = dict([(k, v) for k, v in data.items() if k in keys])
+        vx = VxCommands(self.nas)
+        try:
+            vx_data = {name: vx.vxprint(name)}
+        except (VxCommandsException, KeyError):
+            vx_data = {}
+        return [self._build_filesystem(data, vx_data, vx)]
+
+    def _node_states(self, lines):
+        """ Returns the list of the states parsed from the node lines of the
+        "General Info" section of the "storage fs list <name>" output.
+        """
+        states = []
+        in_section = False
+        for line in [i.strip() for i in lines]:
+            if line.startswith('General Info'):
+                in_section = True
+                continue
+            if not in_section or not line or line.startswith('='):
+                continue
+            if ':' not in line:
+                # the header of the next section
+                break
+            match = self.node_state_regex.match(line)
+            if match:
+                states.append(match.group('online'))
+        return states
 
     def _check_size(self, size):
         """ Checks the size and raises a FileSystem.SizeException in case of
@@ -244,15 +402,10 @@ class FileSystemResource(FileSystemResourceBase):
                                            "format %s." % size)
 
     def _check_create_errors(self, err, msg):
-        if self.invalid_pool_regex.search(str(err)):
-            raise Pool.DoesNotExist(msg)
-        if (self.sfshf3_already_exists_regex.search(str(err)) or
-                self.sfsmp1p3_already_exists_regex.search(str(err))):
-            raise FileSystem.AlreadyExists(msg)
-        if self.insufficient_space_regex.search(str(err)):
-            raise FileSystem.InsufficientSpaceException(msg)
-        raise FileSystem.CreationException(msg)
+        _, exception = self.create_errors.classify(str(err))
+        raise exception(msg)
 
+    @cached_list
     def list(self):
         """ Returns a list of FileSystems resources items retrieved by SFS
         server.
@@ -275,24 +428,35 @@ class FileSystemResource(FileSystemResourceBase):
         issue might not happen again.
         """
 
-        def get(attempts):
+        get = super(FileSystemResource, self).get
+        return self._with_attempts(lambda: get(*args, **kwargs),
+                                   args[0] if args else kwargs.get('name'))
+
+    def _get_many(self, identifiers):
+        """ Overrides the base method to do the same attempts as get().
+        """
+        get_many = super(FileSystemResource, self)._get_many
+        return self._with_attempts(lambda: get_many(identifiers),
+                                   ', '.join(identifiers))
+
+    def _with_attempts(self, func, name):
+        """ Calls func attempting again in case of
+        NasIncompleteParsedInformation, up to fs_get_max_number_of_attempts.
+        """
+        attempts = 0
+        while True:
             try:
-                filesystem = super(FileSystemResource, self).get(*args,
-                                                                 **kwargs)
+                return func()
             except NasIncompleteParsedInformation:
-                if attempts < self.fs_get_max_number_of_attempts:
-                    self.nas.debug('Re-attempting to retrieve information '
-                                   'from SFS server about "%s" file system.' %
-                                   args[0])
-                    attempts += 1
-                    time.sleep(self.fs_get_delay_between_attemps)  # seconds
-                    filesystem = get(attempts)
-                else:
+                if attempts >= self.fs_get_max_number_of_attempts:
                     raise
-            return filesystem
-
-        return get(0)
+                self.nas.debug('Re-attempting to retrieve information '
+                               'from SFS server about "%s" file system.' %
+                               name)
+                attempts += 1
+                time.sleep(self.fs_get_delay_between_attemps)  # seconds
 
+    @invalidates_list()
     def create(self, name, size, pool, layout='simple'):
         """ Creates a file system on SFS server given a fs name, size, pool and
         a layout (allowed layouts are defined on SfsFileSystem.layouts). In
@@ -303,6 +467,7 @@ class FileSystemResource(FileSystemResourceBase):
             raise NasException("Can't create fs, wrong '%s' layout. Available "
                          "layouts are: %s" % (layout, ', '.join(self.layouts)))
         cmd = "storage fs create %s %s %s %s" % (layout, name, size, pool)
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(cmd, timeout=CREATION_TIMEOUT)
         except NasExecCommandException, err:
@@ -315,7 +480,7 @@ class FileSystemResource(FileSystemResourceBase):
                 raise err
         vx = VxCommands(self.nas)
         try:
-            vx_data = vx.vxprint()
+            vx_data = self.nas.vxprint_snapshot.data
         except VxCommandsException:
             vx_data = {}
         size_in_blocks = self.get_real_size_in_blocks(name, vx_data, vx)
@@ -328,11 +493,13 @@ class FileSystemResource(FileSystemResourceBase):
         return self._build_nas_object(name=name, size=size, pool=pool,
                                          layout=layout, online=True)
 
+    @invalidates_list('share', 'snapshot')
     def delete(self, name):
         """ Deletes a SFS FileSystem given a fs name. In case of failures it
         raises a NasDeletionException.
         """
         cmd = "storage fs destroy %s" % name
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(cmd, timeout=DELETION_TIMEOUT)
         except NasExecCommandException, err:
@@ -344,6 +511,7 @@ class FileSystemResource(FileSystemResourceBase):
             if self.exists(name):
                 raise err
 
+    @invalidates_list()
     def resize(self, name, size, pool=None):
         filesystem = self.get(name)
         if pool is None:
@@ -356,6 +524,7 @@ class FileSystemResource(FileSystemResourceBase):
             fs_tier = prop.get('Tier Info')
 
         if size > filesystem.size:
+            self.nas.vxprint_snapshot.invalidate()
             try:
                 resize_cmd = 'storage fs growto %s %s %s %s' % (fs_tier,
                     name, size, pool)
@@ -383,11 +552,13 @@ class FileSystemResource(FileSystemResourceBase):
                 'is not supported.'
                 % (name, filesystem.size, size))
 
+    @invalidates_list()
     def online(self, name, online=True):
         """ Method to set the file system as online or offline.
         """
         option = "online" if online else "offline"
         cmd = "storage fs %s %s" % (option, name)
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(cmd, timeout=ON_OFF_LINE_TIMEOUT)
         except NasExecCommandException as err:
@@ -417,6 +588,13 @@ class FileSystemResource(FileSystemResourceBase):
     def _properties(self, name):
         """ Gets a file system properties as a dict.
         """
+        lines = self._properties_lines(name)
+        parser = VxPropertiesSimpleOutputParser('\n'.join(lines))
+        return parser.parse()
+
+    def _properties_lines(self, name):
+        """ Gets the output lines of the file system properties.
+        """
         cmd = "storage fs list %s" % name
         lines = []
         try:
@@ -425,8 +603,7 @@ class FileSystemResource(FileSystemResourceBase):
             msg = "%s. Command: %s" % (str(err), cmd)
             if self.fs_not_exist_regex.search(str(err)):
                 raise FileSystem.DoesNotExist(msg)
-        parser = VxPropertiesSimpleOutputParser('\n'.join(lines))
-        return parser.parse()
+        return lines
 
 
 class DiskResource(DiskResourceBase):
@@ -435,6 +612,7 @@ class DiskResource(DiskResourceBase):
     """
     display_regex = re.compile(r"^(?P<name>[-\w]+)\s+[-\w\s]+$")
 
+    @cached_list
     def list(self):
         """ Returns a list of Disk resources items retrieved by SFS server.
         """
@@ -454,6 +632,7 @@ class PoolResource(PoolResourceBase):
     """
     display_regex = re.compile(r"^(?P<name>[-\w]+)\s+[-\w\s]+$")
 
+    @cached_list
     def list(self):
         """ Returns a list of Pool resources items retrieved by SFS server.
         """
@@ -491,9 +670,20 @@ class CacheResource(CacheResourceBase):
         r"disk\.\s+Please\s+run\s+scanbus.*")
     minimum_allowed_size = Size('5M')
 
+    create_errors = ErrorClassifier([
+        ('invalid_pool', invalid_pool_regex, Pool.DoesNotExist),
+        ('insufficient_space', insufficient_space_regex,
+         Cache.InsufficientSpaceException),
+        ('already_exists', already_exists_regex, Cache.AlreadyExists),
+    ], Cache.CreationException)
+    delete_errors = ErrorClassifier([
+        ('does_not_exist', does_not_exist_regex, Cache.DoesNotExist),
+    ], Cache.DeletionException)
+
     def _get_caches(self, output):
         return self._build_nas_object_list(output[1:])
 
+    @cached_list
     def list(self):
         """ Returns a list of Cache resources items retrieved by SFS server.
 
@@ -542,25 +732,24 @@ class CacheResource(CacheResourceBase):
             raise Cache.SizeException("Can't create cache object, size cannot "
                                 "be less than %s." % self.minimum_allowed_size)
 
+    @invalidates_list()
     def create(self, name, size, pool):
         """ Creates a Cache with a given name, size and poll name.
         """
         self._check_size(size)
         cmd = "storage rollback cache create %s %s %s" % (name, size, pool)
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(cmd, timeout=CREATION_TIMEOUT)
         except NasExecCommandException, err:
             msg = "Cache object creation failed: %s. Command: %s" % (str(err),
                                                                      cmd)
-            if self.invalid_pool_regex.search(str(err)):
-                raise Pool.DoesNotExist(msg)
-            if self.insufficient_space_regex.search(str(err)):
-                raise Cache.InsufficientSpaceException(msg)
-            if self.already_exists_regex.search(str(err)):
+            _, exception = self.create_errors.classify(str(err))
+            if exception is Cache.AlreadyExists:
                 cmd2 = "storage rollback cache list"
                 stdout = self.nas.execute(cmd2, timeout=LISTING_TIMEOUT)
                 if name in str(stdout):
-                    raise Cache.AlreadyExists(msg)
+                    raise exception(msg)
                 else:
                     self.nas.debug("Cache creation failed due to left " \
                                    "over underlying volumes of cache. " \
@@ -571,7 +760,7 @@ class CacheResource(CacheResourceBase):
                     self.nas.debug("Underlying cache volume deleted " \
                                    " and created the cache")
                     return
-            raise Cache.CreationException(msg)
+            raise exception(msg)
         except NasExecutionTimeoutException, err:
             # maybe the SSH connection was dropped and would be worth to check
             # whether the cache was created or not
@@ -579,11 +768,13 @@ class CacheResource(CacheResourceBase):
                 raise err
         return self.get(name)
 
+    @invalidates_list('snapshot')
     def delete(self, name):
         """ Deletes a SFS cache object given a cache name. In case of failures
         it raises a NasDeletionException.
         """
         cmd = "storage rollback cache destroy %s" % name
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(cmd, timeout=DELETION_TIMEOUT)
             vx1 = VxCommands(self.nas)
@@ -595,15 +786,15 @@ class CacheResource(CacheResourceBase):
                                " volumes left over and deleted.")
         except NasExecCommandException, err:
             msg = "%s. Command: %s" % (str(err), cmd)
-            if self.does_not_exist_regex.search(str(err)):
-                raise Cache.DoesNotExist(msg)
-            raise Cache.DeletionException(msg)
+            _, exception = self.delete_errors.classify(str(err))
+            raise exception(msg)
         except NasExecutionTimeoutException, err:
             # maybe the SSH connection was dropped and would be worth to check
             # whether the cache was deleted or not
             if self.exists(name):
                 raise err
 
+    @invalidates_list()
     def resize(self, name, size, pool=None):
         """ Resizes a Cache object given a cache name and the new size.
         """
@@ -611,6 +802,7 @@ class CacheResource(CacheResourceBase):
         cache = self.get(name)
         size = Size(size)
         if size > cache.size:
+            self.nas.vxprint_snapshot.invalidate()
             try:
                 vx = VxCommands(self.nas)
                 vx.cache_grow(name, size)
@@ -684,9 +876,38 @@ class SnapshotResource(SnapshotResourceBase):
     destroy_failed_restore_ongoing_regex = re.compile(r".*Rollback\s+[-\w]+\s"
                                     r"dissociate\s+failed.*")
 
+    create_errors = ErrorClassifier([
+        ('already_exists', already_exists_regex, Snapshot.AlreadyExists),
+        ('fs_not_exist', fs_not_exist_regex, FileSystem.DoesNotExist),
+        ('cache_not_exist', cache_not_exist_regex, Cache.DoesNotExist),
+        ('fsck_failed', fsck_failed_regex, Snapshot.CreationException),
+    ], Snapshot.CreationException)
+    delete_errors = ErrorClassifier([
+        ('restore_ongoing', destroy_failed_restore_ongoing_regex,
+         Snapshot.RollsyncRunning),
+        # handled by the caller, offlining the snapshot and trying again
+        ('online', destroy_failed_online_regex, None),
+        ('fs_not_exist', fs_not_exist_regex, FileSystem.DoesNotExist),
+        ('snapshot_not_exist', sfshf3_snapshot_not_exist_regex,
+         Snapshot.DoesNotExist),
+        ('snapshot_not_exist', sfsmp1p3_snapshot_not_exist_regex,
+         Snapshot.DoesNotExist),
+    ], Snapshot.DeletionException)
+    restore_errors = ErrorClassifier([
+        ('restore_failed', restore_failed1_regex, None),
+        ('restore_failed', restore_failed2_regex, None),
+        ('restore_ongoing', restore_ongoing_regex, None),
+        ('fs_not_exist', fs_not_exist_regex, FileSystem.DoesNotExist),
+        ('snapshot_not_exist', sfshf3_snapshot_not_exist_regex,
+         Snapshot.DoesNotExist),
+        ('snapshot_not_exist', sfsmp1p3_snapshot_not_exist_regex,
+         Snapshot.DoesNotExist),
+    ], Snapshot.RestoreException)
+
     def _get_snapshots(self, output):
         return self._build_nas_object_list(output[1:])
 
+    @cached_list
     def list(self):
         """ Returns a list of snapshot resources items retrieved by SFS server.
         """
@@ -701,6 +922,7 @@ class SnapshotResource(SnapshotResourceBase):
         output = self.nas.execute(cmd, timeout=LISTING_TIMEOUT)
         return output
 
+    @invalidates_list('cache')
     def create(self, name, filesystem, cache):
         """ Creates a snapshot (rollback) on SFS server given a snapshot name,
         file system name and a cache object name. In case of failures it raises
@@ -709,24 +931,20 @@ class SnapshotResource(SnapshotResourceBase):
         snaptype = 'space-optimized'
         cmd = "storage rollback create %s %s %s %s" % (snaptype, name,
                                                        filesystem, cache)
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(cmd, timeout=CREATION_TIMEOUT)
         except NasExecCommandException, err:
             msg = "Snapshot creation failed: %s Command: %s" % (str(err), cmd)
-            if self.already_exists_regex.search(str(err)):
-                raise Snapshot.AlreadyExists(msg)
-            if self.fs_not_exist_regex.search(str(err)):
-                raise FileSystem.DoesNotExist(msg)
-            if self.cache_not_exist_regex.search(str(err)):
-                raise Cache.DoesNotExist(msg)
-            if self.fsck_failed_regex.search(str(err)):
+            error, exception = self.create_errors.classify(str(err))
+            if error == 'fsck_failed':
                 cache_obj = self.nas.cache.get(cache)
                 if not cache_obj.available:
                     msg = 'Failed to create the snapshot "%s" for the file ' \
                           'system "%s" because the cache "%s" is full. ' \
                           '%s' % (name, filesystem, cache, msg)
-                    raise Snapshot.CreationException(msg)
-            raise Snapshot.CreationException(msg)
+                    raise exception(msg)
+            raise exception(msg)
         except NasExecutionTimeoutException, err:
             # maybe the SSH connection was dropped and would be worth to check
             # whether the snapshot (Rollback) was created or not
@@ -735,11 +953,13 @@ class SnapshotResource(SnapshotResourceBase):
         return self._build_nas_object(name=name, filesystem=filesystem,
                                       cache=cache, snaptype=snaptype)
 
+    @invalidates_list('cache')
     def delete(self, name, filesystem):
         """ Deletes a SFS snapshot given a snapshot name and fs name.
         In case of failures it raises a Snapshot.DeletionException.
         """
         cmd = "storage rollback destroy {0} {1}".format(name, filesystem)
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(cmd, timeout=DELETION_TIMEOUT)
         except NasExecCommandException, err:
@@ -748,13 +968,14 @@ class SnapshotResource(SnapshotResourceBase):
                                "sfs error message: %s" % err)
                 self.nas.execute('storage fs destroy %s' % name)
                 self.nas.debug("rollback deleted successfully")
-            if self.destroy_failed_restore_ongoing_regex.search(str(err)):
+            error, exception = self.delete_errors.classify(str(err))
+            if error == 'restore_ongoing':
                 msg = "Snapshot deletion failed: %s. Unable to destroy " \
                       "snapshot while restore snapshot " \
                       "process is in progress. Command: %s" % (err, cmd)
-                raise Snapshot.RollsyncRunning(msg)
+                raise exception(msg)
             msg = "Snapshot deletion failed: %s. Command: %s" % (str(err), cmd)
-            if self.destroy_failed_online_regex.search(str(err)):
+            if 'online' in self.delete_errors.matches(str(err)):
                 self.nas.warn('Attempting to offline the snapshot "%s" before '
                             'deleting it. SFS error message: %s' % (name, msg))
                 cmd_offline = "storage rollback offline %s" % name
@@ -769,20 +990,18 @@ class SnapshotResource(SnapshotResourceBase):
                     self.nas.execute(cmd, timeout=CREATION_TIMEOUT)
                     return
                 except NasExecCommandException, err:
-                    # just pass to try to get the errors below
-                    pass
-            if self.fs_not_exist_regex.search((str(err))):
-                raise FileSystem.DoesNotExist(msg)
-            if (self.sfshf3_snapshot_not_exist_regex.search(str(err)) or
-                    self.sfsmp1p3_snapshot_not_exist_regex.search(str(err))):
-                raise Snapshot.DoesNotExist(msg)
-            raise Snapshot.DeletionException(msg)
+                    # classify the error of the second attempt below
+                    error, exception = self.delete_errors.classify(str(err))
+                    if error == 'restore_ongoing':
+                        exception = Snapshot.DeletionException
+            raise exception(msg)
         except NasExecutionTimeoutException, err:
             # maybe the SSH connection was dropped and would be worth to check
             # whether the snapshot (Rollback) was deleted or not
             if self.exists(name):
                 raise err
 
+    @invalidates_list('filesystem')
     def restore(self, name, filesystem):
         """ Restores the file system given a snapshot name and the file system.
         In SFS, to restore a file system, 3 steps are needed:
@@ -811,14 +1030,15 @@ class SnapshotResource(SnapshotResourceBase):
         # step 2: restore the file system
         restore_cmd = "storage rollback restore %s %s" % (filesystem, name)
         env = dict(SNAPSHOT_RESTORE_CONFIRM='YES')
+        self.nas.vxprint_snapshot.invalidate()
         try:
             self.nas.execute(restore_cmd, timeout=CREATION_TIMEOUT, env=env)
         except NasExecCommandException as err:
             msg = base_err % ("%s. Command: %s" % (str(err), restore_cmd))
-            if self.restore_failed1_regex.search(str(err)) or \
-               self.restore_failed2_regex.search(str(err)):
+            errors = self.restore_errors.matches(str(err))
+            if 'restore_failed' in errors:
                 # check first whether a restore is currently being executed
-                if (self.restore_ongoing_regex.search(str(err)) or
+                if ('restore_ongoing' in errors or
                         self.nas.filesystem.is_restore_running(filesystem)):
                     # If the restore failed because the rollsync task was
                     # running, and we try to  online the file system before
@@ -831,12 +1051,8 @@ class SnapshotResource(SnapshotResourceBase):
                     raise Snapshot.RollsyncRunning(msg)
             # try to bring the file system back again
             try_online()
-            if self.fs_not_exist_regex.search(str(err)):
-                raise FileSystem.DoesNotExist(msg)
-            if (self.sfshf3_snapshot_not_exist_regex.search(str(err)) or
-                    self.sfsmp1p3_snapshot_not_exist_regex.search(str(err))):
-                raise Snapshot.DoesNotExist(msg)
-            raise Snapshot.RestoreException(msg)
+            _, exception = self.restore_errors.classify(str(err))
+            raise exception(msg)
 
         # step 3: online the file system back
         try:
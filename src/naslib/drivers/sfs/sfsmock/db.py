@@ -29,6 +29,9 @@ class SfsMockDb(MockDb):
     """
 
     clish_strip_cmd_regex = re.compile(r".*-c\s+'(.*)'$")
+    batch_cmd_regex = re.compile(r"(.*?); printf '\\n%s %d\\n' \"(\S+)\" "
+                                 r"\$\?; printf '\\n%s\\n' \"\2\" 1>&2"
+                                 r"(?:; |$)")
 
     def prepare_command(self, cmd):
         """ Basically removes prefixes from a command that won't be useful for
@@ -53,6 +56,12 @@ class SfsMockDb(MockDb):
             return 0, "Username      : master\nPrivileges    : Master", ""
         return None, None, None
 
+    def batch_commands(self, cmd):
+        """ Splits the commands of a Sfs.execute_batch() execution.
+        """
+        super(SfsMockDb, self).batch_commands(cmd)
+        return self.batch_cmd_regex.findall(cmd) or None
+
     def error_message(self, resource, err):
         """ Overrides the base method to provide an error message in the SFS
         specific format.
@@ -12,12 +12,17 @@ VxCommands class that provides some util methods for the commands mentioned.
 """
 
 import re
+import time
 
 from ...log import NasLogger
+from ...nasexceptions import NasExecCommandException
 from .parsers import VxPrintOutput, VxPropertiesOutputParser, \
                      VxGenericListOutput
 
 
+VXPRINT_SNAPSHOT_TTL = 30  # seconds
+
+
 class VxCommandsException(Exception):
     pass
 
@@ -27,6 +32,9 @@ class VxCommands(object):
     """
     logger = NasLogger.instance()
     align_regex = re.compile(r"(\d+)\s+\(bytes\)")
+    vxprint_cmd = ("vxprint -hrAF sd:'%type %name %assoc %kstate %len "
+                   "%column_pl_offset %state %tutil0 %putil0 %device'")
+    vxdisk_listtag_cmd = 'vxdisk listtag'
 
     def __init__(self, nas):
         """ This constructor sets the main nas instance.
@@ -57,6 +65,19 @@ class VxCommands(object):
         of errors.
         """
         _, out, err = self.nas.ssh.run(cmd)
+        return self._check_output(cmd, out, err)
+
+    def execute_many(self, cmds):
+        """ Executes several independent "vx*" commands at the same time,
+        each one through its own channel of the SSH connection, and returns
+        their outputs in the same order. The proper exception is raised for
+        the first command that failed.
+        """
+        results = self.nas.ssh.run_many(cmds)
+        return [self._check_output(cmd, out, err)
+                for cmd, (_, out, err) in zip(cmds, results)]
+
+    def _check_output(self, cmd, out, err):
         if err:
             msg = 'ERROR while trying to execute command "%s": %s' % (cmd, err)
             self.debug(msg)
@@ -65,6 +86,25 @@ class VxCommands(object):
             self.debug("executed %s command successfully" % cmd)
         return out
 
+    def execute_stream(self, cmd):
+        """ Executes a "vx*" command yielding the output lines as they arrive.
+        The proper exception is raised once the whole output is consumed in
+        case of errors.
+        """
+        errors = []
+        try:
+            for line in self.nas.ssh.run_stream(cmd, stderr=errors):
+                yield line
+        except NasExecCommandException, err:
+            if not errors:
+                errors.append(str(err) or "non-zero exit status")
+        if errors:
+            msg = 'ERROR while trying to execute command "%s": %s' % (cmd,
+                                                           '\n'.join(errors))
+            self.debug(msg)
+            raise VxCommandsException(msg)
+        self.debug("executed %s command successfully" % cmd)
+
     def execute_cmd(self, cmd):
         """ Executes a shell command and raises the proper exception in case
         of errors.
@@ -107,7 +147,7 @@ class VxCommands(object):
     def vdisk_listtag(self):
         """ Retrieves information data  that associates disks to tags (Pools).
         """
-        out = self.execute('vxdisk listtag')
+        out = self.execute(self.vxdisk_listtag_cmd)
         parser = VxGenericListOutput(out, 'device')
         return parser.parse()
 
@@ -124,21 +164,22 @@ class VxCommands(object):
         parser = VxPrintOutput(out)
         return parser.parse()
 
-    def vxprint(self, fs_name=""):
+    def vxprint(self, fs_name="", records=False):
         """ Retrieves all information from a file system in SFS through the
         vxprint command. If fs_name is an empty string, retrieves all
-        all file systems' information.
+        all file systems' information. If records is True, the rows are
+        parsed as compact VxRecord objects instead of dicts.
         """
-        out = self.execute(
-            "vxprint -hrAF sd:'%type %name %assoc %kstate %len "
-            "%column_pl_offset %state %tutil0 %putil0 %device'{0}".
-            format(" " + fs_name if fs_name else ""))
-        parser = VxPrintOutput(out)
+        lines = self.execute_stream(self._vxprint_cmd(fs_name))
+        parser = VxPrintOutput(lines, records=records)
         data = parser.parse()
         if fs_name:
             return data[fs_name]
         return data
 
+    def _vxprint_cmd(self, fs_name=""):
+        return "%s%s" % (self.vxprint_cmd, " " + fs_name if fs_name else "")
+
     def cache_grow(self, name, size):
         """ Perform Volume Manager cache grow size.
         """
@@ -152,21 +193,52 @@ class VxCommands(object):
         gets the vx tags (pools) related.
         """
         self.debug('Running get_pools_disks_from_object for "%s"' % name)
-        data = self.vxprint(name)
+        # both commands are independent, so they run at the same time
+        vxprint_out, listtag_out = self.execute_many(
+            [self._vxprint_cmd(name), self.vxdisk_listtag_cmd])
+        data = VxPrintOutput(vxprint_out).parse()[name]
         self.debug('vxprint data for "%s": %s' % (name, data))
-        # This is the case for filesystems and cache objects on NAS server
-        if 'sd' in data:
-            disks = [sd['device'] for sd in data['sd']]
-        # This is the case for snapshots objects on NAS server
-        elif 'sd' in data['dc']:
-            disks = [sd['device'] for sd in data['dc']['sd']]
+        disks = self._get_object_disks(data)
         self.debug('disks for "%s": %s' % (name, disks))
-        disks_pools = self.vdisk_listtag()
+        disks_pools = VxGenericListOutput(listtag_out, 'device').parse()
         self.debug('disks_pools for "%s": %s' % (name, disks_pools))
         pools = list(set([disks_pools[d]['value'] for d in disks]))
         self.debug('pools for "%s": %s' % (name, pools))
         return disks, pools
 
+    def get_pools_disks_for_objects(self, names=None, vxprint_data=None):
+        """ Retrieves the list of disks and pools used by every SFS/VA object
+        (file system, cache, snapshot), or just by the given object names,
+        parsing a single full vxprint output, or the given "vxprint_data",
+        and a single "vxdisk listtag" output. Returns a dict of tuples
+        (disks, pools) by object name. The objects which the disks or pools
+        can't be parsed for are not included.
+        """
+        data = self.vxprint() if vxprint_data is None else vxprint_data
+        disks_pools = self.vdisk_listtag()
+        pools_disks = {}
+        for name in data.keys() if names is None else names:
+            try:
+                disks = self._get_object_disks(data[name])
+                pools = list(set([disks_pools[d]['value'] for d in disks]))
+            except (KeyError, TypeError) as err:
+                self.debug('Could not get the disks and pools of "%s": %s' %
+                           (name, err))
+                continue
+            pools_disks[name] = (disks, pools)
+        return pools_disks
+
+    @staticmethod
+    def _get_object_disks(data):
+        """ Retrieves the disks from the 'sd' (subdisks) values of the vxprint
+        data of an object.
+        """
+        # This is the case for filesystems and cache objects on NAS server
+        if 'sd' in data:
+            return [sd['device'] for sd in data['sd']]
+        # This is the case for snapshots objects on NAS server
+        return [sd['device'] for sd in data['dc']['sd']]
+
     def get_pool_by_cache(self, name):
         """ Retrieves a single pool associated to the given cache object.
 
@@ -176,3 +248,124 @@ class VxCommands(object):
         from the list.
         """
         return self.get_pools_disks_from_object(name)[1][0]
+
+
+class VxPrintSnapshot(object):
+    """ Parsed output of a full "vxprint" command shared by all the objects
+    of a NAS connection. The command is run once and its data is re-used for
+    "ttl" seconds or until invalidate() is called, which must be done after
+    any change of the volumes in the NAS server (e.g.: creating, resizing or
+    deleting a file system).
+    """
+
+    def __init__(self, nas, ttl=VXPRINT_SNAPSHOT_TTL):
+        self.vx = VxCommands(nas)
+        self.ttl = ttl
+        self._data = None
+        self._timestamp = None
+        self._pools_disks = None
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> VxPrintSnapshot("<Some NasBase object>")
+        <VxPrintSnapshot>
+        """
+        return "<%s>" % self.__class__.__name__
+
+    @property
+    def data(self):
+        """ Returns the vxprint data as VxCommands.vxprint(records=True) does,
+        running the command only if there's no valid snapshot. As the
+        snapshot is kept for a long time, its rows are compact VxRecord
+        objects, which SfsFileSystem.properties converts back to dicts.
+        """
+        if self._data is None or time.time() - self._timestamp > self.ttl:
+            self._data = self.vx.vxprint(records=True)
+            self._timestamp = time.time()
+        return self._data
+
+    @property
+    def pools_disks(self):
+        """ Returns the disks and pools of every object as
+        VxCommands.get_pools_disks_for_objects() does, based on the current
+        snapshot, so only "vxdisk listtag" is run again for a new snapshot.
+        """
+        data = self.data
+        if self._pools_disks is None or self._pools_disks[0] is not data:
+            pools_disks = self.vx.get_pools_disks_for_objects(
+                vxprint_data=data)
+            self._pools_disks = (data, pools_disks)
+        return self._pools_disks[1]
+
+    def get_pool(self, name):
+        """ Returns the first pool of the given object from pools_disks, or
+        None if it has no pools. A new snapshot is taken once if the object
+        isn't in the current one, as it might have been created after it.
+        Raises KeyError if the object isn't found anyway.
+        """
+        if name not in self.pools_disks:
+            self.invalidate()
+        pools = self.pools_disks[name][1]
+        return pools[0] if pools else None
+
+    def invalidate(self):
+        """ Discards the current snapshot.
+        """
+        self._data = None
+        self._pools_disks = None
+
+
+class DiskGroupAlignments(object):
+    """ Map of the alignment sizes of the disk groups shared by all the
+    objects of a NAS connection. As the alignment is a property of the disk
+    group, "vxdisk list" is run once per disk and "vxdg -q list" once per
+    disk group during the whole session, instead of for every file system.
+    """
+
+    def __init__(self, nas):
+        self.vx = VxCommands(nas)
+        self._groups = {}
+        self._alignments = {}
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> DiskGroupAlignments("<Some NasBase object>")
+        <DiskGroupAlignments>
+        """
+        return "<%s>" % self.__class__.__name__
+
+    def get(self, disk):
+        """ Returns the alignment size in bytes of the disk group of the given
+        disk or None if it can't be parsed from the disk group properties.
+        Raises VxCommandsException in case of failures running the commands.
+        """
+        group_id = self._groups.get(disk)
+        if group_id is None:
+            group_id = self.vx.get_disk_group_id(disk)
+            self._groups[disk] = group_id
+        if group_id not in self._alignments:
+            self.vx.debug("Getting the %s disk group properties" % group_id)
+            props = self.vx.get_group_properties(group_id)
+            self._alignments[group_id] = self._parse_alignment(group_id,
+                                                               props)
+        return self._alignments[group_id]
+
+    def _parse_alignment(self, group_id, props):
+        if 'alignment' not in props:
+            self.vx.debug("Error while trying get the alignment size from "
+                          "%s disk group properties." % group_id)
+            return None
+        self.vx.debug("Parsing the alignment %s" % props['alignment'])
+        alignment_str = "%s %s" % tuple(props['alignment'])
+        match = self.vx.align_regex.match(alignment_str)
+        if not match:
+            self.vx.debug("Error while trying to parse the alignment size "
+                          "of %s disk group." % group_id)
+            return None
+        return int(match.groups()[0])
+
+    def clear(self):
+        """ Discards all the disk groups information.
+        """
+        self._groups.clear()
+        self._alignments.clear()
@@ -18,7 +18,9 @@ from ..sfs.resources import CacheResource as SfsCacheResource
 from ..sfs.resources import SnapshotResource as SfsSnapshotResource
 from ..sfs.resources import LISTING_TIMEOUT
 from ...drivers.va.objects import VaFileSystem
-from ...objects import Pool, FileSystem
+from ...errorclassifier import ErrorClassifier
+from ...listcache import cached_list
+from ...objects import Pool, FileSystem, Snapshot
 from ...nasexceptions import NasUnexpectedOutputException
 from ..sfs.utils import VxCommands, VxCommandsException
 from ..sfs.parsers import VxPropertiesOutputParser
@@ -26,38 +28,32 @@ from ..sfs.parsers import VxPropertiesOutputParser
 
 class ShareResource(SfsShareResource):
 
-    def create(self, path, client, options):
+    def _options_str(self, options):
+        """ Overrides the base method to always add the "nordirplus" option.
+        """
         ops = set(options if hasattr(options, '__iter__')
                           else options.split(','))
         ops.add('nordirplus')
-        return super(ShareResource, self).create(path, client, ops)
+        return ','.join(ops)
 
     def _build_shares_list(self, lines, faulted_shares_lines):
         """ Helper to build a list of Shares objects based on the
         defined "display_regex" as a regular expression for each line of
         the output of NFS and also checks the Faulted Shares.
         """
-        faulted = []
-        for line in faulted_shares_lines:
-            if not line.strip():
-                continue
-            match = self.faulted_shares_regex.match(line)
-            if not match:
-                raise NasUnexpectedOutputException('It\'s not possible to '
-                    'parse the output of faulted shares received from %s. '
-                    'Line output: "%s".' % (str(self.nas), line))
-            faulted.append(self.faulted_match_format % match.groupdict())
+        faulted = self._faulted_shares(faulted_shares_lines)
         obj_list = []
         va_fix_regex = r"^(?P<name>[/\w:-]+)\s+(?P<client>[\d\.\*/]+)" \
                         r"\s*(\((?P<options>[\w,]+)\))*$"
         line_start = ""
+        parser = self._display_parser()
         for line in [i.strip() for i in lines if i]:
             if line_start != "":
                 line = line_start + " " + line
                 line_start = ""
-            if self.display_regex.match(line):
-                data = self.parse_displayed_line(line)
-                data['faulted'] = (self.faulted_match_format % data) in faulted
+            data = parser.parse(line)
+            if data is not None:
+                data['faulted'] = (data['name'], data['client']) in faulted
                 if data['client'] == "*":
                     data['client'] = ""
                 obj_list.append(self._build_nas_object(**data))
@@ -70,7 +66,7 @@ class ShareResource(SfsShareResource):
                                                    ' from %s. Line output: '
                                                    '"%s".' % (str(self.nas),
                                                               line))
-        return obj_list
+        return self._indexed(obj_list)
 
 
 class FileSystemResource(SfsFileSystemResource):
@@ -87,15 +83,16 @@ class FileSystemResource(SfsFileSystemResource):
     already_offline_regex = re.compile(
         r".*Filesystem\s+[-\w]+\s+is\s+already\s+offline.*")
 
-    def _check_create_errors(self, err, msg):
-        if self.invalid_pool_regex.search(str(err)):
-            raise Pool.DoesNotExist(msg)
-        if self.isa_already_exists_regex.search(str(err)):
-            raise FileSystem.AlreadyExists(msg)
-        if self.insufficient_space_regex.search(str(err)):
-            raise FileSystem.InsufficientSpaceException(msg)
-        raise FileSystem.CreationException(msg)
+    create_errors = ErrorClassifier([
+        ('invalid_pool', SfsFileSystemResource.invalid_pool_regex,
+         Pool.DoesNotExist),
+        ('already_exists', isa_already_exists_regex,
+         FileSystem.AlreadyExists),
+        ('insufficient_space', SfsFileSystemResource.insufficient_space_regex,
+         FileSystem.InsufficientSpaceException),
+    ], FileSystem.CreationException)
 
+    @cached_list
     def list(self):
         """ Returns a list of FileSystems resources items retrieved by ISA
         server.
@@ -179,5 +176,19 @@ class SnapshotResource(SfsSnapshotResource):
                                        r"failed\s+as\s+rollback\s+sync\s+is\s+"
                                        r"in\s+progress\s+for\s+[-\w]+.*")
 
+    restore_errors = ErrorClassifier([
+        ('restore_failed', SfsSnapshotResource.restore_failed1_regex, None),
+        ('restore_failed', SfsSnapshotResource.restore_failed2_regex, None),
+        ('restore_ongoing', restore_ongoing_regex, None),
+        ('fs_not_exist', SfsSnapshotResource.fs_not_exist_regex,
+         FileSystem.DoesNotExist),
+        ('snapshot_not_exist',
+         SfsSnapshotResource.sfshf3_snapshot_not_exist_regex,
+         Snapshot.DoesNotExist),
+        ('snapshot_not_exist',
+         SfsSnapshotResource.sfsmp1p3_snapshot_not_exist_regex,
+         Snapshot.DoesNotExist),
+    ], Snapshot.RestoreException)
+
     def _get_snapshots(self, output):
         return self._build_nas_object_list(output[2:])
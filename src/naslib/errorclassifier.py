@@ -0,0 +1,99 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the ErrorClassifier class, a declarative table of
+the error messages of a NAS command failure, compiled once, so every error
+text is classified by the same ordered rules and str(err) is built once.
+"""
+
+import re
+
+
+class ErrorClassifier(object):
+    """ Classifies an error text given a list of rules (name, regex,
+    exception), in priority order. The regex can be either a string or a
+    compiled regular expression, which keeps its own flags, groups and
+    backreferences. The rules having None as the exception are only reported
+    by matches(), so the caller can handle them.
+
+    The rules are searched one by one instead of being merged into a single
+    alternation: merging needs the same flags and no backreferences across
+    the rules, and the re module can't skip ahead on the literal prefix of
+    an alternation, so it was about twice as slow on the SFS tables.
+
+    >>> classifier = ErrorClassifier([
+    ...     ('not_exist', r".*File\\s+system\\s+[-\\w]+\\s+does\\s+not\\s+exist",
+    ...      KeyError),
+    ...     ('in_progress', re.compile(r".*(?P<name>[-\\w]+)\\s+in\\s+progress"),
+    ...      None),
+    ...     ('full', r".*cache\\s+is\\s+full", OSError)], ValueError)
+    >>> classifier.classify("ERROR: File system fs1 does not exist.")
+    ('not_exist', <type 'exceptions.KeyError'>)
+    >>> classifier.classify("restore in progress\\nERROR: cache is full")
+    ('full', <type 'exceptions.OSError'>)
+    >>> classifier.classify("ERROR: restore in progress")
+    (None, <type 'exceptions.ValueError'>)
+    >>> sorted(classifier.matches("restore in progress\\ncache is full"))
+    ['full', 'in_progress']
+    >>> classifier.matches("unknown error")
+    set([])
+    >>> classifier = ErrorClassifier([
+    ...     ('repeated', r"(?P<word>\\w+) (?P=word)", KeyError),
+    ...     ('error', r"ERROR", IOError),
+    ...     ('failed', re.compile(r"failed", re.I), OSError)])
+    >>> classifier.classify("error: FAILED")
+    ('failed', <type 'exceptions.OSError'>)
+    >>> classifier.classify("failed failed")
+    ('repeated', <type 'exceptions.KeyError'>)
+    """
+
+    def __init__(self, rules, default=None):
+        self.rules = [(name, self._compile(regex), exception)
+                      for name, regex, exception in rules]
+        self.default = default
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> ErrorClassifier([('a', 'a', KeyError), ('b', 'b', None)])
+        <ErrorClassifier rules=2>
+        """
+        return "<%s rules=%s>" % (self.__class__.__name__, len(self.rules))
+
+    @staticmethod
+    def _compile(regex):
+        """ Compiles the pattern of a rule with its own flags. The leading
+        ".*" is removed, as it can match an empty string, so a search finds
+        the same errors without backtracking from every position.
+
+        >>> ErrorClassifier._compile(r".*restore\\s+(?P<name>\\w+)").pattern
+        'restore\\\\s+(?P<name>\\\\w+)'
+        """
+        flags = 0
+        if hasattr(regex, 'pattern'):
+            regex, flags = regex.pattern, regex.flags
+        if regex.startswith('.*') and not regex.startswith('.*?'):
+            regex = regex[2:]
+        return re.compile(regex, flags)
+
+    def classify(self, text):
+        """ Returns a tuple (name, exception) of the first rule, having an
+        exception, that matches the given error text, or (None, default) if
+        none of them matches.
+        """
+        for name, regex, exception in self.rules:
+            if exception is not None and regex.search(text):
+                return name, exception
+        return None, self.default
+
+    def matches(self, text):
+        """ Returns the set of names of all the rules that match the given
+        error text.
+        """
+        return set([name for name, regex, _ in self.rules
+                    if regex.search(text)])
@@ -0,0 +1,156 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the ResourceListCache class, an opt-in cache of the
+results of the list() method of the NAS resources of a connection, and the
+decorators used by the drivers to fill it and to invalidate it on changes.
+"""
+
+import copy
+import functools
+import threading
+import time
+
+
+class ResourceListCache(object):
+    """ Keeps the list() results by resource name for "ttl" seconds. It's
+    disabled while "ttl" is None, which is the default. It can be shared by
+    the resources methods running concurrently, e.g. through
+    UnityXT.map(), so a list taken before an invalidation of its name isn't
+    cached after it.
+
+    >>> cache = ResourceListCache()
+    >>> cache.enabled
+    False
+    >>> cache.ttl = 60
+    >>> cache.set('filesystem', ['fs1', 'fs2'])
+    >>> cache.get('filesystem')
+    ['fs1', 'fs2']
+    >>> cache.get('share') is None
+    True
+    >>> cache.invalidate('filesystem', 'share')
+    >>> cache.get('filesystem') is None
+    True
+    >>> cache.set('share', [])
+    >>> cache.clear()
+    >>> cache.get('share') is None
+    True
+    >>> version = cache.version('share')
+    >>> cache.invalidate('share')
+    >>> cache.set('share', ['outdated'], version)
+    >>> cache.get('share') is None
+    True
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._entries = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> ResourceListCache(30)
+        <ResourceListCache ttl=30>
+        """
+        return "<%s ttl=%s>" % (self.__class__.__name__, self.ttl)
+
+    @property
+    def enabled(self):
+        """ Checks whether the lists are cached, i.e. "ttl" is set.
+        """
+        return self.ttl is not None
+
+    def get(self, name):
+        """ Returns a copy of the cached list of the given resource name or
+        None if there's no valid entry.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or not self.enabled:
+                return None
+            timestamp, objects = entry
+            if time.time() - timestamp > self.ttl:
+                self._entries.pop(name, None)
+                return None
+        return copy.copy(objects)
+
+    def version(self, name):
+        """ Returns the number of invalidations of the given resource name,
+        to be given to set() along with the list taken after it.
+        """
+        with self._lock:
+            return self._versions.get(name, 0)
+
+    def set(self, name, objects, version=None):
+        """ Caches the list of the given resource name, unless it was
+        invalidated after the given version, as the list might be outdated.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is None or version == self._versions.get(name, 0):
+                self._entries[name] = (time.time(), copy.copy(objects))
+
+    def invalidate(self, *names):
+        """ Discards the cached lists of the given resource names.
+        """
+        with self._lock:
+            for name in names:
+                self._entries.pop(name, None)
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self):
+        """ Discards all the cached lists.
+        """
+        with self._lock:
+            for name in self._entries:
+                self._versions[name] = self._versions.get(name, 0) + 1
+            self._entries.clear()
+
+
+def cached_list(method):
+    """ Decorator for the list() method of a resource, so its result is
+    cached in the list_cache of the NAS object, if enabled.
+    """
+    @functools.wraps(method)
+    def wrapper(self):
+        cache = getattr(self.nas, 'list_cache', None)
+        if cache is None or not cache.enabled:
+            return method(self)
+        name = self._base_attr_name  # pylint: disable=I0011,W0212
+        objects = cache.get(name)
+        if objects is None:
+            version = cache.version(name)
+            objects = method(self)
+            cache.set(name, objects, version)
+        return objects
+    return wrapper
+
+
+def invalidates_list(*names):
+    """ Decorator for the methods of a resource that change the NAS server,
+    so the cached lists of the resource itself and of the given resource
+    names are discarded, before and after the change.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self.nas, 'list_cache', None)
+            if cache is None:
+                return method(self, *args, **kwargs)
+            # pylint: disable=I0011,W0212
+            invalid = (self._base_attr_name,) + names
+            cache.invalidate(*invalid)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                cache.invalidate(*invalid)
+        return wrapper
+    return decorator
@@ -44,7 +44,7 @@ class NasConnectionMock(NasConnection):
 
     def __init__(self,  host, username, password=None, port=22,
                  stash=False, output=None, mock_connection_failure=False,
-                 driver_name=None, nas_type='veritas'):
+                 driver_name=None, nas_type='veritas', list_cache_ttl=None):
         """ It just includes the stash attribute for testing porpuses.
         """
         super(NasConnectionMock, self).__init__(
@@ -52,7 +52,8 @@ class NasConnectionMock(NasConnection):
             username,
             password,
             port,
-            nas_type=nas_type
+            nas_type=nas_type,
+            list_cache_ttl=list_cache_ttl
         )
 
         self.stash = stash
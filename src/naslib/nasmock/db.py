@@ -202,6 +202,14 @@ class MockDb(object):
         """
         return None, None, None
 
+    def batch_commands(self, cmd):  # pylint: disable=I0011,W0613
+        """ This method can be overridden by the subclass to split a command
+        that runs several commands in a single execution. It must return a
+        list of tuples (command, delimiter) or None if "cmd" is a single
+        command.
+        """
+        return None
+
     def error_message(self, resource, err):
         """ This method might be overridden by the sub-class to return
         the correct formatted message given a resource and the error exception
@@ -17,6 +17,7 @@ file, please refer to MockDb documentation for more details.
 
 import socket
 
+from ..nasexceptions import NasExecCommandException
 from ..ssh import SSHClient
 from .mockexceptions import MockException
 
@@ -93,6 +94,10 @@ class SshClientMock(SSHClient):
             self.exception = None
             raise exception  # pylint: disable=I0011,E0702
 
+        batch = self.mock_db.batch_commands(cmd) if self.mock_db else None
+        if batch:
+            return self._run_batch(batch, timeout)
+
         # forcing output mocking feature
         if self.output is not None and self.cmd_regex.search(cmd):
             return 0, self.output, self.error
@@ -108,6 +113,33 @@ class SshClientMock(SSHClient):
             return 0, self.mock_db.error_message(resource, err), ""
         return 0, result or "", ""
 
+    def run_stream(self, cmd, timeout=None, stderr=None):
+        """ Simulates the streaming execution yielding the lines of the output
+        retrieved by the run() method.
+        """
+        status, out, err = self.run(cmd, timeout)
+        if stderr is not None and err:
+            stderr.extend(err.splitlines())
+        for line in (out or "").splitlines():
+            yield line
+        if status != 0:
+            raise NasExecCommandException(err)
+
+    def _run_batch(self, batch, timeout=None):
+        """ Simulates the remote shell running several commands, each one
+        followed by its delimiter in both stdout and stderr.
+        """
+        out, err = [], []
+        for cmd, delimiter in batch:
+            try:
+                status, cmd_out, cmd_err = self.run(cmd, timeout)
+            except NasExecCommandException, exc:
+                # the remote shell carries on with the next commands
+                status, cmd_out, cmd_err = 1, "", str(exc)
+            out.append("%s\n%s %s\n" % (cmd_out or "", delimiter, status))
+            err.append("%s\n%s\n" % (cmd_err or "", delimiter))
+        return 0, "".join(out), "".join(err)
+
     def connect(self):
         """ Mocks the connect method of ssh.SSHClient.
         """
@@ -122,6 +154,11 @@ class SshClientMock(SSHClient):
         """
         return self._is_connected
 
-    def close(self):
+    def host_key_fingerprint(self):
+        """ Mocks the fingerprint of the remote host key.
+        """
+        return "mock"
+
+    def close(self, discard=False):  # pylint: disable=I0011,W0613
         """ Mocks the close connection method of ssh.SSHClient.
         """
@@ -29,6 +29,7 @@ class Share(NasObject, ExclusiveExceptions):
     """ NasObject class to abstract Share instances of a NAS.
     """
     identifier_keys = ('name', 'client')
+    index_keys = ('name',)
 
     def __init__(self, resource, name, client, options, faulted=False):
         """ The NAS Share object also has a client and options as basic
@@ -150,6 +151,8 @@ class Snapshot(NasObject, ExclusiveExceptions):
     class RollsyncRunning(NasException):
         pass
 
+    index_keys = ('filesystem',)
+
     def __init__(self, resource, name, filesystem, cache=None,
                  snaptype=None, date=None):
         """ The NAS Snapshot object has a name, file system and a cache
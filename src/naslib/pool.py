@@ -0,0 +1,176 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the ConnectionPool class, the process-wide pool of
+idle connections shared by the SSH clients and the Unity REST sessions, and
+the credential_fingerprint() helper used to build their keys.
+"""
+
+import atexit
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from .log import NasLogger
+
+# secret of this process only, so the credentials in the pool keys can't be
+# recovered from a memory dump by brute force
+_POOL_KEY_SECRET = os.urandom(32)
+
+
+def credential_fingerprint(password):
+    """ Returns a HMAC of the password keyed by a secret of this process
+    only, to be kept in the pool keys instead of the password itself.
+
+    >>> fingerprint = credential_fingerprint("password")
+    >>> fingerprint == credential_fingerprint(u"password")
+    True
+    >>> credential_fingerprint("password") == credential_fingerprint("other")
+    False
+    """
+    password = password or ""
+    if isinstance(password, unicode):
+        password = password.encode('utf-8')
+    return hmac.new(_POOL_KEY_SECRET, password, hashlib.sha256).hexdigest()
+
+
+class ConnectionPool(object):
+    """ Process-wide pool of idle connections by key, so a new connection
+    context to the same server re-uses a live connection instead of opening
+    a new one. The connections are kept idle for at most "idle_timeout"
+    seconds, closed by a timer once they expire, and no more than "max_size"
+    idle connections are kept at any time; the oldest ones are closed first.
+    The connections only need a close() method.
+
+    >>> pool = ConnectionPool(max_size=2, idle_timeout=60)
+    >>> pool.acquire("key") is None
+    True
+    >>> class Client(object):
+    ...     def close(self):
+    ...         print "closed"
+    ...
+    >>> client = Client()
+    >>> pool.release("key", client)
+    >>> len(pool)
+    1
+    >>> pool.acquire("key") is client
+    True
+    >>> len(pool)
+    0
+    >>> for _ in range(3):
+    ...     pool.release("key", Client())
+    ...
+    closed
+    >>> len(pool)
+    2
+    >>> pool.clear()
+    closed
+    closed
+    """
+    logger = NasLogger.instance()
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_size, idle_timeout):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def __len__(self):
+        return len(self._idle)
+
+    @classmethod
+    def instance(cls):
+        """ Retrieves the process-wide pool of this class, whose idle
+        connections are closed when the process exits.
+        """
+        if cls.__dict__.get('_instance') is None:
+            with cls._instance_lock:
+                if cls.__dict__.get('_instance') is None:
+                    cls._instance = cls()
+                    atexit.register(cls._instance.clear)
+        return cls._instance
+
+    def acquire(self, key):
+        """ Takes an idle connection for the given key out of the pool, or
+        returns None if there is none. The caller is responsible for checking
+        the connection is still alive.
+        """
+        with self._lock:
+            expired = self._pop_expired()
+            client = None
+            for index, (entry_key, entry_client, _) in enumerate(self._idle):
+                if entry_key == key:
+                    client = entry_client
+                    del self._idle[index]
+                    break
+        self._close_all(expired)
+        return client
+
+    def release(self, key, client):
+        """ Gives a connection back to the pool to be re-used later.
+        """
+        with self._lock:
+            self._idle.append((key, client, time.time()))
+            expired = self._pop_expired()
+            while len(self._idle) > self.max_size:
+                expired.append(self._idle.pop(0)[1])
+            self._schedule_eviction()
+        self._close_all(expired)
+
+    def clear(self):
+        """ Closes all the idle connections.
+        """
+        with self._lock:
+            expired = [client for _, client, _ in self._idle]
+            self._idle = []
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            if timer is not threading.current_thread():
+                timer.join()
+        self._close_all(expired)
+
+    def evict(self):
+        """ Closes the connections idle for longer than "idle_timeout".
+        """
+        with self._lock:
+            self._timer = None
+            expired = self._pop_expired()
+            self._schedule_eviction()
+        self._close_all(expired)
+
+    def _schedule_eviction(self):
+        """ Starts a timer to run evict() once the oldest idle connection
+        expires, unless there is one already.
+        """
+        if self._timer is not None or not self._idle:
+            return
+        delay = self._idle[0][2] + self.idle_timeout - time.time()
+        self._timer = threading.Timer(max(delay, 0) + 0.1, self.evict)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _pop_expired(self):
+        deadline = time.time() - self.idle_timeout
+        expired = [c for _, c, t in self._idle if t < deadline]
+        self._idle = [e for e in self._idle if e[2] >= deadline]
+        return expired
+
+    def _close_all(self, clients):
+        for client in clients:
+            try:
+                client.close()
+            except Exception as err:  # pylint: disable=I0011,W0703
+                self.logger.trace.debug('Error while closing an idle pooled '
+                                        'connection: %s' % err)
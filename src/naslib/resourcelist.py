@@ -0,0 +1,155 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the IndexedResourceList class, the list returned by
+the list() method of the NAS resources. It keeps hash indexes on the
+identifier keys of the NAS objects, so finding an object doesn't need to scan
+the whole list. The ShareResourceList subclass is returned for the shares.
+"""
+
+
+class IndexedResourceList(list):
+    """ A list of NasObjects that also indexes them by the "identifier_keys"
+    and by each one of the "index_keys". The indexes are built on the first
+    lookup and rebuilt after the list is modified.
+
+    >>> class Item(object):
+    ...     def __init__(self, name, client):
+    ...         self.name, self.client = name, client
+    ...     def __repr__(self):
+    ...         return "<Item %s %s>" % (self.name, self.client)
+    ...
+    >>> items = IndexedResourceList([Item('/vx/fs1', '10.0.0.1'),
+    ...                              Item('/vx/fs1', '10.0.0.2'),
+    ...                              Item('/vx/fs2', '10.0.0.1')],
+    ...                             ('name', 'client'), ('name', 'client'))
+    >>> items.find('/vx/fs1', '10.0.0.2')
+    <Item /vx/fs1 10.0.0.2>
+    >>> items.find(name='/vx/fs2', client='10.0.0.2') is None
+    True
+    >>> items.filter_by('name', '/vx/fs1')
+    [<Item /vx/fs1 10.0.0.1>, <Item /vx/fs1 10.0.0.2>]
+    >>> items.append(Item('/vx/fs2', '10.0.0.2'))
+    >>> items.find('/vx/fs2', '10.0.0.2')
+    <Item /vx/fs2 10.0.0.2>
+    >>> del items[0]
+    >>> items.filter_by('client', '10.0.0.1')
+    [<Item /vx/fs2 10.0.0.1>]
+    >>> len(items), isinstance(items, list)
+    (3, True)
+    """
+
+    def __init__(self, iterable=(), identifier_keys=('name',),
+                 index_keys=()):
+        super(IndexedResourceList, self).__init__(iterable)
+        self.identifier_keys = tuple(identifier_keys)
+        self.index_keys = tuple(index_keys)
+        self._indexes = None
+
+    def _build_indexes(self):
+        """ Builds the identifier index, keeping the first object for each
+        identifier as the linear scan does, and the secondary indexes.
+        """
+        identifiers = {}
+        indexes = dict([(k, {}) for k in self.index_keys])
+        for obj in self:
+            key = tuple([getattr(obj, k) for k in self.identifier_keys])
+            identifiers.setdefault(key, obj)
+            for index_key, index in indexes.items():
+                index.setdefault(getattr(obj, index_key), []).append(obj)
+        self._indexes = identifiers, indexes
+        return self._indexes
+
+    @property
+    def indexes(self):
+        """ Tuple of the identifier index and the dict of secondary indexes.
+        """
+        if self._indexes is None:
+            return self._build_indexes()
+        return self._indexes
+
+    def find(self, *args, **kwargs):
+        """ Returns the object given its identifier as arguments or None if
+        it's not in this list.
+        """
+        identifier = dict(zip(self.identifier_keys, args))
+        identifier.update(kwargs)
+        missing = set(self.identifier_keys) - set(identifier.keys())
+        if missing:
+            raise TypeError("Missing the following identifier(s): %s" %
+                            ', '.join(missing))
+        key = tuple([identifier[k] for k in self.identifier_keys])
+        return self.indexes[0].get(key)
+
+    def filter_by(self, key, value):
+        """ Returns the list of objects having the given value for the given
+        attribute key. The attributes not in "index_keys" are scanned.
+        """
+        index = self.indexes[1].get(key)
+        if index is None:
+            return [o for o in self if getattr(o, key) == value]
+        return list(index.get(value, []))
+
+
+class ShareResourceList(IndexedResourceList):
+    """ The IndexedResourceList of the shares, which also gives the clients
+    of each path from the index of the "name" key, so the NFS exports can be
+    reconciled without scanning the list for each path.
+
+    >>> class Item(object):
+    ...     def __init__(self, name, client):
+    ...         self.name, self.client = name, client
+    ...
+    >>> shares = ShareResourceList([Item('/vx/fs1', '10.0.0.1'),
+    ...                             Item('/vx/fs1', '10.0.0.2'),
+    ...                             Item('/vx/fs2', '10.0.0.1')],
+    ...                            ('name', 'client'), ('name',))
+    >>> shares.clients('/vx/fs1')
+    ['10.0.0.1', '10.0.0.2']
+    >>> shares.clients('/vx/fs3')
+    []
+    >>> sorted(shares.clients_by_path.items())
+    [('/vx/fs1', ['10.0.0.1', '10.0.0.2']), ('/vx/fs2', ['10.0.0.1'])]
+    """
+
+    def clients(self, path):
+        """ Returns the list of clients the given path is shared with.
+        """
+        return [s.client for s in self.filter_by('name', path)]
+
+    @property
+    def clients_by_path(self):
+        """ Dict of the list of clients by shared path.
+        """
+        index = self.indexes[1].get('name')
+        if index is None:
+            index = {}
+            for share in self:
+                index.setdefault(share.name, []).append(share)
+        return dict([(p, [s.client for s in shares])
+                     for p, shares in index.items()])
+
+
+def _invalidates_indexes(method):
+    """ Wraps a list method that modifies the list, so the indexes are
+    rebuilt on the next lookup.
+    """
+    def wrapper(self, *args):
+        self._indexes = None  # pylint: disable=I0011,W0212
+        return method(self, *args)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', '__setitem__',
+              '__delitem__', '__setslice__', '__delslice__', '__iadd__',
+              '__imul__'):
+    setattr(IndexedResourceList, _name,
+            _invalidates_indexes(getattr(list, _name)))
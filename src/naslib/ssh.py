@@ -11,11 +11,16 @@
 """ SSH helpers using paramiko library.
 """
 
+import binascii
 import os
 import socket
+import sys
+import threading
 
 from .log import NasLogger
-from .nasexceptions import NasExecutionTimeoutException, NasException
+from .pool import ConnectionPool, credential_fingerprint
+from .nasexceptions import NasExecutionTimeoutException, NasException, \
+    NasExecCommandException
 from .paramikopatch import SSHClient as ParamikoSSHClient, SSHException, \
     PatchedTransport, PatchedHostKeys, InvalidHostKeyEntries, AutoAddPolicy, \
     OpenChannelTimeout
@@ -23,6 +28,35 @@ from .paramikopatch import SSHClient as ParamikoSSHClient, SSHException, \
 
 CONNECT_TIMEOUT = 5 * 60
 KNOWN_HOSTS_PATH = os.path.expanduser('~/.ssh/known_hosts')
+POOL_MAX_SIZE = 8
+POOL_IDLE_TIMEOUT = 60
+MAX_CHANNELS_PER_HOST = 4
+
+
+class SSHConnectionPool(ConnectionPool):
+    """ Process-wide pool of authenticated paramiko clients, so a new
+    connection context to the same server re-uses a live transport instead of
+    doing a full handshake again. See ConnectionPool.
+
+    >>> pool = SSHConnectionPool(max_size=2, idle_timeout=60)
+    >>> key = pool.key("host", 22, "user", "password")
+    >>> key[:3]
+    ('host', 22, 'user')
+    >>> key == pool.key("host", 22, "user", "other_password")
+    False
+    >>> SSHConnectionPool.instance() is SSHConnectionPool.instance()
+    True
+    """
+    _instance = None
+
+    def __init__(self, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT):
+        super(SSHConnectionPool, self).__init__(max_size, idle_timeout)
+
+    @staticmethod
+    def key(host, port, user, password):
+        """ Builds the pool key. The credential is kept as a fingerprint only.
+        """
+        return host, port, user, credential_fingerprint(password)
 
 
 class SSHClient(object):
@@ -30,9 +64,14 @@ class SSHClient(object):
     run remote commands.
     """
     logger = NasLogger.instance()
+    max_channels = MAX_CHANNELS_PER_HOST
+    _running_channels = {}
+    _running_channels_cond = threading.Condition()
 
-    def __init__(self, host, user, password=None, port=22):
-        """ This constructor requires the connection arguments.
+    def __init__(self, host, user, password=None, port=22, pool=None):
+        """ This constructor requires the connection arguments. If a
+        SSHConnectionPool is given, the connection is taken from it on
+        connect() and given back on close().
         >>> SSHClient("host", "user")
         <SSHClient host 22>
         >>> p = "some_password"
@@ -43,12 +82,25 @@ class SSHClient(object):
         True
         >>> client._ssh is None
         True
+        >>> client.pool is None
+        True
         """
         self.host = host
         self.user = user
         self.password = password
         self.port = port
+        self.pool = pool
         self._ssh = None
+        # serializes connect(), the reconnection in the ssh property and
+        # close(), as the commands of run_many() share this client
+        self._connection_lock = threading.RLock()
+
+    @property
+    def pool_key(self):
+        """ Key of this connection in the SSHConnectionPool.
+        """
+        return SSHConnectionPool.key(self.host, self.port, self.user,
+                                     self.password)
 
     def __str__(self):
         """ Retrieves the str informal representation of this object.
@@ -173,35 +225,52 @@ class SSHClient(object):
 
     @property
     def ssh(self):
-        """ Gets the paramiko SSHClient object connected.
+        """ Gets the paramiko SSHClient object connected. The connection is
+        only (re)established by a single thread, the others wait for it.
         """
-        if self._ssh is not None:
-            if not self.is_connected():
+        with self._connection_lock:
+            if self._ssh is not None and not self.is_connected():
                 self.logger.trace.debug("connection lost to NAS server, will "
                            "try again now")
-                self.connect()
+            self.connect()
             return self._ssh
-        self.connect()
-        return self._ssh
 
     def connect(self):
         """ Builds the paramikopatch.SSHClient (e.g.: paramiko) object, sets
         the system keys, the missing host key (for .ssh/know_host file) and try
         to establish the SSH connection.
         """
-        if self._ssh is not None:
-            return
-        self._ssh = ParamikoSSHClient()
-        try:
-            self._ssh.load_system_host_keys()
-        except InvalidHostKeyEntries as err:
-            self._log_bad_known_host_keys(err)
-        self._ssh.set_missing_host_key_policy(AutoAddPolicy())
-        self.logger.trace.debug("connecting to the NAS server")
-        self._ssh.connect(self.host, self.port, self.user, self.password,
-                          timeout=CONNECT_TIMEOUT)
-        self.logger.trace.debug("connection to the NAS server has been "
-                                "established.")
+        with self._connection_lock:
+            if self._ssh is not None:
+                return
+            if self._connect_from_pool():
+                return
+            self._ssh = ParamikoSSHClient()
+            try:
+                self._ssh.load_system_host_keys()
+            except InvalidHostKeyEntries as err:
+                self._log_bad_known_host_keys(err)
+            self._ssh.set_missing_host_key_policy(AutoAddPolicy())
+            self.logger.trace.debug("connecting to the NAS server")
+            self._ssh.connect(self.host, self.port, self.user, self.password,
+                              timeout=CONNECT_TIMEOUT)
+            self.logger.trace.debug("connection to the NAS server has been "
+                                    "established.")
+
+    def _connect_from_pool(self):
+        """ Tries to re-use a live connection from the pool.
+        """
+        if self.pool is None:
+            return False
+        self._ssh = self.pool.acquire(self.pool_key)
+        while self._ssh is not None:
+            if self.is_connected():
+                self.logger.trace.debug("re-using a pooled connection to the "
+                                        "NAS server")
+                return True
+            self._ssh.close()
+            self._ssh = self.pool.acquire(self.pool_key)
+        return False
 
     def is_connected(self):
         """ Checks the SSH connectivity.
@@ -209,6 +278,12 @@ class SSHClient(object):
         transport = self._ssh.get_transport() if self._ssh else None
         return bool(transport and transport.is_active())
 
+    def host_key_fingerprint(self):
+        """ Retrieves the hexadecimal fingerprint of the remote host key.
+        """
+        key = self.ssh.get_transport().get_remote_server_key()
+        return binascii.hexlify(key.get_fingerprint())
+
     def run(self, cmd, timeout=None):
         """ Uses paramiko SSHClient object to execute commands remotely and
         retrieves the correspond standard output and standard error.
@@ -249,10 +324,147 @@ class SSHClient(object):
         self.logger.trace.debug("ran (%s)" % cmd)
         return status, "".join(out), "".join(err)
 
-    def close(self):
-        """ Closes the ssh connection properly.
+    def run_stream(self, cmd, timeout=None, stderr=None):
+        """ Runs a command remotely as the run() method does, but yields the
+        stdout lines (without the line break) as soon as they arrive, so big
+        outputs are never held in memory at once. The stderr is drained at
+        the same time in a separate thread, so none of the buffers can get
+        full and block the remote command. The stderr lines are appended to
+        the "stderr" list if one is given. A NasExecCommandException is raised
+        at the end if the exit status is not zero.
         """
-        self.logger.trace.debug("closing connection to the NAS server")
-        self._ssh.close()
-        self._ssh = None
-        self.logger.trace.debug("NAS server connection closed")
+        self.logger.trace.debug("running stream (%s)" % cmd)
+        timeout_msg = "A timeout of %s seconds occurred after trying to " \
+                      "execute the following command remotely through SSH: " \
+                      "\"%s\". Error: %s"
+        err_lines = [] if stderr is None else stderr
+        err_exc_info = []
+
+        def drain_stderr(err):
+            try:
+                err_lines.extend([l.rstrip('\r\n') for l in err])
+            except Exception:  # pylint: disable=I0011,W0703
+                err_exc_info.append(sys.exc_info())
+
+        try:
+            stdout, err = self.ssh.exec_command(cmd, timeout=timeout)[1:]
+            thread = threading.Thread(target=drain_stderr, args=(err,))
+            thread.daemon = True
+            thread.start()
+            for line in stdout:
+                yield line.rstrip('\r\n')
+            thread.join()
+            if err_exc_info:
+                exc_type, exc_val, exc_tb = err_exc_info[0]
+                raise exc_type, exc_val, exc_tb
+            status = stdout.channel.recv_exit_status()
+        except socket.timeout as err:
+            msg = timeout_msg % (timeout, cmd, str(err))
+            self.logger.trace.warn("naslib: socket.timeout: %s" % msg)
+            raise NasExecutionTimeoutException(msg)
+        except OpenChannelTimeout as err:
+            msg = timeout_msg % (timeout, cmd, str(err))
+            self.logger.trace.warn("naslib: OpenChannelTimeout: %s" % msg)
+            raise NasExecutionTimeoutException(msg)
+        self.logger.trace.debug("ran stream (%s)" % cmd)
+        if status != 0:
+            self.logger.trace.debug("paramiko status: %s (%s)" % (status,
+                                                                  cmd))
+            raise NasExecCommandException('\n'.join(err_lines))
+
+    def run_many(self, cmds, timeout=None):
+        """ Runs several commands at the same time, each one in its own
+        channel of the same SSH transport. The items of "cmds" are either a
+        command string or a tuple (command, timeout) to override the default
+        timeout for that command. The results are returned in the same order
+        as "cmds", each one as the run() method does.
+        """
+        args_list = [(c, timeout) if isinstance(c, basestring) else tuple(c)
+                     for c in cmds]
+        if args_list:
+            # connects (or re-connects) once before starting the threads
+            self.ssh  # pylint: disable=I0011,W0104
+        return self.concurrently(self.run, args_list)
+
+    def concurrently(self, func, args_list):
+        """ Calls func(*args) for each item of "args_list" through a pool of
+        threads, never running more than "max_channels" calls at once for
+        the same host, whatever the limit of the other clients is. The
+        results are returned in the same order as "args_list". If any call
+        fails, the first exception (in order) is raised after all the calls
+        have finished.
+
+        >>> client = SSHClient("host", "user")
+        >>> client.concurrently(lambda x, y: x * y, [(1, 2), (3, 4)])
+        [2, 12]
+        """
+        args_list = list(args_list)
+        if not args_list:
+            return []
+        results = [None] * len(args_list)
+        errors = [None] * len(args_list)
+        pending = list(enumerate(args_list))
+        pending_lock = threading.Lock()
+
+        def worker():
+            while True:
+                with pending_lock:
+                    if not pending:
+                        return
+                    index, args = pending.pop(0)
+                self._acquire_channel()
+                try:
+                    results[index] = func(*args)
+                except Exception:  # pylint: disable=I0011,W0703
+                    errors[index] = sys.exc_info()
+                finally:
+                    self._release_channel()
+
+        num_threads = min(self.max_channels, len(args_list))
+        threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for error in errors:
+            if error is not None:
+                raise error[0], error[1], error[2]
+        return results
+
+    def _acquire_channel(self):
+        """ Waits until less than "max_channels" calls are running on this
+        host and counts one more call.
+        """
+        key = (self.host, self.port)
+        with self._running_channels_cond:
+            while self._running_channels.get(key, 0) >= self.max_channels:
+                self._running_channels_cond.wait()
+            self._running_channels[key] = \
+                self._running_channels.get(key, 0) + 1
+
+    def _release_channel(self):
+        key = (self.host, self.port)
+        with self._running_channels_cond:
+            self._running_channels[key] -= 1
+            if not self._running_channels[key]:
+                del self._running_channels[key]
+            self._running_channels_cond.notify_all()
+
+    def close(self, discard=False):
+        """ Closes the ssh connection properly. If a pool is used and the
+        connection is still alive it is given back to the pool instead,
+        unless "discard" is True, e.g. after an error in the middle of a
+        command, as the connection might be left in an unknown state.
+        """
+        with self._connection_lock:
+            if self.pool is not None and not discard and self.is_connected():
+                self.pool.release(self.pool_key, self._ssh)
+                self._ssh = None
+                self.logger.trace.debug("NAS server connection released to "
+                                        "the pool")
+                return
+            self.logger.trace.debug("closing connection to the NAS server")
+            self._ssh.close()
+            self._ssh = None
+            self.logger.trace.debug("NAS server connection closed")
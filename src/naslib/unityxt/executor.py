@@ -0,0 +1,180 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the RequestExecutor class, a pool of threads used
+by the UnityXT resources to run independent REST operations at the same
+time, never running more than a limit of them at once on the same array.
+"""
+
+import sys
+import threading
+import Queue
+
+MAX_WORKERS_PER_ARRAY = 4
+
+
+class RequestFuture(object):
+    """ The pending result of a call submitted to a RequestExecutor.
+
+    >>> future = RequestFuture()
+    >>> future.done()
+    False
+    >>> future.set_result(10)
+    >>> future.done(), future.result(), future.exception()
+    (True, 10, None)
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._exc_info = None
+
+    def done(self):
+        return self._event.is_set()
+
+    def set_result(self, result):
+        self._result = result
+        self._event.set()
+
+    def set_exc_info(self, exc_info):
+        self._exc_info = exc_info
+        self._event.set()
+
+    def exception(self, timeout=None):
+        """ Waits for the call to finish and returns the exception it raised
+        or None.
+        """
+        self._event.wait(timeout)
+        return self._exc_info[1] if self._exc_info is not None else None
+
+    def result(self, timeout=None):
+        """ Waits for the call to finish and returns its result, raising the
+        exception of the call if it failed.
+        """
+        self._event.wait(timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+
+class RequestExecutor(object):
+    """ Runs the submitted calls through up to "max_workers" threads. The
+    threads are started on demand and stopped by shutdown(). Besides, a call
+    only starts while less than "max_workers" calls of all the executors of
+    the same array are running. The calls submitted from a worker thread,
+    e.g. a nested map(), are run inline, as the worker would otherwise wait
+    for a thread of the same pool.
+
+    >>> executor = RequestExecutor('host', max_workers=2)
+    >>> executor.submit(lambda x, y: x + y, 1, 2).result()
+    3
+    >>> results = executor.map(lambda x: 10 / x, [(1,), (0,), (5,)])
+    >>> results[0], type(results[1]).__name__, results[2]
+    (10, 'ZeroDivisionError', 2)
+    >>> executor.map(lambda x: executor.map(abs, [(x,), (-x,)]), [(1,), (2,)])
+    [[1, 1], [2, 2]]
+    >>> executor.shutdown()
+    """
+    _running = {}
+    _running_cond = threading.Condition()
+    _local = threading.local()
+
+    def __init__(self, host, max_workers=MAX_WORKERS_PER_ARRAY):
+        self.host = host
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> RequestExecutor('1.2.3.4', 2)
+        <RequestExecutor host=1.2.3.4 max_workers=2>
+        """
+        return "<%s host=%s max_workers=%s>" % (self.__class__.__name__,
+                                                self.host, self.max_workers)
+
+    def submit(self, func, *args, **kwargs):
+        """ Schedules func(*args, **kwargs) and returns its RequestFuture.
+        """
+        future = RequestFuture()
+        if getattr(self._local, 'worker', False):
+            self._call(future, func, args, kwargs)
+            return future
+        self._queue.put((future, func, args, kwargs))
+        self._start_worker()
+        return future
+
+    def map(self, func, args_list):
+        """ Calls func(*args) for each item of "args_list" concurrently.
+        Returns a list with either the result or the exception of each call,
+        in the same order as "args_list".
+        """
+        futures = [self.submit(func, *args) for args in args_list]
+        results = []
+        for future in futures:
+            error = future.exception()
+            results.append(error if error is not None else future.result())
+        return results
+
+    def shutdown(self):
+        """ Stops the threads once the calls already submitted are done.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _start_worker(self):
+        with self._lock:
+            if len(self._threads) >= self.max_workers:
+                return
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        self._local.worker = True
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kwargs = item
+            self._acquire()
+            try:
+                self._call(future, func, args, kwargs)
+            finally:
+                self._release()
+
+    @staticmethod
+    def _call(future, func, args, kwargs):
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception:  # pylint: disable=I0011,W0703
+            future.set_exc_info(sys.exc_info())
+
+    def _acquire(self):
+        """ Waits until less than "max_workers" calls are running on this
+        array, whatever the limit of the other executors is, and counts one
+        more call.
+        """
+        with self._running_cond:
+            while self._running.get(self.host, 0) >= self.max_workers:
+                self._running_cond.wait()
+            self._running[self.host] = self._running.get(self.host, 0) + 1
+
+    def _release(self):
+        with self._running_cond:
+            self._running[self.host] -= 1
+            if not self._running[self.host]:
+                del self._running[self.host]
+            self._running_cond.notify_all()
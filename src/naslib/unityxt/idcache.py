@@ -0,0 +1,146 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the NameIdCache class, used by the UnityREST class
+to resolve the names of the Unity instances to their ids without requesting
+them again and again.
+"""
+
+import copy
+import time
+
+ID_CACHE_TTL = 60
+
+# the types whose instances are also changed when an instance of the key type
+# is created, deleted or modified
+DEPENDENT_TYPES = {
+    'storageResource': ('filesystem', 'nfsShare', 'snap'),
+    'filesystem': ('storageResource', 'nfsShare', 'snap'),
+    'nfsShare': ('filesystem', 'storageResource'),
+}
+
+
+class NameIdCache(object):
+    """ Keeps the references of the instances, by type and name, for "ttl"
+    seconds. Only the "cached_fields" are kept, as they don't change during
+    the life of an instance, unless the type is invalidated. The instances
+    not found are cached as None. It's disabled while "ttl" is None.
+
+    >>> cache = NameIdCache(60)
+    >>> cache.set('filesystem', 'fs1', ['storageResource', 'sizeTotal'],
+    ...           {'id': 'fs_1', 'storageResource': {'id': 'res_1'},
+    ...            'sizeTotal': 1024})
+    >>> found, content = cache.get('filesystem', 'fs1', ['storageResource'])
+    >>> found, sorted(content.items())
+    (True, [('id', 'fs_1'), ('storageResource', {'id': 'res_1'})])
+    >>> cache.get('filesystem', 'fs1', ['nfsShare'])
+    (False, None)
+    >>> cache.set('pool', 'p1', ['id'], None)
+    >>> cache.get('pool', 'p1', ['id', 'name'])
+    (True, None)
+    >>> cache.invalidate('storageResource')
+    >>> cache.get('filesystem', 'fs1', ['storageResource'])
+    (False, None)
+    >>> cache.get('pool', 'p1', ['id'])
+    (True, None)
+    >>> cache.set('filesystem', 'fs2', ['nfsShare'],
+    ...           {'id': 'fs_2', 'nfsShare': [{'id': 'share_1'}]})
+    >>> cache.set('nfsShare', 'fs2', ['id'], {'id': 'share_1'})
+    >>> cache.invalidate_id('nfsShare', 'share_1')
+    >>> cache.get('filesystem', 'fs2', ['nfsShare'])
+    (False, None)
+    >>> cache.get('nfsShare', 'fs2', ['id'])
+    (False, None)
+    """
+    cached_fields = frozenset(['id', 'storageResource', 'nfsShare'])
+
+    def __init__(self, ttl=ID_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> NameIdCache(30)
+        <NameIdCache ttl=30>
+        """
+        return "<%s ttl=%s>" % (self.__class__.__name__, self.ttl)
+
+    @property
+    def enabled(self):
+        return self.ttl is not None
+
+    def get(self, typename, name, fields):
+        """ Returns a tuple (found, content) for the instance of the given
+        type and name. The content is None for an instance not found.
+        """
+        entry = self._entries.get((typename, name))
+        if entry is None or not self.enabled:
+            return False, None
+        timestamp, fetched, content = entry
+        if time.time() - timestamp > self.ttl:
+            self._entries.pop((typename, name), None)
+            return False, None
+        if content is None:
+            return True, None
+        if not set(fields) <= fetched:
+            return False, None
+        return True, copy.deepcopy(content)
+
+    def set(self, typename, name, fields, content):
+        """ Caches the content of the instance of the given type and name,
+        requested with the given fields, or None if it wasn't found.
+        """
+        if not self.enabled:
+            return
+        if content is None:
+            self._entries[(typename, name)] = (time.time(), None, None)
+            return
+        if 'id' not in content:
+            return
+        fetched = (set(fields) & self.cached_fields) | set(['id'])
+        cached = dict([(f, copy.deepcopy(content[f])) for f in fetched
+                       if f in content])
+        _, old_fetched, old_content = self._entries.get((typename, name),
+                                                        (None, None, None))
+        if old_content is not None and old_content.get('id') == cached['id']:
+            fetched |= old_fetched
+            old_content.update(cached)
+            cached = old_content
+        self._entries[(typename, name)] = (time.time(), fetched, cached)
+
+    def invalidate(self, *typenames):
+        """ Discards the cached instances of the given types and of their
+        dependent types.
+        """
+        invalid = set(typenames)
+        for typename in typenames:
+            invalid.update(DEPENDENT_TYPES.get(typename, ()))
+        for key in [k for k in self._entries.keys() if k[0] in invalid]:
+            self._entries.pop(key, None)
+
+    def invalidate_id(self, typename, id_arg):
+        """ Discards the cached instance of the given type and id, e.g. after
+        it was deleted or not found anymore, and the cached instances that
+        refer to it.
+        """
+        for key, (_, _, content) in self._entries.items():
+            if content is None:
+                continue
+            refs = [content] if key[0] == typename else []
+            for field in self.cached_fields - set(['id']):
+                value = content.get(field)
+                refs.extend(value if isinstance(value, list) else [value])
+            if any([isinstance(r, dict) and r.get('id') == id_arg
+                    for r in refs]):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """ Discards all the cached instances.
+        """
+        self._entries.clear()
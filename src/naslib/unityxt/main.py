@@ -26,8 +26,8 @@ class UnityXT(NasBase):
 
     logger = NasLogger.instance().trace
 
-    def __init__(self, host, username, password):
-        self.rest = UnityREST(self.logger)
+    def __init__(self, host, username, password, session_pool=None):
+        self.rest = UnityREST(self.logger, pool=session_pool)
         self.host = host
         self.username = username
         self.password = password
@@ -43,10 +43,16 @@ class UnityXT(NasBase):
     def verify_discovery(self):
         raise NotImplementedError
 
+    def map(self, func, args_list):
+        """ Overrides the base method to run the calls concurrently through
+        the RequestExecutor of the REST session.
+        """
+        return self.rest.executor.map(func, args_list)
+
     def login(self):
         self.logger.debug("UnityXT.login")
         self.rest.login(self.host, self.username, self.password)
 
     def logout(self):
         self.logger.debug("UnityXT.logout")
-        self.rest.request('/api/types/loginSessionInfo/action/logout', 'POST')
+        self.rest.logout()
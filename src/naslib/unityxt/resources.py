@@ -34,8 +34,9 @@ from ..baseresources import FileSystemResourceBase, PoolResourceBase, \
                              CacheResourceBase, SnapshotResourceBase, \
                              NasServerResourceBase
 from ..nasexceptions import CreationException, DeletionException, \
-    ResizeException, DoesNotExist
+    ResizeException, DoesNotExist, NasExecCommandException
 from ..resourceprops import Size
+from ..listcache import cached_list, invalidates_list
 from ..log import NasLogger
 from ..objects import FileSystem, Share
 
@@ -57,27 +58,21 @@ class ShareResource(ShareResourceBase):
         'readWriteRootHostsString': 'no_root_squash,rw'
     }
 
+    @cached_list
     def list(self):
         """ Returns a list of Share resources items retrieved by SFS server.
         """
-        response = self._nas.rest.get_type_instances(
+        contents = self._nas.rest.iter_type_instances(
             'nfsShare',
-            [
-                'name',
-                'defaultAccess',
-                'readOnlyHostsString',
-                'readWriteHostsString',
-                'readOnlyRootHostsString',
-                'readWriteRootHostsString'
-            ]
+            ['name'] + self.share_fields
         )
 
         share_list = []
-        for entry in response.json()['entries']:
-            share_name = entry['content']['name']
+        for content in contents:
+            share_name = content['name']
 
             # If defaultAccess is not 0, then we have a share for *
-            default_access = entry['content']['defaultAccess']
+            default_access = content['defaultAccess']
             if  default_access != 0:
                 share_list.append(
                     self._make_share(
@@ -88,9 +83,8 @@ class ShareResource(ShareResourceBase):
                 )
 
             for attrib, options in self.attrib_to_options.items():
-                if attrib in entry['content'] and \
-                    entry['content'][attrib] != "":
-                    for client in entry['content'][attrib].split(","):
+                if attrib in content and content[attrib] != "":
+                    for client in content[attrib].split(","):
                         share_list.append(
                             self._make_share(
                                 share_name,
@@ -104,8 +98,17 @@ class ShareResource(ShareResourceBase):
             share_list
         )
 
-        return share_list
+        return self._indexed(share_list)
+
+    share_fields = [
+        'defaultAccess',
+        'readOnlyHostsString',
+        'readWriteHostsString',
+        'readOnlyRootHostsString',
+        'readWriteRootHostsString'
+    ]
 
+    @invalidates_list()
     def create(self, path, client, options):
         """ Creates a share with a given path, clients and options. Options
         must be a list of strings. A share is unique identified by its path
@@ -117,6 +120,22 @@ class ShareResource(ShareResourceBase):
             client,
             options
         )
+        result = self.create_many(path, [(client, options)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @invalidates_list()
+    def create_many(self, path, clients):
+        """ Overrides the base method to add all the clients to the share of
+        the file system through a single "modifyFilesystem" request. The
+        failures of reading the file system or its share are raised.
+        """
+        self.logger.info(
+            "unityxt.ShareResource.create_many path=%s, clients=%s",
+            path,
+            clients
+        )
 
         fs_name = path.split('/')[-1]
         fs_instance = self._nas.rest.get_type_instance_for_name(
@@ -125,30 +144,55 @@ class ShareResource(ShareResourceBase):
             ['nfsShare', 'storageResource']
         )
         if fs_instance is None:
-            raise CreationException(
+            return [CreationException(
                 "Cannot find filesystem called %s" % fs_name
-            )
+            ) for _ in clients]
 
-        # If we already have a share, then modify it to add this client
+        # If we already have a share, then modify it to add the clients
+        share_instance = None
+        state = dict([(attrib, '') for attrib in self.share_fields])
+        state['defaultAccess'] = 0
         if 'nfsShare' in fs_instance:
-            req_data = self._modify_add(path, client, options, fs_instance)
-        else:
-            req_data = self._modify_create(path, client, options, fs_instance)
+            share_instance = self._nas.rest.get_type_instance_for_id(
+                'nfsShare',
+                fs_instance['nfsShare'][0]['id'],
+                self.share_fields
+            )
+            # None if the share of a cached file system was deleted
+            if share_instance is not None:
+                state.update(share_instance)
 
-        response = self._nas.rest.action(
-            'storageResource',
-            fs_instance['storageResource']['id'],
-            'modifyFilesystem',
-            req_data
-        )
+        results = []
+        param = {}
+        for client, options in clients:
+            try:
+                param.update(self._add_client_param(path, client, options,
+                                                    state, share_instance))
+            except Share.AlreadyExists as err:
+                results.append(err)
+                continue
+            results.append(self._build_nas_object(
+                name=fs_name, client=client, options=options))
+
+        if not param:
+            return results
+        if share_instance is None:
+            req_data = self._modify_create(path, param)
+        else:
+            req_data = self._modify_add(param, share_instance)
+        try:
+            response = self._nas.rest.action(
+                'storageResource',
+                fs_instance['storageResource']['id'],
+                'modifyFilesystem',
+                req_data
+            )
+        except NasExecCommandException as err:
+            return [r if isinstance(r, Exception) else err for r in results]
         self.logger.debug("unityxt.ShareResource.create response=%s", response)
-        data = {
-            'name': fs_name,
-            'client': client,
-            'options': options
-        }
-        return self._build_nas_object(**data)
+        return results
 
+    @invalidates_list()
     def delete(self, path, client):
         """ Deletes a Sfs Share given a path and client. A share is unique
         identified by its path AND its client. In case of failures it raises a
@@ -159,40 +203,52 @@ class ShareResource(ShareResourceBase):
             path,
             client
         )
+        result = self.delete_many(path, [client])[0]
+        if result is not None:
+            raise result
+
+    @invalidates_list()
+    def delete_many(self, path, clients):
+        """ Overrides the base method to remove all the clients from the
+        share through a single "modifyFilesystem" request. The failures of
+        reading the share are raised.
+        """
+        self.logger.info(
+            "unityxt.ShareResource.delete_many path=%s, clients=%s",
+            path,
+            clients
+        )
 
         share_name = path.strip('/')
         share_inst = self._nas.rest.get_type_instance_for_name(
             'nfsShare',
             share_name,
-            [
-                'filesystem.storageResource',
-                'defaultAccess',
-                'readOnlyHostsString',
-                'readWriteHostsString',
-                'readOnlyRootHostsString',
-                'readWriteRootHostsString'
-            ]
+            ['filesystem.storageResource'] + self.share_fields
         )
         if share_inst is None:
-            raise DeletionException(
+            return [DeletionException(
                 "Cannot find share for path %s" % path
-            )
+            ) for _ in clients]
+
+        from_state = dict([(attrib, share_inst[attrib])
+                           for attrib in self.share_fields])
+        to_state = from_state
+        results = []
+        for client in clients:
+            state = ShareResource._remove_client_access(client, to_state)
+            if state == to_state:
+                results.append(DeletionException(
+                    "Cannot find client matching %s for path %s" % (
+                        client,
+                        path
+                    )
+                ))
+                continue
+            to_state = state
+            results.append(None)
 
-        from_state = {
-            'defaultAccess': share_inst['defaultAccess'],
-            'readOnlyHostsString': share_inst['readOnlyHostsString'],
-            'readWriteHostsString': share_inst['readWriteHostsString'],
-            'readOnlyRootHostsString': share_inst['readOnlyRootHostsString'],
-            'readWriteRootHostsString': share_inst['readWriteRootHostsString']
-        }
-        to_state = ShareResource._remove_client_access(client, from_state)
         if from_state == to_state:
-            raise DeletionException(
-                "Cannot find client matching %s for path %s" % (
-                    client,
-                    path
-                )
-            )
+            return results
 
         # Now figure out if there's any remain clients of this share
         # and what attributes have to be updated if we're keeping the share.
@@ -220,79 +276,70 @@ class ShareResource(ShareResourceBase):
             share_inst['id']
         )
 
-        response = self._nas.rest.action(
-            'storageResource',
-            share_inst['filesystem']['storageResource']['id'],
-            'modifyFilesystem',
-            request_data
-        )
+        try:
+            response = self._nas.rest.action(
+                'storageResource',
+                share_inst['filesystem']['storageResource']['id'],
+                'modifyFilesystem',
+                request_data
+            )
+        except NasExecCommandException as err:
+            return [r if r is not None else err for r in results]
         self.logger.debug("unityxt.ShareResource.delete response=%s", response)
+        return results
 
-    def _modify_create(self, path, client, options, fs_instance):
+    def _add_client_param(self, path, client, options, state,
+                          share_instance):
+        """ Returns the share parameters to add the client, updating the
+        given state of the share. Raises Share.AlreadyExists if the client
+        is already in the state.
+        """
         (default_access, attrib) = self._parse_options(client, options)
-        param = {
+        if default_access is not None:
+            # Verify that defaultAccess isn't already set
+            if state['defaultAccess'] != 0:
+                raise Share.AlreadyExists(
+                    'Share already exists for %s for client %s' % (
+                        path,
+                        client
+                    )
+                )
+            state['defaultAccess'] = default_access
+            return {'defaultAccess': default_access}
+        if self._client_already_exists(client, state):
+            raise Share.AlreadyExists(
+                'Share already exists for %s for client %s' % (
+                    path,
+                    client
+                )
+            )
+        if share_instance is None and not state[attrib]:
+            state[attrib] = client
+        else:
+            state[attrib] = ",".join([state[attrib], client])
+        return {attrib: state[attrib]}
+
+    @staticmethod
+    def _modify_create(path, param):
+        share_param = {
             'isReadOnly': False,
             'defaultAccess': 0,  # NoAccess
             'exportOption': 1  # Access defined in hostString attribs
         }
-        if default_access is not None:
-            param['defaultAccess'] = default_access
-        else:
-            param[attrib] = client
+        share_param.update(param)
 
         return  {
             'nfsShareCreate': [
                 {
                     'name': path.strip('/'),
                     'path': '/',
-                    'nfsShareParameters': param
+                    'nfsShareParameters': share_param
                 }
             ]
         }
 
-    def _modify_add(self, path, client, options, fs_instance):
-        (default_access, update_attrib) = self._parse_options(client, options)
-
-        share_instance = self._nas.rest.get_type_instance_for_id(
-            'nfsShare',
-            fs_instance['nfsShare'][0]['id'],
-            [
-                'defaultAccess',
-                'readOnlyHostsString',
-                'readWriteHostsString',
-                'readOnlyRootHostsString',
-                'readWriteRootHostsString'
-            ]
-        )
-
-        if default_access is not None:
-            # Verify that defaultAccess isn't already set
-            if share_instance['defaultAccess'] != 0:
-                raise Share.AlreadyExists(
-                    'Share already exists for %s for client %s' % (
-                        path,
-                        client
-                    )
-                )
-            param = {
-                'defaultAccess': default_access
-            }
-        else:
-            if self._client_already_exists(client, share_instance):
-                raise Share.AlreadyExists(
-                    'Share already exists for %s for client %s' % (
-                        path,
-                        client
-                    )
-                )
-            attrib_value = ''
-            if update_attrib in share_instance:
-                attrib_value = share_instance[update_attrib]
-            attrib_value = ",".join([attrib_value, client])
-            param = {
-                update_attrib: attrib_value
-            }
-
+    @staticmethod
+    def _modify_add(param, share_instance):
         return {
             'nfsShareModify': [
                 {
@@ -460,27 +507,41 @@ class FileSystemResource(FileSystemResourceBase):
     """
 
     logger = NasLogger.instance().trace
+    list_fields = ['name', 'sizeTotal', 'pool.name', 'nasServer.name']
 
+    @cached_list
     def list(self):
         """ Returns a list of FileSystems resources items retrieved by SFS
         server.
         """
-        response = self._nas.rest.get_type_instances(
-            'filesystem',
-            ['name', 'sizeTotal', 'pool.name', 'nasServer.name']
+        contents = self._nas.rest.iter_type_instances(
+            'filesystem', self.list_fields
         )
         filessystem_list = []
-        for entry in response.json()['entries']:
-            data = {
-                'name': entry['content']['name'],
-                'size': "{0}b".format(entry['content']['sizeTotal']),
-                'pool': entry['content']['pool']['name'],
-                'layout': entry['content']['nasServer']['name'],
-                'online': True
-            }
-            filessystem_list.append(self._build_nas_object(**data))
+        for content in contents:
+            filessystem_list.append(self._build_filesystem(content))
 
-        return filessystem_list
+        return self._indexed(filessystem_list)
+
+    def _lookup(self, identifier):
+        """ Overrides the base method to get a single file system by its name
+        instead of listing all of them.
+        """
+        content = self._nas.rest.get_type_instance_for_name(
+            'filesystem', identifier['name'], self.list_fields
+        )
+        return [self._build_filesystem(content)] if content is not None \
+            else []
+
+    def _build_filesystem(self, content):
+        data = {
+            'name': content['name'],
+            'size': "{0}b".format(content['sizeTotal']),
+            'pool': content['pool']['name'],
+            'layout': content['nasServer']['name'],
+            'online': True
+        }
+        return self._build_nas_object(**data)
 
     def usage(self):
         """ Returns a list of FileSystems with usage as X%.
@@ -501,6 +562,7 @@ class FileSystemResource(FileSystemResourceBase):
 
         return usage
 
+    @invalidates_list()
     def create(self, name, size, pool, layout='simple',
                data_reduction_enabled='true'):
         self.logger.info(
@@ -570,6 +632,7 @@ class FileSystemResource(FileSystemResourceBase):
             online=True
         )
 
+    @invalidates_list('share', 'snapshot')
     def delete(self, name):
         """ Deletes a SFS FileSystem given a fs name. In case of failures it
         raises a NasDeletionException.
@@ -590,6 +653,7 @@ class FileSystemResource(FileSystemResourceBase):
         )
         self.logger.debug("unityxt.FS.delete completed for %s", name)
 
+    @invalidates_list()
     def resize(self, name, size, pool=None):
         self.logger.info("unityxt.FS.resize name=%s size=%s", name, size)
         fs_instance = self._nas.rest.get_type_instance_for_name(
@@ -614,6 +678,7 @@ class FileSystemResource(FileSystemResourceBase):
             req_data
         )
 
+    @invalidates_list()
     def change_data_reduction(self, name, data_reduction_enabled):
         """ Enables or disables data reduction on an existing filesystem
         """
@@ -651,6 +716,7 @@ class FileSystemResource(FileSystemResourceBase):
                 req_data
             )
 
+    @invalidates_list()
     def online(self, name, online=True):
         """ Method to set the file system as online or offline.
         """
@@ -700,30 +766,48 @@ class SnapshotResource(SnapshotResourceBase):
         snapshot resource.
     """
     logger = NasLogger.instance().trace
+    list_fields = ['name', 'storageResource.name', 'creationTime']
 
+    @cached_list
     def list(self):
         """ Returns a list of snapshot resources items retrieved by SFS server.
         """
-        response = self._nas.rest.get_type_instances(
+        contents = self._nas.rest.iter_type_instances(
             'snap',
-            ['name', 'storageResource.name', 'creationTime'],
+            self.list_fields,
             ['storageResource.type==1']
         )
 
         results = []
-        for entry in response.json()['entries']:
-            ec = entry['content']
-            data = {
-                'name': ec['name'],
-                'filesystem': ec['storageResource']['name'],
-                'cache': None,
-                'date': ec['creationTime'],
-                'snaptype': ""
-            }
-            results.append(self._build_nas_object(**data))
+        for content in contents:
+            results.append(self._build_snapshot(content))
 
-        return results
+        return self._indexed(results)
 
+    def _lookup(self, identifier):
+        """ Overrides the base method to get a single snapshot by its name
+        instead of listing all of them. The file system is then checked by
+        get(). Only snapshots of file systems are considered, like list().
+        """
+        content = self._nas.rest.get_type_instance_for_name(
+            'snap', identifier['name'],
+            self.list_fields + ['storageResource.type']
+        )
+        if content is None or content['storageResource'].get('type') != 1:
+            return []
+        return [self._build_snapshot(content)]
+
+    def _build_snapshot(self, ec):
+        data = {
+            'name': ec['name'],
+            'filesystem': ec['storageResource']['name'],
+            'cache': None,
+            'date': ec['creationTime'],
+            'snaptype': ""
+        }
+        return self._build_nas_object(**data)
+
+    @invalidates_list('cache')
     def create(self, name, filesystem, cache):
         """ Creates a snapshot (rollback) on SFS server given a snapshot name,
         file system name and a cache object name. In case of failures it raises
@@ -762,6 +846,7 @@ class SnapshotResource(SnapshotResourceBase):
         }
         return self._build_nas_object(**data)
 
+    @invalidates_list('cache')
     def delete(self, name, filesystem):
         """ Deletes a SFS snapshot given a snapshot name and fs name.
         In case of failures it raises a Snapshot.DeletionException.
@@ -790,6 +875,7 @@ class SnapshotResource(SnapshotResourceBase):
         else:
             self._nas.rest.delete_instance('snap', snap_instance['id'])
 
+    @invalidates_list('filesystem')
     def restore(self, name, filesystem):
         """ Restores the file system given a snapshot name and the file system.
         In SFS, to restore a file system, 3 steps are needed:
@@ -899,10 +985,11 @@ class CacheResource(CacheResourceBase):
     """ This class contains the implementation of the basic methods of a SFS
     cache resource.
     """
+    @cached_list
     def list(self):
         """ Returns a list of Cache resources items retrieved by SFS server.
         """
-        return []
+        return self._indexed([])
 
     def create(self, name, size, pool):
         """ Creates a Cache with a given name, size and poll name.
@@ -1276,6 +1363,7 @@ class NasServerResource(NasServerResourceBase):
             sleep(interval)
             attempts -= 1
 
+    @invalidates_list()
     def create(self, name, pool, ports, network, protocols, ndmp_pass):
         """ Create a NAS server.
         ports parameter is comma separated string, e.g. "0,2".
@@ -1407,6 +1495,7 @@ class NasServerResource(NasServerResourceBase):
         )
         self.logger.debug("unityxt.NS.FSN.delete completed for %s", fsn_id)
 
+    @invalidates_list()
     def delete(self, name):
         """ Deletes a NAS server.
         """
@@ -1442,23 +1531,24 @@ class NasServerResource(NasServerResourceBase):
         if fsn_id and "fsn" in fsn_id:
             self._delete_fsn(fsn_id)
 
+    @cached_list
     def list(self):
         """ Returns a list of NAS servers.
         """
-        response = self._nas.rest.get_type_instances(
+        contents = self._nas.rest.iter_type_instances(
             'nasServer',
             ['name', 'pool.name', 'homeSP.id']
         )
         nasserver_list = []
-        for entry in response.json()['entries']:
+        for content in contents:
             data = {
-                'name': entry['content']['name'],
-                'pool': entry['content']['pool']['name'],
-                'homesp': entry['content']['homeSP']['id']
+                'name': content['name'],
+                'pool': content['pool']['name'],
+                'homesp': content['homeSP']['id']
             }
             nasserver_list.append(self._build_nas_object(**data))
 
-        return nasserver_list
+        return self._indexed(nasserver_list)
 
     def get_nasserver_details(self, name):
         """ Gets details of a NAS server.
@@ -0,0 +1,127 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the RetryPolicy class, used by the UnityREST class
+to decide whether a failed request is attempted again and how long to wait
+before it, e.g. while a storage processor of the array fails over.
+"""
+
+import email.utils
+import random
+import time
+
+import requests
+import urllib3
+
+
+class RetryPolicy(object):
+    """ Retries a request up to "max_attempts" times in total, waiting an
+    exponential backoff of "base_delay" seconds, capped to "max_delay", plus
+    a random jitter of up to "jitter" times the backoff. A "Retry-After"
+    header longer than the backoff is honoured. No attempt is started after
+    "deadline" seconds since the first one.
+
+    The requests failing with one of the "retry_statuses" are only retried
+    for the "idempotent_methods". The connection errors are retried for any
+    method if the request couldn't be sent at all.
+
+    >>> policy = RetryPolicy(base_delay=1, max_delay=5, jitter=0)
+    >>> [policy.delay(attempt) for attempt in range(1, 5)]
+    [1, 2, 4, 5]
+    >>> policy.retry_status('GET', 503), policy.retry_status('POST', 503)
+    (True, False)
+    >>> policy.retry_status('GET', 404)
+    False
+    """
+    idempotent_methods = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT',
+                                    'DELETE'])
+    retry_statuses = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, max_attempts=3, base_delay=3, max_delay=30,
+                 jitter=0.5, deadline=300):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> RetryPolicy()
+        <RetryPolicy max_attempts=3 base_delay=3 deadline=300>
+        """
+        return "<%s max_attempts=%s base_delay=%s deadline=%s>" % (
+            self.__class__.__name__, self.max_attempts, self.base_delay,
+            self.deadline)
+
+    def delay(self, attempt, response=None):
+        """ Returns the seconds to wait after the given failed attempt,
+        counted from 1.
+        """
+        backoff = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        if self.jitter:
+            backoff += random.uniform(0, self.jitter * backoff)
+        retry_after = self.retry_after(response)
+        if retry_after is not None and retry_after > backoff:
+            return retry_after
+        return backoff
+
+    @staticmethod
+    def retry_after(response):
+        """ Returns the seconds of the "Retry-After" header of the response,
+        given either as seconds or as a HTTP date, or None.
+
+        >>> class Response(object):
+        ...     headers = {'Retry-After': '10'}
+        ...
+        >>> RetryPolicy.retry_after(Response())
+        10
+        >>> RetryPolicy.retry_after(None) is None
+        True
+        """
+        headers = getattr(response, 'headers', None) or {}
+        value = headers.get('Retry-After')
+        if not value or not isinstance(value, basestring):
+            return None
+        if value.strip().isdigit():
+            return int(value)
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0, email.utils.mktime_tz(date) - time.time())
+
+    def retry_status(self, method, status_code):
+        """ Checks whether a response with the given status is retried.
+        """
+        return status_code in self.retry_statuses and \
+            method in self.idempotent_methods
+
+    def retry_error(self, method, error):
+        """ Checks whether a request failing with the given connection error
+        is retried.
+        """
+        return method in self.idempotent_methods or self.not_sent(error)
+
+    @staticmethod
+    def not_sent(error):
+        """ Checks whether the connection error happened before the request
+        was sent, so it's safe to send it again.
+        """
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args \
+            else None
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+    def expired(self, started, delay=0):
+        """ Checks whether waiting the given delay would exceed the deadline
+        counted from the "started" time.
+        """
+        return self.deadline is not None and \
+            time.time() + delay - started > self.deadline
@@ -0,0 +1,77 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" This module contains the UnitySessionPool class, used to keep the
+authenticated Unity REST sessions alive between connection contexts, so a
+new context to the same array doesn't pay for the login and the logout
+requests again.
+"""
+
+import threading
+
+from ..pool import ConnectionPool, credential_fingerprint
+
+SESSION_POOL_MAX_SIZE = 8
+SESSION_IDLE_TIMEOUT = 5 * 60
+LOGOUT_ENDPOINT = '/api/types/loginSessionInfo/action/logout'
+
+
+class UnitySession(object):
+    """ An authenticated requests.Session to the Unity REST API of a host,
+    holding its cookies and its "EMC-CSRF-TOKEN" header, and the lock that
+    serializes its logins, shared by every user of the session. Closing it
+    logs out from the array.
+    """
+
+    def __init__(self, host, session, login_lock=None):
+        self.host = host
+        self.session = session
+        self.login_lock = login_lock or threading.Lock()
+
+    def __repr__(self):
+        """ Returns the representative string of this object.
+        >>> UnitySession('1.2.3.4', None)
+        <UnitySession host=1.2.3.4>
+        """
+        return "<%s host=%s>" % (self.__class__.__name__, self.host)
+
+    def close(self):
+        """ Logs out the session and releases its connections.
+        """
+        try:
+            self.session.request('POST', "https://%s%s" % (self.host,
+                                                           LOGOUT_ENDPOINT),
+                                 json=None, verify=False)
+        finally:
+            self.session.close()
+
+
+class UnitySessionPool(ConnectionPool):
+    """ Process-wide pool of the idle UnitySession objects by host and user.
+    The sessions are kept idle for at most "idle_timeout" seconds, after
+    which they are logged out, as the array would expire them anyway.
+
+    >>> pool = UnitySessionPool(max_size=2, idle_timeout=60)
+    >>> key = pool.key("host", "user", "password")
+    >>> key[:2]
+    ('host', 'user')
+    >>> pool.acquire(key) is None
+    True
+    """
+    _instance = None
+
+    def __init__(self, max_size=SESSION_POOL_MAX_SIZE,
+                 idle_timeout=SESSION_IDLE_TIMEOUT):
+        super(UnitySessionPool, self).__init__(max_size, idle_timeout)
+
+    @staticmethod
+    def key(host, user, password):
+        """ Builds the pool key. The credential is kept as a fingerprint only.
+        """
+        return host, user, credential_fingerprint(password)
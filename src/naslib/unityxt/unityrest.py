@@ -9,34 +9,64 @@
 ##############################################################################
 import logging
 import json
+import threading
+import time
+from collections import deque
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
 from time import sleep
 
 from ..nasexceptions import NasConnectionException, \
     NasExecCommandException
+from .session import UnitySession, LOGOUT_ENDPOINT
+from .idcache import NameIdCache
+from .executor import RequestExecutor, MAX_WORKERS_PER_ARRAY
+from .retry import RetryPolicy
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+REQUEST_METRICS_SIZE = 1000
+
 
 class UnityREST(object):
     mock = None
+    page_size = 500
+    max_workers = MAX_WORKERS_PER_ARRAY
 
     @classmethod
     def set_mock(cls, mock):
         cls.mock = mock
 
-    def __init__(self, logger):
+    def __init__(self, logger, pool=None):
         """
-        Set up logging and session.
+        Set up logging and session. The authenticated sessions are re-used
+        through the given UnitySessionPool, if any.
         """
         self.__ip_address = None
+        self.__pool_key = None
+        self.pool = pool
+        self.id_cache = NameIdCache()
+        self.retry_policy = RetryPolicy()
+        self.request_metrics = deque(maxlen=REQUEST_METRICS_SIZE)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._login_lock = threading.Lock()
 
         parent_logger = logger
         self.logger = logging.getLogger("%s.rest" % parent_logger.name)
 
-        self.unity = requests.Session()
-        self.unity.headers.update(
+        self.unity = self._new_session()
+
+    def _new_session(self):
+        session = requests.Session()
+        # a connection for each one of the concurrent requests of the
+        # executor
+        session.mount('https://', HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers
+        ))
+        session.headers.update(
             {
                 'X-EMC-REST-CLIENT': 'true',
                 "Content-type": "application/json",
@@ -45,12 +75,25 @@ class UnityREST(object):
         )
 
         if self.mock is not None:
-            self.unity.request = self.mock
+            session.request = self.mock
+        return session
 
     def login(self, ip_address, username, password):
         self.__ip_address = ip_address
+        if self.pool is not None:
+            self.__pool_key = self.pool.key(ip_address, username, password)
+            pooled = self.pool.acquire(self.__pool_key)
+            if pooled is not None:
+                self.logger.debug("login: re-using the session to %s",
+                                  ip_address)
+                self.unity = pooled.session
+                self._login_lock = pooled.login_lock
+                return
         self.unity.auth = (username, password)
+        self._authenticate()
 
+    def _authenticate(self):
+        self.unity.headers.pop('EMC-CSRF-TOKEN', None)
         response = self.get_type_instances("loginSessionInfo")
         if response.status_code == 401:
             raise NasConnectionException("Login failed", 1)
@@ -61,8 +104,67 @@ class UnityREST(object):
             }
         )
 
-    def request(self, endpoint, method='GET', data=None):
+    @property
+    def executor(self):
+        """ The RequestExecutor used to run independent requests to the
+        array at the same time.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = RequestExecutor(self.__ip_address,
+                                                 self.max_workers)
+            return self._executor
+
+    def logout(self):
+        """ Gives the session back to the pool to be re-used by the next
+        connection, or logs it out if there is no pool.
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+        if self.pool is None or self.__pool_key is None:
+            self.request(LOGOUT_ENDPOINT, 'POST')
+            return
+        self.pool.release(self.__pool_key,
+                          UnitySession(self.__ip_address, self.unity,
+                                       self._login_lock))
+        self.unity = self._new_session()
+        self._login_lock = threading.Lock()
+
+    def _record_attempt(self, endpoint, method, attempt, started,
+                        status=None, error=None):
+        """ Keeps the timing of a request attempt in "request_metrics", so the
+        retry policy can be tuned.
+        """
+        elapsed = time.time() - started
+        error_name = error.__class__.__name__ if error is not None else None
+        self.request_metrics.append({
+            'endpoint': endpoint,
+            'method': method,
+            'attempt': attempt,
+            'status': status,
+            'error': error_name,
+            'elapsed': elapsed
+        })
+        self.logger.debug("request: attempt=%s status=%s error=%s "
+                          "elapsed=%.3fs", attempt, status, error_name,
+                          elapsed)
+
+    def _session_expired(self, endpoint, response):
+        """ Checks whether the response is a failure due to an expired session
+        or to a rejected CSRF token, which a new login fixes.
+        """
+        if self.unity.auth is None or 'loginSessionInfo' in endpoint:
+            return False
+        if response.status_code == 401:
+            return True
+        return response.status_code == 403 and \
+            'csrf' in str(response.content).lower()
+
+    def request(self, endpoint, method='GET', data=None, relogin=True):
         url = "https://" + self.__ip_address + endpoint
+        token = self.unity.headers.get('EMC-CSRF-TOKEN')
 
         # We want any changes made to the Unity to always be logged
         if method == 'POST' or method == 'DELETE':
@@ -85,8 +187,10 @@ class UnityREST(object):
             )
         )
 
-        tries = 3
-        delay = 3
+        policy = self.retry_policy
+        started = time.time()
+        tries = policy.max_attempts
+        attempt = 0
         while tries >= 0:
             self.logger.log(
                     logging.INFO,
@@ -97,28 +201,70 @@ class UnityREST(object):
                 raise NasConnectionException(
                         "request: request attempts exceeded"
                     )
+            attempt += 1
+            attempt_started = time.time()
             try:
                 response = self.unity.request(method, url, json=data,
                                               verify=False)
             except (requests.exceptions.ConnectionError) as exception:
+                self._record_attempt(endpoint, method, attempt,
+                                     attempt_started, error=exception)
                 self.logger.log(
                         logging.INFO,
                         "request: exception=%s endpoint=%s" %
                             (exception, endpoint)
                     )
                 tries -= 1
+                if not policy.retry_error(method, exception):
+                    raise NasConnectionException(
+                        "request: %s %s failed: %s" % (method, endpoint,
+                                                       exception)
+                    )
+                if tries == 0:
+                    continue
+                delay = policy.delay(attempt)
+                if policy.expired(started, delay):
+                    raise NasConnectionException(
+                        "request: retry deadline exceeded for %s" % endpoint
+                    )
                 self.logger.log(
                         logging.INFO,
-                        "request: delay for %s seconds" % delay
+                        "request: delay for %g seconds" % delay
                     )
                 sleep(delay)
             else:
-                break
+                self._record_attempt(endpoint, method, attempt,
+                                     attempt_started,
+                                     status=response.status_code)
+                tries -= 1
+                if tries == 0 or \
+                        not policy.retry_status(method, response.status_code):
+                    break
+                delay = policy.delay(attempt, response)
+                if policy.expired(started, delay):
+                    break
+                self.logger.log(
+                        logging.INFO,
+                        "request: status_code=%s endpoint=%s, delay for %g "
+                        "seconds" % (response.status_code, endpoint, delay)
+                    )
+                sleep(delay)
 
         self.logger.log(
             level,
             "request: response status_code %s" % response.status_code
         )
+        if relogin and self._session_expired(endpoint, response):
+            self.logger.log(
+                logging.INFO,
+                "request: session expired, logging in again"
+            )
+            with self._login_lock:
+                # another thread sharing the session might have logged in
+                # again meanwhile
+                if self.unity.headers.get('EMC-CSRF-TOKEN') == token:
+                    self._authenticate()
+            return self.request(endpoint, method, data, relogin=False)
         self.logger.log(level, "request: content %s" % str(response.content))
         if response.content is not None and len(response.content) > 0 \
             and 'content-type' in response.headers \
@@ -133,16 +279,55 @@ class UnityREST(object):
         return response
 
     def get_type_instances(self, typename, fields=None, filter_arg=None):
+        response = self.request(
+            self._instances_url(typename, fields, filter_arg)
+        )
+        return response
+
+    def iter_type_instances(self, typename, fields=None, filter_arg=None,
+                            page_size=None):
+        """ Generator of the contents of the instances of a type, requesting
+        them in compact pages of "page_size" entries and following the
+        "next" links, so the whole collection is retrieved and each page is
+        yielded as soon as it arrives.
+        """
+        page_size = page_size or self.page_size
+        page = 1
+        while True:
+            url = self._instances_url(typename, fields, filter_arg, [
+                'compact=true',
+                'per_page=%s' % page_size,
+                'page=%s' % page
+            ])
+            response = self.request(url)
+            if response.status_code != 200:
+                raise NasExecCommandException(
+                    "Listing of %s page %s failed with http_error=%s" %
+                        (typename, page, response.status_code),
+                    1
+                )
+            response_json = response.json()
+            for entry in response_json.get('entries', []):
+                yield entry['content']
+            links = response_json.get('links') or []
+            if not any(link.get('rel') == 'next' for link in links):
+                return
+            page += 1
+
+    @staticmethod
+    def _instances_url(typename, fields=None, filter_arg=None,
+                       extra_args=None):
         query_args = []
         if filter_arg is not None and len(filter_arg) > 0:
             query_args.append('filter=%s' % " and ".join(filter_arg))
         if fields is not None and len(fields) > 0:
             query_args.append('fields=%s' % ','.join(fields))
+        if extra_args:
+            query_args.extend(extra_args)
         url = '/api/types/%s/instances' % typename
         if len(query_args) > 0:
             url = "%s?%s" % (url, '&'.join(query_args))
-        response = self.request(url)
-        return response
+        return url
 
     def get_type_instance_for_id(self, typename, id_arg, fields):
         response = self.request(
@@ -155,6 +340,8 @@ class UnityREST(object):
         if response.status_code == 200:
             return response.json()['content']
         elif response.status_code == 404:
+            # the id might come from a cached instance
+            self.id_cache.invalidate_id(typename, id_arg)
             return None
         else:
             raise NasExecCommandException(
@@ -164,6 +351,14 @@ class UnityREST(object):
             )
 
     def get_type_instance_for_name(self, typename, instname, fields):
+        found, content = self.id_cache.get(typename, instname, fields)
+        if found:
+            self.logger.debug(
+                "get_type_instance_for_name: %s/%s found in the cache",
+                typename,
+                instname
+            )
+            return content
         response = self.request(
             '/api/instances/%s/name:%s?fields=%s' % (
                 typename,
@@ -172,8 +367,11 @@ class UnityREST(object):
             )
         )
         if response.status_code == 200:
-            return response.json()['content']
+            content = response.json()['content']
+            self.id_cache.set(typename, instname, fields, content)
+            return content
         elif response.status_code == 404:
+            self.id_cache.set(typename, instname, fields, None)
             return None
         else:
             raise NasExecCommandException(
@@ -200,6 +398,8 @@ class UnityREST(object):
 
     def delete_instance(self, typename, id_arg):
         endpoint = '/api/instances/%s/%s' % (typename, id_arg)
+        self.id_cache.invalidate(typename)
+        self.id_cache.invalidate_id(typename, id_arg)
         response = self.request(endpoint, 'DELETE')
         if response.status_code != 204:
             raise NasExecCommandException(
@@ -209,6 +409,9 @@ class UnityREST(object):
             )
 
     def create_post(self, endpoint, request_data):
+        # the endpoints are either /api/types/<type>/... or
+        # /api/instances/<type>/...
+        self.id_cache.invalidate(endpoint.split('/')[3])
         response = self.request(endpoint, 'POST', request_data)
         good_responses = [200, 201, 204]
         if response.status_code not in good_responses:
@@ -229,7 +432,10 @@ class UnityREST(object):
             instance,
             action
         )
+        self.id_cache.invalidate(instance_type)
         response = self.request(endpoint, 'POST', request_data)
+        if response.status_code == 404:
+            self.id_cache.invalidate_id(instance_type, instance)
         if response.status_code != 204 and response.status_code != 200:
             raise NasExecCommandException(
                 "action %s failed for %s/%s: %s" % (
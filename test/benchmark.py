@@ -0,0 +1,371 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2021
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+""" Benchmarks of the SFS/VA output parsers and of the resources list
+builders, using synthetic outputs of "vxprint -hrAF", "vxdisk listtag",
+"storage fs list", "nfs share show", "storage rollback list" and
+"storage rollback cache list" with a given number of objects, and of the
+classification of the errors of the failed commands.
+
+The results are emitted as JSON and can be compared against the results of
+a previous run to catch regressions, e.g.:
+
+    PYTHONPATH=src:test python test/benchmark.py --output base.json
+    PYTHONPATH=src:test python test/benchmark.py --baseline base.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from naslib.drivers.sfs.parsers import VxGenericListOutput, VxPrintOutput
+from naslib.drivers.sfs.resources import FileSystemResource, ShareResource, \
+    SnapshotResource, CacheResource
+from naslib.drivers.va.resources import FileSystemResource as \
+    VaFileSystemResource, ShareResource as VaShareResource, \
+    CacheResource as VaCacheResource
+
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25
+OBJECTS_PER_DISK = 50
+
+FS_LINE_FORMATS = {
+    # SFS 5.7P3HF3
+    'sfs_hf3': "%(name)-25s online      %(size)-7s simple              -"
+               "         -           3%%     no          no           no"
+               "           %(pool)s",
+    # SFS 5.7MP1P3
+    'sfs_mp1p3': "%(name)-25s online      %(size)-7s simple              -"
+                 "         -           3%%     no          no           no"
+                 "      no      %(pool)s",
+    # ISA 7.1 (VA), with no pool information
+    'va': "%(name)-25s online      %(size)-7s simple              -"
+          "         -           3%%     no          no           no"
+          "           no",
+}
+
+
+class BenchmarkNas(object):
+    """ Minimal NAS object required by the resources builders, having the
+    parsed "vxprint" data already available in its snapshot.
+
+    >>> nas = BenchmarkNas({'fs_1': {}})
+    >>> str(nas), nas.vxprint_snapshot.data
+    ('BenchmarkNas', {'fs_1': {}})
+    """
+
+    class Snapshot(object):
+        def __init__(self, data):
+            self.data = data
+
+    def __init__(self, vx_data=None):
+        self.vxprint_snapshot = self.Snapshot(vx_data or {})
+
+    def __str__(self):
+        return self.__class__.__name__
+
+    def debug(self, msg):
+        pass
+
+
+def fs_name(index):
+    return "bench_fs_%06d" % index
+
+
+def disk_name(index):
+    return "emc_clariion0_%d" % (index / OBJECTS_PER_DISK)
+
+
+def pool_name(index):
+    return "bench_pool_%d" % (index / OBJECTS_PER_DISK % 4)
+
+
+def generate_vxprint(size):
+    """ Generates a "vxprint -hrAF" output with a volume, a plex, two
+    subdisks and a data change object for each one of the file systems.
+
+    >>> data = VxPrintOutput(generate_vxprint(2)).parse()
+    >>> 'bench_fs_000000' in data, 'bench_fs_000001' in data
+    (True, True)
+    >>> data['bench_fs_000001']['sd'][1]['device']
+    'emc_clariion0_0'
+    >>> data['bench_fs_000001']['dc']['sd'][0]['name']
+    'emc_clariion0_0-bench_fs_000001-dcl'
+    """
+    lines = ["Disk group: sfsdg", "",
+             "TY NAME         ASSOC        KSTATE   LENGTH   PLOFFS   STATE"
+             "    TUTIL0  PUTIL0",
+             "dg sfsdg        sfsdg        -        -        -        -"
+             "        -       -", ""]
+    for disk in range(0, size, OBJECTS_PER_DISK):
+        name = disk_name(disk)
+        lines.append("dm %s %s - 314506960 - - - -" % (name, name))
+    for index in range(size):
+        name, disk = fs_name(index), disk_name(index)
+        lines.extend([
+            "",
+            "v  %s fsgen ENABLED 2097152 - ACTIVE - -" % name,
+            "pl %s-01 %s ENABLED 2097152 - ACTIVE - -" % (name, name),
+            "sd %s-%s-01 %s-01 ENABLED 1048576 0 - - - %s" %
+            (disk, name, name, disk),
+            "sd %s-%s-02 %s-01 ENABLED 1048576 1048576 - - - %s" %
+            (disk, name, name, disk),
+            "dc %s_dco %s - - - - - -" % (name, name),
+            "v  %s_dcl gen ENABLED 544 - ACTIVE - -" % name,
+            "pl %s_dcl-01 %s_dcl ENABLED 544 - ACTIVE - -" % (name, name),
+            "sd %s-%s-dcl %s_dcl-01 ENABLED 544 0 - - - %s" %
+            (disk, name, name, disk)])
+    return '\n'.join(lines) + '\n'
+
+
+def generate_vxdisk_listtag(size):
+    """ Generates a "vxdisk listtag" output with the disks used by the
+    given number of objects.
+
+    >>> data = VxGenericListOutput(generate_vxdisk_listtag(60), 'device')
+    >>> sorted([(k, v['value']) for k, v in data.parse().items()])
+    [('emc_clariion0_0', 'bench_pool_0'), ('emc_clariion0_1', 'bench_pool_1')]
+    """
+    lines = ["DEVICE       \tNAME                         \tVALUE"]
+    for disk in range(0, size, OBJECTS_PER_DISK):
+        lines.append("%s\tsite                         \t%s" %
+                     (disk_name(disk), pool_name(disk)))
+    return '\n'.join(lines)
+
+
+def generate_fs_list(size, line_format='sfs_hf3'):
+    """ Generates the lines of a "storage fs list" output, without the two
+    header lines, in one of the keys of FS_LINE_FORMATS.
+
+    >>> print '\\n'.join(generate_fs_list(1, 'va'))
+    bench_fs_000000           online      1.00G   simple              \
+-         -           3%     no          no           no           no
+    """
+    line = FS_LINE_FORMATS[line_format]
+    return [line % dict(name=fs_name(i), size="1.00G", pool=pool_name(i))
+            for i in range(size)]
+
+
+def generate_share_show(size, faulted_every=10):
+    """ Generates the lines of a "nfs share show" output and the lines of
+    its "Faulted Shares:" section, with one faulted share for each
+    "faulted_every" shares.
+
+    >>> shares, faulted = generate_share_show(20)
+    >>> print '\\n'.join(shares[:2] + faulted)
+    /vx/bench_fs_000000    10.44.0.0 (rw,sync,no_root_squash)
+    /vx/bench_fs_000001    10.44.0.1 (rw,sync,no_root_squash)
+    /vx/bench_fs_000000    10.44.0.0: CLUSTER_NAME
+    /vx/bench_fs_000010    10.44.0.10: CLUSTER_NAME
+    """
+    shares, faulted = [], []
+    for index in range(size):
+        path = "/vx/%s" % fs_name(index)
+        client = "10.44.%d.%d" % (index / 256 % 256, index % 256)
+        shares.append("%s    %s (rw,sync,no_root_squash)" % (path, client))
+        if not index % faulted_every:
+            faulted.append("%s    %s: CLUSTER_NAME" % (path, client))
+    return shares, faulted
+
+
+def generate_rollback_list(size):
+    """ Generates the lines of a "storage rollback list" output.
+
+    >>> generate_rollback_list(1)
+    ['bench_rb_000000  spaceopt  bench_fs_000000  2015/04/08 16:11']
+    """
+    return ["bench_rb_%06d  spaceopt  %s  2015/04/08 16:11" %
+            (i, fs_name(i)) for i in range(size)]
+
+
+def generate_cache_list(size):
+    """ Generates the lines of a "storage rollback cache list" output.
+
+    >>> generate_cache_list(1)
+    ['bench_cache_000000  1024  204  (20)  820  (80)  3']
+    """
+    return ["bench_cache_%06d  1024  204  (20)  820  (80)  3" % i
+            for i in range(size)]
+
+
+def generate_errors(size):
+    """ Generates a list of error texts of the failed "storage rollback
+    destroy" commands.
+
+    >>> generate_errors(3)[1]
+    'SFS rollback ERROR V-288-3075 Specified rollback bench_rb_000001 does \
+not exist.'
+    """
+    errors = ["SFS rollback ERROR V-288-0 Rollback %(rb)s dissociate failed.",
+              "SFS rollback ERROR V-288-3075 Specified rollback %(rb)s does "
+              "not exist.",
+              "SFS fs ERROR V-288-0 File system %(fs)s does not exist.",
+              "SFS rollback ERROR V-288-0 unexpected error for %(rb)s."]
+    return [errors[i % len(errors)] % dict(rb="bench_rb_%06d" % i,
+                                           fs=fs_name(i))
+            for i in range(size)]
+
+
+def build_benchmarks(size):
+    """ Returns a list of tuples (name, function) for the given size. The
+    outputs are generated beforehand, so only the parsing and the building
+    of the objects are timed.
+    """
+    vxprint = generate_vxprint(size)
+    listtag = generate_vxdisk_listtag(size)
+    vx_data = VxPrintOutput(vxprint, records=True).parse()
+    sfs_fs = FileSystemResource(BenchmarkNas(vx_data))
+    va_fs = VaFileSystemResource(BenchmarkNas(vx_data))
+    sfs_share = ShareResource(BenchmarkNas())
+    va_share = VaShareResource(BenchmarkNas())
+    snapshot = SnapshotResource(BenchmarkNas())
+    sfs_cache = CacheResource(BenchmarkNas())
+    va_cache = VaCacheResource(BenchmarkNas())
+    fs_hf3 = generate_fs_list(size, 'sfs_hf3')
+    fs_mp1p3 = generate_fs_list(size, 'sfs_mp1p3')
+    fs_va = generate_fs_list(size, 'va')
+    shares, faulted = generate_share_show(size)
+    rollbacks = generate_rollback_list(size)
+    caches = generate_cache_list(size)
+    va_caches = [c.replace('(20)', '(20.0)').replace('(80)', '(80.0)')
+                 for c in caches]
+    errors = generate_errors(size)
+    delete_errors = SnapshotResource.delete_errors
+    return [
+        ('VxPrintOutput.parse',
+         lambda: VxPrintOutput(vxprint).parse()),
+        ('VxPrintOutput.parse[records]',
+         lambda: VxPrintOutput(vxprint, records=True).parse()),
+        ('VxGenericListOutput.parse[vxdisk listtag]',
+         lambda: VxGenericListOutput(listtag, 'device').parse()),
+        ('FileSystemResource._build_filesystems_list[sfs_hf3]',
+         lambda: sfs_fs._build_filesystems_list(fs_hf3)),
+        ('FileSystemResource._build_filesystems_list[sfs_mp1p3]',
+         lambda: sfs_fs._build_filesystems_list(fs_mp1p3)),
+        ('FileSystemResource._build_filesystems_list[va]',
+         lambda: va_fs._build_filesystems_list(fs_va)),
+        ('ShareResource._build_shares_list[sfs]',
+         lambda: sfs_share._build_shares_list(shares, faulted)),
+        ('ShareResource._build_shares_list[va]',
+         lambda: va_share._build_shares_list(shares, faulted)),
+        ('ResourceBase._build_nas_object_list[rollback]',
+         lambda: snapshot._build_nas_object_list(rollbacks)),
+        ('ResourceBase._build_nas_object_list[sfs cache]',
+         lambda: sfs_cache._build_nas_object_list(caches)),
+        ('ResourceBase._build_nas_object_list[va cache]',
+         lambda: va_cache._build_nas_object_list(va_caches)),
+        # the rules are searched one by one, it only catches regressions
+        ('ErrorClassifier.classify[rollback destroy]',
+         lambda: [delete_errors.classify(e) for e in errors]),
+    ]
+
+
+def timeit(func, repeat):
+    """ Runs the function "repeat" times and returns the list of timings in
+    seconds.
+
+    >>> len(timeit(lambda: None, 3))
+    3
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+    return timings
+
+
+def run(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, names=None):
+    """ Runs the benchmarks which name contains any of the given "names"
+    for each one of the sizes and returns the results as a dict.
+    """
+    results = []
+    for size in sizes:
+        for name, func in build_benchmarks(size):
+            if names and not any([n in name for n in names]):
+                continue
+            timings = timeit(func, repeat)
+            results.append(dict(name=name, size=size, repeat=repeat,
+                                best=min(timings),
+                                mean=sum(timings) / len(timings),
+                                per_object_us=min(timings) / size * 1e6))
+    return dict(created=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                python=platform.python_version(),
+                platform=platform.platform(), results=results)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """ Returns the list of the results which best timing is slower than
+    the same benchmark and size in the baseline by more than "threshold"
+    (ratio).
+
+    >>> base = dict(results=[dict(name='a', size=10, best=1.0)])
+    >>> new = dict(results=[dict(name='a', size=10, best=1.5),
+    ...                     dict(name='b', size=10, best=1.0)])
+    >>> [(r['name'], r['ratio']) for r in compare(new, base)]
+    [('a', 1.5)]
+    """
+    previous = dict([((r['name'], r['size']), r['best'])
+                     for r in baseline['results']])
+    regressions = []
+    for result in results['results']:
+        best = previous.get((result['name'], result['size']))
+        if not best:
+            continue
+        ratio = result['best'] / best
+        if ratio > 1 + threshold:
+            regression = dict(result)
+            regression.update(baseline_best=best, ratio=round(ratio, 2))
+            regressions.append(regression)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='benchmarks of the SFS/VA parsers and list builders')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(DEFAULT_SIZES),
+                        help='number of objects of the synthetic outputs')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='number of runs of each benchmark')
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help='run only the benchmarks containing NAME')
+    parser.add_argument('--output', help='JSON file to write the results')
+    parser.add_argument('--baseline',
+                        help='JSON results of a previous run to compare to')
+    parser.add_argument('--threshold', type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.only)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as wfile:
+            wfile.write(output + '\n')
+    else:
+        print output
+
+    if args.baseline:
+        with open(args.baseline) as rfile:
+            baseline = json.load(rfile)
+        regressions = compare(results, baseline, args.threshold)
+        for reg in regressions:
+            sys.stderr.write("REGRESSION %(name)s size=%(size)s: %(best).4fs "
+                             "vs %(baseline_best).4fs (x%(ratio)s)\n" % reg)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,10 @@
 """
 
 import mock
+import os
 import re
+import threading
+import time
 import unittest
 import base64
 from paramiko.rsakey import RSAKey
@@ -24,7 +27,8 @@ from naslib import NasDrivers
 from naslib.nasexceptions import NasExecCommandException, NasException, \
     NasExecutionTimeoutException, NasBadPrivilegesException, \
     NasBadUserException, NasDriverDoesNotExist, NasConnectionException, \
-    NasUnexpectedOutputException, NasIncompleteParsedInformation
+    NasUnexpectedOutputException, NasIncompleteParsedInformation, \
+    UnableToDiscoverDriver
 from naslib.objects import Pool, FileSystem, Disk, Share, Cache, Snapshot
 from naslib.resourceprops import StringOptions, Size
 from naslib.drivers.sfs.resources import ShareResource
@@ -39,9 +43,13 @@ from naslib.drivers.sfs.sfsmock.dbresources import SfsMockDbFilesystem,\
     FORCE_ERROR_OFFLINE, ANY_ERROR_FOR_FS_RESIZE
 from naslib.drivers.sfs.utils import VxCommands, VxCommandsException
 from naslib.nasmock.mockexceptions import MockException
+from naslib.connection import NasConnection
 from naslib.nasmock.connection import NasConnectionMock
 from naslib.nasmock.ssh import SshClientMock
-from naslib.ssh import SSHClient
+from naslib.ssh import SSHClient, SSHConnectionPool
+from naslib.discoverycache import DiscoveryCache
+from naslib.listcache import ResourceListCache
+from naslib.resourcelist import IndexedResourceList
 from naslib.paramikopatch import PatchedTransport, AutoAddPolicy, \
                   PatchedBadHostKeyException, SSHClient as ParamikoSSHClient, \
                   PatchedHostKeys
@@ -1794,3 +1802,794 @@ A2345_6789-fs1            online      3.00G    simple              -         -
                                   (0, 'out', 'cat: /opt/VRTSnas/log/vxvmtag.lock.lock: '
         'No such file or directory'))
         self.assertEqual(['out'], sfs.execute('command'))
+
+    @mock.patch('naslib.ssh.ParamikoSSHClient')
+    def test_ssh_connection_pool(self, paramiko_client):
+        pool = SSHConnectionPool(max_size=1, idle_timeout=60)
+        transport = mock.Mock()
+        transport.is_active.return_value = True
+        paramiko_client.return_value.get_transport.return_value = transport
+        client = SSHClient('somehost', 'user', 'password', pool=pool)
+        client.connect()
+        self.assertEqual(paramiko_client.call_count, 1)
+        first = client._ssh
+        client.close()
+        self.assertEqual(len(pool), 1)
+        self.assertFalse(first.close.called)
+
+        # the same credentials re-use the live pooled transport
+        client = SSHClient('somehost', 'user', 'password', pool=pool)
+        client.connect()
+        self.assertEqual(paramiko_client.call_count, 1)
+        self.assertTrue(client._ssh is first)
+        client.close()
+
+        # other credentials never share a transport
+        other = SSHClient('somehost', 'user', 'other', pool=pool)
+        other.connect()
+        self.assertEqual(paramiko_client.call_count, 2)
+
+        # a dead pooled transport is closed and a new one is created
+        transport.is_active.return_value = False
+        client = SSHClient('somehost', 'user', 'password', pool=pool)
+        client.connect()
+        self.assertTrue(first.close.called)
+        self.assertEqual(paramiko_client.call_count, 3)
+        self.assertEqual(len(pool), 0)
+        client.close()
+        pool.clear()
+
+    @mock.patch('naslib.ssh.ParamikoSSHClient')
+    def test_ssh_connect_concurrently(self, paramiko_client):
+        import threading
+        clients = []
+        connected = set()
+
+        def new_client():
+            client = mock.Mock()
+            client.get_transport.return_value.is_active.return_value = True
+
+            def connect(*args, **kwargs):
+                time.sleep(0.05)
+                connected.add(client)
+
+            client.connect.side_effect = connect
+            clients.append(client)
+            return client
+
+        def get_ssh():
+            ssh = client.ssh
+            got.append((ssh, ssh in connected))
+
+        paramiko_client.side_effect = new_client
+        client = SSHClient('somehost', 'user', 'password')
+        got = []
+        # a single thread connects, the others wait for its connection
+        threads = [threading.Thread(target=get_ssh) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(clients), 1)
+        self.assertEqual(got, [(clients[0], True)] * 5)
+
+        # close() waits for a connection being established
+        client.close()
+        got = []
+        thread = threading.Thread(target=get_ssh)
+        thread.start()
+        time.sleep(0.01)
+        client.close()
+        thread.join()
+        self.assertEqual(got, [(clients[1], True)])
+        self.assertTrue(clients[1].close.called)
+        self.assertTrue(client._ssh is None)
+
+    def test_ssh_connection_pool_idle_timeout(self):
+        pool = SSHConnectionPool(max_size=5, idle_timeout=0)
+        key = pool.key('somehost', 22, 'user', 'password')
+        connection = mock.Mock()
+        pool.release(key, connection)
+        with mock.patch('time.time', return_value=time.time() + 1):
+            self.assertEqual(pool.acquire(key), None)
+        self.assertTrue(connection.close.called)
+
+        # the idle connections are closed by a timer, not only on acquire
+        pool = SSHConnectionPool(max_size=5, idle_timeout=0.05)
+        connection = mock.Mock()
+        pool.release(key, connection)
+        for _ in range(50):
+            if connection.close.called:
+                break
+            time.sleep(0.1)
+        self.assertTrue(connection.close.called)
+        self.assertEqual(len(pool), 0)
+
+    def test_ssh_connection_pool_key(self):
+        import hashlib
+        key = SSHConnectionPool.key('somehost', 22, 'user', 'password')
+        self.assertEqual(key[:3], ('somehost', 22, 'user'))
+        self.assertNotEqual(key[3], hashlib.sha256('password').hexdigest())
+        self.assertEqual(key, SSHConnectionPool.key('somehost', 22, 'user',
+                                                    u'password'))
+
+    @mock.patch('naslib.ssh.ParamikoSSHClient')
+    def test_ssh_connection_pool_discard(self, paramiko_client):
+        pool = SSHConnectionPool(max_size=1, idle_timeout=60)
+        transport = mock.Mock()
+        transport.is_active.return_value = True
+        paramiko_client.return_value.get_transport.return_value = transport
+        conn = NasConnection('somehost', 'user', 'password')
+        conn.ssh.pool = pool
+        conn.ssh.connect()
+        first = conn.ssh._ssh
+        # a context that exited with an error never releases its connection
+        self.assertRaises(ValueError, conn.__exit__, ValueError,
+                          ValueError("error"), None)
+        self.assertTrue(first.close.called)
+        self.assertEqual(len(pool), 0)
+
+    def test_execute_batch(self):
+        mock_args = "10.44.86.226", "support", "support"
+        cmds = ["nfs share show", "storage fs list", "storage rollback list",
+                "storage rollback cache list"]
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name) as s:
+            expected = [s.execute(cmd) for cmd in cmds]
+            run = mock.Mock(side_effect=s.ssh.run)
+            with mock.patch.object(s.ssh, 'run', run):
+                self.assertEqual(s.execute_batch(cmds), expected)
+            # a single remote execution, replayed command by command by the
+            # mock
+            batch_cmd = run.call_args_list[0][0][0]
+            self.assertTrue(all(cmd in batch_cmd for cmd in cmds))
+            self.assertEqual(run.call_count, 1 + len(cmds))
+            self.assertEqual(s.execute_batch([]), [])
+
+            # errors are classified per command
+            cmds = ["storage fs list", "storage fs destroy not_existent_fs"]
+            self.assertRaises(NasExecCommandException, s.execute_batch, cmds)
+            result = s.execute_batch(cmds, raise_on_error=False)
+            self.assertEqual(result[0], expected[1])
+            self.assertTrue(isinstance(result[1], NasExecCommandException))
+
+    def test_execute_batch_output(self):
+        ssh_mock = SshClientMock("10.44.86.226", "support", "support")
+        sfs = SfsMock(ssh_mock)
+        sfs._check_console = mock.Mock()
+        marker = re.compile(r'"(NASLIB_BATCH_\w+_\d)" \$\?')
+
+        def run(cmd, timeout=None):
+            first, second = marker.findall(cmd)
+            out = "line1\n\n%s 0\nline2\nline3\n\n%s 0\n" % (first, second)
+            err = "\n%s\n...\n\n%s\n" % (first, second)
+            return 0, out, err
+
+        ssh_mock.run = run
+        self.assertEqual(sfs.execute_batch(["cmd1", "cmd2"]),
+                         [["line1"], ["line2", "line3"]])
+
+        # the outputs without a trailing new line, run by a real shell
+        import subprocess
+
+        def run_sh(cmd, timeout=None):
+            proc = subprocess.Popen(['sh', '-c', cmd], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+            out, err = proc.communicate()
+            return proc.returncode, out, err
+
+        ssh_mock.run = run_sh
+        sfs._clish_cmd = lambda cmd, env=None: cmd
+        self.assertEqual(sfs.execute_batch(["printf line1", "printf ''",
+                                            "printf 'line2\nline3'"]),
+                         [["line1"], [], ["line2", "line3"]])
+
+        # a non-zero exit status fails the command even with stdout only
+        cmds = ["sh -c 'echo share add failed; exit 3'", "echo ok"]
+        self.assertRaises(NasExecCommandException, sfs.execute_batch, cmds)
+        result = sfs.execute_batch(cmds, raise_on_error=False)
+        self.assertTrue(isinstance(result[0], NasExecCommandException))
+        self.assertEqual(str(result[0]), "share add failed")
+        self.assertEqual(result[1], ["ok"])
+        ssh_mock.run = lambda cmd, timeout=None: (1, "", "connection lost")
+        self.assertRaises(NasExecCommandException, sfs.execute_batch,
+                          ["cmd1", "cmd2"])
+
+    def test_run_many(self):
+        import threading
+        client = SSHClient('somehost', 'user', 'password')
+        client._ssh = mock.Mock()
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def run(cmd, timeout=None):
+            with lock:
+                running.append(cmd)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(cmd)
+            if cmd == 'timeout':
+                raise NasExecutionTimeoutException(cmd)
+            return 0, "%s %s" % (cmd, timeout), ""
+
+        client.run = run
+        client.max_channels = 2
+        cmds = ['ls', ('vxprint', 10), 'vxdisk listtag', 'vxdg -q list']
+        self.assertEqual(client.run_many(cmds, timeout=5),
+                         [(0, 'ls 5', ''), (0, 'vxprint 10', ''),
+                          (0, 'vxdisk listtag 5', ''),
+                          (0, 'vxdg -q list 5', '')])
+        self.assertTrue(max(peak) <= 2)
+        self.assertRaises(NasExecutionTimeoutException, client.run_many,
+                          ['ls', 'timeout'])
+
+    def test_run_many_channel_limits(self):
+        # the clients of the same host share the running channels, each one
+        # waiting against its own limit
+        running = []
+        peak = []
+        lock = threading.Lock()
+        all_started = threading.Event()
+
+        def run(cmd, timeout=None):
+            with lock:
+                running.append(cmd)
+                peak.append(len(running))
+                if len(running) == 3:
+                    all_started.set()
+            all_started.wait(0.3)
+            with lock:
+                running.remove(cmd)
+            return 0, cmd, ""
+
+        first = SSHClient('limitshost', 'user', 'password')
+        first.max_channels = 1
+        first._ssh = mock.Mock()
+        first.run = run
+        first.run_many(['ls'])
+        second = SSHClient('limitshost', 'user', 'password')
+        second.max_channels = 3
+        second._ssh = mock.Mock()
+        second.run = run
+        self.assertEqual([r[1] for r in second.run_many(['a', 'b', 'c'])],
+                         ['a', 'b', 'c'])
+        self.assertEqual(max(peak), 3)
+
+        # a client with a lower limit waits for the channels of the others
+        del peak[:]
+        all_started.clear()
+        thread = threading.Thread(target=second.run_many, args=(['a', 'b'],))
+        thread.start()
+        while len(running) < 2:
+            time.sleep(0.01)
+        first.run_many(['c'])
+        thread.join()
+        self.assertEqual(peak, [1, 2, 1])
+
+    @mock.patch('naslib.ssh.SSHClient.connect')
+    def test_run_stream(self, connect):
+        import socket
+        client = SSHClient('somehost', 'user', 'password')
+        client._ssh = mock.Mock()
+        client.is_connected = mock.Mock(return_value=True)
+        stdout = StringIO('line1\nline2\r\n')
+        stdout.channel = mock.Mock()
+        stdout.channel.recv_exit_status.return_value = 0
+        stderr = StringIO('warning\n')
+        client._ssh.exec_command.return_value = (None, stdout, stderr)
+        errors = []
+        lines = list(client.run_stream('vxprint', stderr=errors))
+        self.assertEqual(lines, ['line1', 'line2'])
+        self.assertEqual(errors, ['warning'])
+
+        stdout = StringIO('')
+        stdout.channel = mock.Mock()
+        stdout.channel.recv_exit_status.return_value = 1
+        client._ssh.exec_command.return_value = (None, stdout,
+                                                 StringIO('failed\n'))
+        self.assertRaises(NasExecCommandException, list,
+                          client.run_stream('vxprint'))
+
+        client._ssh.exec_command.side_effect = socket.timeout
+        self.assertRaises(NasExecutionTimeoutException, list,
+                          client.run_stream('vxprint', timeout=1))
+
+    def test_vx_execute_stream(self):
+        mock_args = "10.44.86.226", "support", "support"
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name) as s:
+            vx = VxCommands(s)
+            s.ssh.run = mock.Mock(return_value=(0, 'a\nb', ''))
+            self.assertEqual(list(vx.execute_stream('command')), ['a', 'b'])
+            s.ssh.run = mock.Mock(return_value=(0, 'a', 'this will fail'))
+            self.assertRaises(VxCommandsException, list,
+                              vx.execute_stream('command'))
+            s.ssh.run = mock.Mock(return_value=(1, '', ''))
+            self.assertRaises(VxCommandsException, list,
+                              vx.execute_stream('command'))
+
+    def test_get_driver_single_probe(self):
+        ssh = mock.Mock()
+        drivers = NasDrivers.get_drivers()
+        for name, driver_dict in drivers.items():
+            path = driver_dict['driver'].discovery_path
+            ssh.run.reset_mock()
+            ssh.run.return_value = (0, "%s\n" % path, "")
+            driver = NasDrivers.get_driver(ssh)
+            self.assertEqual(driver.__class__.__name__, name)
+            self.assertEqual(ssh.run.call_count, 1)
+            probe = ssh.run.call_args[0][0]
+            self.assertTrue(all(d['driver'].discovery_path in probe
+                                for d in drivers.values()))
+        ssh.run.return_value = (1, "", "")
+        self.assertRaises(UnableToDiscoverDriver, NasDrivers.get_driver, ssh)
+
+    def test_get_driver_last_path_missing(self):
+        import subprocess
+        import shutil
+        import tempfile
+        directory = tempfile.mkdtemp()
+        drivers = NasDrivers.get_drivers()
+        classes = [d['driver'] for d in drivers.values()]
+        paths = [c.discovery_path for c in classes]
+        ssh = mock.Mock()
+
+        def run(cmd, timeout=None):
+            # runs the probe locally with the status semantics of
+            # SSHClient.run: the stdout goes to err on a non-zero status
+            proc = subprocess.Popen(['sh', '-c', cmd], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+            out, err = proc.communicate()
+            if proc.returncode != 0:
+                return proc.returncode, "", out + err
+            return 0, out, err
+
+        ssh.run.side_effect = run
+        try:
+            for driver_class in classes:
+                local = os.path.join(directory, driver_class.__name__)
+                open(local, 'w').close()
+                patches = [mock.patch.object(c, 'discovery_path',
+                                             os.path.join(directory,
+                                                          c.__name__))
+                           for c in classes]
+                for patch in patches:
+                    patch.start()
+                try:
+                    self.assertEqual(NasDrivers.discover_driver_class(ssh),
+                                     driver_class)
+                finally:
+                    for patch in patches:
+                        patch.stop()
+                os.remove(local)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual([c.discovery_path for c in classes], paths)
+
+    def test_discovery_cache(self):
+        import shutil
+        import tempfile
+        directory = tempfile.mkdtemp()
+        try:
+            cache = DiscoveryCache(directory, ttl=60)
+            ssh = SshClientMock("10.44.86.226", "support", "support",
+                                mock_db=SfsMockDb())
+            run = mock.Mock(side_effect=ssh.run)
+            ssh.run = run
+            driver_class = NasDrivers.get_drivers()[self.driver_name]['driver']
+            with mock.patch.object(NasDrivers, 'discover_driver_class',
+                                   return_value=driver_class) as discover:
+                NasDrivers.get_driver(ssh, cache)
+                NasDrivers.get_driver(ssh, cache)
+            self.assertEqual(discover.call_count, 1)
+            self.assertEqual(cache.get(ssh)['driver'], self.driver_name)
+
+            sfs = SfsMock(ssh, discovery_cache=cache)
+            sfs._check_console()
+            calls = run.call_count
+            sfs = SfsMock(ssh, discovery_cache=cache)
+            sfs._check_console()
+            self.assertEqual(run.call_count, calls)
+            self.assertEqual(cache.get(ssh)['is_bash'], True)
+            self.assertEqual(cache.get(ssh)['is_master:'], True)
+
+            # a bad user invalidates the cache
+            cache.update(ssh, is_bash=False)
+            sfs = SfsMock(ssh, discovery_cache=cache)
+            self.assertRaises(NasBadUserException, sfs._check_console)
+            self.assertEqual(cache.get(ssh), None)
+
+            # a failed command checks again the capabilities from the cache
+            sfs = SfsMock(ssh, discovery_cache=cache)
+            sfs._check_console()
+            sfs = SfsMock(ssh, discovery_cache=cache)
+            sfs._check_console()
+            calls = run.call_count
+            self.assertRaises(NasExecCommandException, sfs.execute,
+                              "storage fs destroy not_existent_fs")
+            self.assertEqual(run.call_count, calls + 3)
+            self.assertEqual(cache.get(ssh)['is_bash'], True)
+            self.assertRaises(NasExecCommandException, sfs.execute,
+                              "storage fs destroy not_existent_fs")
+            self.assertEqual(run.call_count, calls + 4)
+
+            # so a stale cached value is discarded by a real failure
+            sfs = SfsMock(ssh, discovery_cache=cache)
+            sfs._check_console()
+            run.side_effect = lambda cmd, timeout=None: \
+                (0, "", "") if cmd == sfs.is_bash_cmd else \
+                (0, "", "clish: not allowed")
+            self.assertRaises(NasBadUserException, sfs.execute,
+                              "storage fs list")
+            self.assertEqual(cache.get(ssh), None)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_vxprint_snapshot(self):
+        mock_args = "10.44.86.226", "support", "support"
+        vxprint_cmd = re.compile(r"^vxprint -hrAF sd:'[^']*'$")
+        vxprint_name_cmd = re.compile(r"^vxprint -hrAF sd:'[^']*' [-\w]+$")
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            run = mock.Mock(side_effect=s.ssh.run)
+            s.ssh.run = run
+            count = lambda regex=vxprint_cmd: len(
+                [c for c in run.call_args_list if regex.match(c[0][0])])
+            filesystems = s.filesystem.list()
+            for fs in filesystems:
+                fs.properties
+            self.assertEqual(count(), 1)
+            # a single file system is looked up by its name only
+            s.filesystem.get(filesystems[0].name)
+            self.assertEqual(count(), 1)
+            self.assertEqual(count(vxprint_name_cmd), 1)
+
+            s.filesystem.delete(filesystems[0].name)
+            s.filesystem.list()
+            self.assertEqual(count(), 2)
+
+            s.vxprint_snapshot.ttl = -1
+            s.filesystem.list()
+            self.assertEqual(count(), 3)
+
+            # the properties keep the dicts with string values of vxprint()
+            fs = [f for f in s.filesystem.list() if f.properties.get('sd')][0]
+            self.assertEqual(fs.properties, VxCommands(s).vxprint(fs.name))
+            self.assertEqual(type(fs.properties['v']), dict)
+            self.assertEqual(type(fs.properties['sd'][0]), dict)
+            self.assertTrue(isinstance(fs.properties['v']['length'], str))
+
+    def test_filesystem_get_single_lookup(self):
+        mock_args = "10.44.86.226", "support", "support"
+        fs_list_cmd = re.compile(r"storage fs list( [-\w]+)?'")
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            filesystems = s.filesystem.list()
+            run = mock.Mock(side_effect=s.ssh.run)
+            s.ssh.run = run
+            calls = lambda: [fs_list_cmd.search(c[0][0]).group(1)
+                             for c in run.call_args_list
+                             if fs_list_cmd.search(c[0][0])]
+            for fs in filesystems:
+                item = s.filesystem.get(fs.name)
+                self.assertEqual(item.name, fs.name)
+                self.assertEqual(item.layout, fs.layout)
+                self.assertEqual(item.size, fs.size)
+                self.assertEqual(item.online, fs.online)
+            self.assertTrue(s.filesystem.exists(filesystems[0].name))
+            self.assertFalse(s.filesystem.exists("fs_does_not_exist"))
+            self.assertEqual(calls(), [" %s" % f.name for f in filesystems] +
+                             [" %s" % filesystems[0].name,
+                              " fs_does_not_exist"])
+
+            # the state comes from the node lines, not from any property
+            name = "lookup_fs"
+            s.filesystem.create(name, "10M", filesystems[0].pool.name)
+            s.filesystem.online(name, False)
+            self.assertFalse(s.filesystem.get(name).online)
+            s.filesystem.online(name)
+            self.assertTrue(s.filesystem.get(name).online)
+
+    def test_indexed_resource_list(self):
+        mock_args = "10.44.86.226", "support", "support"
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            shares = s.share.list()
+            self.assertTrue(isinstance(shares, IndexedResourceList))
+            for share in shares:
+                self.assertEqual(shares.find(share.name, share.client), share)
+                self.assertEqual(shares.filter_by('name', share.name),
+                                 [i for i in shares if i.name == share.name])
+            self.assertEqual(shares.find("/vx/not_exists", "10.0.0.1"), None)
+            clients_by_path = shares.clients_by_path
+            self.assertEqual(sorted(clients_by_path.keys()),
+                             sorted(set([i.name for i in shares])))
+            for path, clients in clients_by_path.items():
+                self.assertEqual(clients, [i.client for i in shares
+                                           if i.name == path])
+                self.assertEqual(shares.clients(path), clients)
+            self.assertEqual(shares.clients("/vx/not_exists"), [])
+            snapshots = s.snapshot.list()
+            self.assertTrue(isinstance(snapshots, IndexedResourceList))
+            for snap in snapshots:
+                self.assertTrue(snap in snapshots.filter_by('filesystem',
+                                                            snap.filesystem))
+            filesystems = s.filesystem.list()
+            self.assertEqual(filesystems.find(filesystems[-1].name),
+                             filesystems[-1])
+
+    def test_get_many_and_exists_many(self):
+        mock_args = "10.44.86.226", "support", "support"
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            shares = s.share.list()
+            filesystems = s.filesystem.list()
+            run = mock.Mock(side_effect=s.ssh.run)
+            s.ssh.run = run
+            identifiers = [(i.name, i.client) for i in shares]
+            found = s.share.get_many(identifiers)
+            self.assertEqual(sorted(found.keys()), sorted(identifiers))
+            for share in shares:
+                self.assertEqual(found[(share.name, share.client)], share)
+            self.assertEqual(run.call_count, 1)
+
+            names = [f.name for f in filesystems] + ["fs_does_not_exist"]
+            exists = s.filesystem.exists_many(names)
+            self.assertEqual(exists, dict([(n, n != "fs_does_not_exist")
+                                           for n in names]))
+            self.assertRaises(FileSystem.DoesNotExist,
+                              s.filesystem.get_many, names)
+            self.assertEqual(s.share.get_many([]), {})
+
+    def test_list_cache(self):
+        mock_args = "10.44.86.226", "support", "support"
+        fs_list_cmd = re.compile(r"storage fs list'")
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True, list_cache_ttl=60) as s:
+            run = mock.Mock(side_effect=s.ssh.run)
+            s.ssh.run = run
+            count = lambda: len([c for c in run.call_args_list
+                                 if fs_list_cmd.search(c[0][0])])
+            filesystems = s.filesystem.list()
+            self.assertEqual(s.filesystem.list(), filesystems)
+            self.assertEqual(count(), 1)
+
+            new_fs = s.filesystem.create("fs_list_cache", "10M", "SFS_Pool")
+            self.assertTrue(new_fs in s.filesystem.list())
+            self.assertEqual(count(), 2)
+            s.filesystem.list().pop()
+            self.assertTrue(new_fs in s.filesystem.list())
+            self.assertEqual(count(), 2)
+
+            s.filesystem.delete(new_fs.name)
+            self.assertFalse(new_fs in s.filesystem.list())
+            self.assertEqual(count(), 3)
+
+            s.list_cache.clear()
+            s.filesystem.list()
+            self.assertEqual(count(), 4)
+            s.list_cache.ttl = None
+            s.filesystem.list()
+            self.assertEqual(count(), 5)
+
+    def test_list_cache_concurrency(self):
+        mock_args = "10.44.86.226", "support", "support"
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True, list_cache_ttl=60) as s:
+            # a change finished while listing doesn't leave the old list
+            run = s.ssh.run
+
+            def changed_while_listing(cmd, timeout=None):
+                s.list_cache.invalidate('filesystem')
+                return run(cmd, timeout)
+
+            with mock.patch.object(s.ssh, 'run', changed_while_listing):
+                s.filesystem.list()
+            self.assertEqual(s.list_cache.get('filesystem'), None)
+            s.filesystem.list()
+            self.assertNotEqual(s.list_cache.get('filesystem'), None)
+
+        cache = ResourceListCache(ttl=0)
+        errors = []
+
+        def use_cache():
+            try:
+                for _ in range(500):
+                    cache.set('share', [])
+                    cache.get('share')
+                    cache.invalidate('share')
+            except Exception as err:  # pylint: disable=I0011,W0703
+                errors.append(err)
+
+        threads = [threading.Thread(target=use_cache) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_disk_group_alignments(self):
+        mock_args = "10.44.86.226", "support", "support"
+        vxdg_cmd = re.compile(r"^vxdg -q list")
+        vxdisk_cmd = re.compile(r"^vxdisk list \S+")
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            run = mock.Mock(side_effect=s.ssh.run)
+            s.ssh.run = run
+            count = lambda regex: len([c for c in run.call_args_list
+                                       if regex.match(c[0][0])])
+            filesystems = [f for f in s.filesystem.list()
+                           if f.properties.get('sd')]
+            alignments = [f.disk_alignment for f in filesystems]
+            self.assertTrue(len(filesystems) > 1)
+            self.assertEqual(alignments, [alignments[0]] * len(filesystems))
+            disks = set([f.properties['sd'][0]['name'].split('-')[0]
+                         for f in filesystems])
+            self.assertEqual(count(vxdisk_cmd), len(disks))
+            self.assertEqual(count(vxdg_cmd), 1)
+            for fs in s.filesystem.list():
+                if fs.properties.get('sd'):
+                    self.assertEqual(fs.disk_alignment, alignments[0])
+            self.assertEqual(count(vxdg_cmd), 1)
+
+    def test_get_pools_disks_for_objects(self):
+        mock_args = "10.44.86.226", "support", "support"
+        vx_cmd = re.compile(r"^(vxprint|vxdisk listtag)")
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            caches = s.cache.list()
+            run = mock.Mock(side_effect=s.ssh.run)
+            s.ssh.run = run
+            count = lambda: len([c for c in run.call_args_list
+                                 if vx_cmd.match(c[0][0])])
+            vx = VxCommands(s)
+            names = [c.name for c in caches]
+            pools_disks = vx.get_pools_disks_for_objects(names)
+            self.assertEqual(count(), 2)
+            self.assertEqual(sorted(pools_disks.keys()), sorted(names))
+            run_many = mock.Mock(side_effect=s.ssh.run_many)
+            with mock.patch.object(s.ssh, 'run_many', run_many):
+                for name in names:
+                    self.assertEqual(pools_disks[name],
+                                     vx.get_pools_disks_from_object(name))
+            # vxprint and vxdisk listtag run at the same time for each name
+            self.assertEqual(run_many.call_count, len(names))
+            run.reset_mock()
+            for cache in caches:
+                self.assertEqual(cache.pool.name, pools_disks[cache.name][1][0])
+            self.assertEqual(count(), 2)
+            vxprint_name = re.compile(r"^vxprint -hrAF sd:'[^']*' [-\w]+$")
+            run.reset_mock()
+            self.assertEqual(vx.get_pool_by_cache(caches[0].name),
+                             caches[0].pool.name)
+            self.assertEqual(len([c for c in run.call_args_list
+                                  if vxprint_name.match(c[0][0])]), 1)
+            cache = type(caches[0])(s.cache, "no_such_cache", "1M", None,
+                                    1, 1, 0)
+            self.assertRaises(VxCommandsException, cache.get_pool)
+            s.vxprint_snapshot.pools_disks[caches[0].name] = (['sdx'], [])
+            self.assertRaises(VxCommandsException, caches[0].get_pool)
+
+    def test_error_classifiers(self):
+        mock_args = "10.44.86.226", "support", "support"
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            fs_errors = s.filesystem.create_errors
+            self.assertEqual(fs_errors.classify("SFS fs ERROR V-288-678 "
+                "Pool(s) or disk(s) p1 does not exist."),
+                ('invalid_pool', Pool.DoesNotExist))
+            self.assertEqual(fs_errors.classify("SFS fs ERROR V-288-0 "
+                "Unable to create fs fs1 due to either insufficient "
+                "space/unavailable disk. Please run scanbus."),
+                ('insufficient_space', FileSystem.InsufficientSpaceException))
+            self.assertEqual(fs_errors.classify("SFS fs ERROR V-288-0 any"),
+                             (None, FileSystem.CreationException))
+            delete_errors = s.snapshot.delete_errors
+            self.assertEqual(delete_errors.classify("SFS rollback ERROR "
+                "V-288-3075 Specified rollback rb1 does not exist."),
+                ('snapshot_not_exist', Snapshot.DoesNotExist))
+            self.assertEqual(delete_errors.classify("Rollback rb1 does not "
+                "exist for file system fs1.\nFile system fs1 does not exist"),
+                ('fs_not_exist', FileSystem.DoesNotExist))
+            restore_errors = s.snapshot.restore_errors
+            out = "SFS rollback ERROR V-288-0 restore from rollback rb1 " \
+                  "failed.\nSFS fs ERROR File system fs1 does not exist"
+            self.assertEqual(restore_errors.matches(out),
+                             set(['restore_failed', 'fs_not_exist']))
+            self.assertEqual(restore_errors.classify(out),
+                             ('fs_not_exist', FileSystem.DoesNotExist))
+            self.assertEqual(s.cache.delete_errors.classify("SFS cache ERROR "
+                "cache object c1 does not exist."),
+                ('does_not_exist', Cache.DoesNotExist))
+
+    def test_snapshot_delete_online_precedence(self):
+        mock_args = "10.44.86.226", "support", "support"
+        online = "SFS rollback ERROR V-288-0 Rollback destroy operation " \
+                 "failed as rb1 is in online state, run offline first."
+        fs_not_exist = "SFS fs ERROR V-288-0 File system fs1 does not exist"
+        err = NasExecCommandException("%s\n%s" % (online, fs_not_exist))
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            self.assertEqual(s.snapshot.delete_errors.classify(str(err)),
+                             ('fs_not_exist', FileSystem.DoesNotExist))
+            # the snapshot is offlined and deleted again, the error of the
+            # second attempt is the one raised
+            execute = mock.Mock(side_effect=[err, [], err])
+            with mock.patch.object(s, 'execute', execute):
+                self.assertRaises(FileSystem.DoesNotExist, s.snapshot.delete,
+                                  "rb1", "fs1")
+            self.assertEqual(execute.call_args_list[1][0][0],
+                             "storage rollback offline rb1")
+            execute = mock.Mock(side_effect=[err, [], None])
+            with mock.patch.object(s, 'execute', execute):
+                s.snapshot.delete("rb1", "fs1")
+            self.assertEqual(execute.call_count, 3)
+
+    def test_share_create_many_and_delete_many(self):
+        mock_args = "10.44.86.226", "support", "support"
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            path = s.share.list()[0].name
+            clients = [("1.1.1.2", "rw"), ("1.1.1.3", ["ro", "no_root_squash"])]
+            run = mock.Mock(side_effect=s.ssh.run)
+            with mock.patch.object(s.ssh, 'run', run):
+                shares = s.share.create_many(path, clients)
+            # a single remote execution, replayed command by command by the
+            # mock
+            self.assertEqual(run.call_count, 1 + len(clients))
+            self.assertEqual([(sh.name, sh.client) for sh in shares],
+                             [(path, "1.1.1.2"), (path, "1.1.1.3")])
+            self.assertTrue(s.share.exists(path, "1.1.1.3"))
+
+            results = s.share.create_many("/vx/invalid_fs", clients)
+            self.assertTrue(all(isinstance(r, Share.CreationException)
+                                for r in results))
+
+            results = s.share.delete_many(path, ["1.1.1.2", "9.9.9.9"])
+            self.assertEqual(results[0], None)
+            self.assertTrue(isinstance(results[1], Share.DeletionException))
+            self.assertFalse(s.share.exists(path, "1.1.1.2"))
+            self.assertTrue(s.share.exists(path, "1.1.1.3"))
+
+            # a client whose command exits non-zero with stdout only fails
+            ssh_run = s.ssh.run
+
+            def run(cmd, timeout=None):
+                if "1.1.1.4" in cmd and "NASLIB_BATCH" not in cmd:
+                    return 2, "nfs share failed", ""
+                return ssh_run(cmd, timeout)
+
+            clients = [("1.1.1.4", "rw"), ("1.1.1.5", "rw")]
+            with mock.patch.object(s.ssh, 'run', run):
+                results = s.share.create_many(path, clients)
+                self.assertTrue(isinstance(results[0],
+                                           Share.CreationException))
+                self.assertTrue("nfs share failed" in str(results[0]))
+                self.assertEqual(results[1].client, "1.1.1.5")
+                results = s.share.delete_many(path, ["1.1.1.4", "1.1.1.5"])
+                self.assertTrue(isinstance(results[0],
+                                           Share.DeletionException))
+                self.assertEqual(results[1], None)
+            self.assertFalse(s.share.exists(path, "1.1.1.4"))
+            self.assertFalse(s.share.exists(path, "1.1.1.5"))
+
+    def test_filesystem_create_many_and_delete_many(self):
+        mock_args = "10.44.86.226", "support", "support"
+        with NasConnectionMock(*mock_args, driver_name=self.driver_name,
+                               stash=True) as s:
+            existing = s.filesystem.list()[0]
+            pool = existing.pool.name
+            results = s.filesystem.create_many([
+                ("many_fs1", "10M", pool),
+                (existing.name, "10M", pool),
+                ("many_fs2", "10M", pool)
+            ])
+            self.assertEqual([r.name for r in (results[0], results[2])],
+                             ["many_fs1", "many_fs2"])
+            self.assertTrue(isinstance(results[1], FileSystem.AlreadyExists))
+            results = s.filesystem.delete_many(["many_fs1", "invalid_fs"])
+            self.assertEqual(results[0], None)
+            self.assertTrue(isinstance(results[1],
+                                       FileSystem.DeletionException))
+            self.assertFalse(s.filesystem.exists("many_fs1"))
+            self.assertTrue(s.filesystem.exists("many_fs2"))
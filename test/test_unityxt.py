@@ -10,6 +10,10 @@
 from src.naslib.unityxt.mock_requests import UnityRESTMocker
 from naslib.unityxt.mock_requests import UnityRESTMocker
 from naslib.unityxt.unityrest import UnityREST
+from naslib.unityxt.session import UnitySessionPool
+from naslib.unityxt.executor import RequestExecutor
+from naslib.unityxt.retry import RetryPolicy
+from naslib.unityxt.mock_requests import MockedRequestsResponse
 from naslib.connection import NasConnection
 from naslib.nasexceptions import CreationException, DeletionException, \
     ResizeException, DoesNotExist, NasExecCommandException, NasConnectionException
@@ -71,7 +75,7 @@ class TestUnityXT(unittest.TestCase):
         self.initMock()
         UnityRESTMocker.add_request(
             'GET',
-            '/api/types/filesystem/instances?fields=name,sizeTotal,pool.name,nasServer.name',
+            '/api/types/filesystem/instances?fields=name,sizeTotal,pool.name,nasServer.name&compact=true&per_page=500&page=1',
             None,
             200,
             {
@@ -100,6 +104,96 @@ class TestUnityXT(unittest.TestCase):
             self.assertEqual(filesystems[0].name, "filesystem1")
             self.assertEqual(filesystems[0].layout, "nas_1")
 
+    def test_fs_list_paginated(self):
+        self.initMock()
+        fields = 'fields=name,sizeTotal,pool.name,nasServer.name'
+
+        def content(name):
+            return {
+                'content': {
+                    'name': name,
+                    'sizeTotal': 1048576,
+                    'pool': {'name': 'pool_1'},
+                    'nasServer': {'name': 'nas_1'}
+                }
+            }
+
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/types/filesystem/instances?%s&compact=true&per_page=2&page=1' % fields,
+            None,
+            200,
+            {
+                'entries': [content('fs1'), content('fs2')],
+                'links': [
+                    {'rel': 'self', 'href': '&page=1'},
+                    {'rel': 'next', 'href': '&page=2'}
+                ]
+            }
+        )
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/types/filesystem/instances?%s&compact=true&per_page=2&page=2' % fields,
+            None,
+            200,
+            {
+                'entries': [content('fs3')],
+                'links': [
+                    {'rel': 'self', 'href': '&page=2'},
+                    {'rel': 'prev', 'href': '&page=1'}
+                ]
+            }
+        )
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/types/filesystem/instances?%s&compact=true&per_page=2&page=1' % fields,
+            None,
+            400,
+            {}
+        )
+
+        with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+            driver.rest.page_size = 2
+            filesystems = driver.filesystem.list()
+            self.assertEqual([fs.name for fs in filesystems],
+                             ["fs1", "fs2", "fs3"])
+            self.assertRaises(NasExecCommandException, driver.filesystem.list)
+
+    def test_fs_get_by_name(self):
+        self.initMock()
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/filesystem/name:filesystem1?fields=name,sizeTotal,pool.name,nasServer.name',
+            None,
+            200,
+            {
+                'content': {
+                    'id': 'fs_1',
+                    'name': 'filesystem1',
+                    'sizeTotal': 1048576,
+                    'pool': {
+                        'name': 'pool_1'
+                    },
+                    'nasServer': {
+                        'name' : 'nas_1'
+                    }
+                }
+            }
+        )
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/filesystem/name:filesystem2?fields=name,sizeTotal,pool.name,nasServer.name',
+            None,
+            404,
+            {}
+        )
+
+        with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+            filesystem = driver.filesystem.get("filesystem1")
+            self.assertEqual(filesystem.name, "filesystem1")
+            self.assertEqual(filesystem.pool.name, "pool_1")
+            self.assertFalse(driver.filesystem.exists("filesystem2"))
+
     def test_fs_create(self):
         self.initMock()
         UnityRESTMocker.add_request(
@@ -175,6 +269,104 @@ class TestUnityXT(unittest.TestCase):
             self.assertEqual(filesystem.name, "test_fs")
             self.assertEqual(filesystem.layout, "test_nas")
 
+    def test_fs_create_cached_ids(self):
+        self.initMock()
+        create_data = lambda name: {
+            'fsParameters': {
+                'isDataReductionEnabled': True,
+                'isThinEnabled': True,
+                'supportedProtocols': 0, # NFS
+                'flrVersion': 0, # OFF
+                'pool': {
+                    'id': 'pool_1'
+                },
+                'nasServer': {
+                    'id': 'nas_1'
+                },
+                'size': 1073741824,
+            },
+            'name': name,
+        }
+        for name in ('test_fs1', 'test_fs2'):
+            UnityRESTMocker.add_request(
+                'GET',
+                '/api/instances/filesystem/name:%s?fields=id' % name,
+                None,
+                404,
+                {}
+            )
+            # the pool and the nasServer are only resolved once
+            if name == 'test_fs1':
+                UnityRESTMocker.add_request(
+                    'GET',
+                    '/api/instances/pool/name:test_pool?fields=id',
+                    None,
+                    200,
+                    {'content': {'id': 'pool_1'}}
+                )
+                UnityRESTMocker.add_request(
+                    'GET',
+                    '/api/instances/nasServer/name:test_nas?fields=id',
+                    None,
+                    200,
+                    {'content': {'id': 'nas_1'}}
+                )
+            UnityRESTMocker.add_request(
+                'POST',
+                '/api/types/storageResource/action/createFilesystem',
+                create_data(name),
+                200,
+                {'content': {'storageResource': {'id': 'sv_1'}}}
+            )
+        # the file system isn't cached as not found after its creation
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/filesystem/name:test_fs1?fields=storageResource',
+            None,
+            200,
+            {'content': {'id': 'fs_1', 'storageResource': {'id': 'res_1'}}}
+        )
+
+        with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+            driver.filesystem.create("test_fs1", "1G", "test_pool", "test_nas")
+            driver.filesystem.create("test_fs2", "1G", "test_pool", "test_nas")
+            for _ in range(2):
+                self.assertEqual(driver.rest.get_type_instance_for_name(
+                    'filesystem', 'test_fs1', ['storageResource']
+                )['storageResource']['id'], 'res_1')
+            self.assertEqual(driver.rest.get_id_for_name('filesystem',
+                                                         'test_fs1'), 'fs_1')
+            self.assertEqual(UnityRESTMocker.requests_expected, [])
+
+    def test_cached_share_not_found(self):
+        self.initMock()
+        fs_url = '/api/instances/filesystem/name:test_fs?' \
+                 'fields=nfsShare,storageResource'
+        fs_content = {'content': {'id': 'fs_1',
+                                  'storageResource': {'id': 'res_1'},
+                                  'nfsShare': [{'id': 'share_1'}]}}
+        UnityRESTMocker.add_request('GET', fs_url, None, 200, fs_content)
+        # the share was deleted by someone else
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/nfsShare/share_1?fields=id',
+            None,
+            404,
+            {}
+        )
+        # the file system referring to the share is requested again
+        UnityRESTMocker.add_request('GET', fs_url, None, 200, fs_content)
+        with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+            fields = ['nfsShare', 'storageResource']
+            for _ in range(2):
+                fs = driver.rest.get_type_instance_for_name('filesystem',
+                                                            'test_fs', fields)
+            self.assertEqual(driver.rest.get_type_instance_for_id(
+                'nfsShare', fs['nfsShare'][0]['id'], ['id']), None)
+            driver.rest.get_type_instance_for_name('filesystem', 'test_fs',
+                                                   fields)
+            self.assertEqual(UnityRESTMocker.requests_expected, [])
+
     def test_fs_create_fail(self):
         # Something goes wrong during the final create action
         self.initMock()
@@ -760,7 +952,7 @@ class TestUnityXT(unittest.TestCase):
         self.initMock()
         UnityRESTMocker.add_request(
             'GET',
-            '/api/types/nfsShare/instances?fields=name,defaultAccess,readOnlyHostsString,readWriteHostsString,readOnlyRootHostsString,readWriteRootHostsString',
+            '/api/types/nfsShare/instances?fields=name,defaultAccess,readOnlyHostsString,readWriteHostsString,readOnlyRootHostsString,readWriteRootHostsString&compact=true&per_page=500&page=1',
             None,
             200,
             {
@@ -1384,11 +1576,142 @@ class TestUnityXT(unittest.TestCase):
                  "1.2.3.0/24"
             )
 
+    def test_share_create_many(self):
+        self.initMock()
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/filesystem/name:test_fs?fields=nfsShare,storageResource',
+            None,
+            200,
+            {
+                'content': {
+                    'id': 'fs_1',
+                    'storageResource': {
+                        'id': 'res_1'
+                    },
+                    'nfsShare': [{
+                        'id': 'NFSShare_1'
+                    }]
+                }
+            }
+        )
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/nfsShare/NFSShare_1?fields=defaultAccess,readOnlyHostsString,readWriteHostsString,readOnlyRootHostsString,readWriteRootHostsString',
+            None,
+            200,
+            {
+                'content': {
+                    'id': 'NFSShare_1',
+                    'defaultAccess': 1,
+                    "readOnlyHostsString":"",
+                    "readWriteHostsString":"",
+                    "readOnlyRootHostsString":"",
+                    "readWriteRootHostsString":"1.2.3.0/255.255.255.0",
+                }
+            }
+        )
+        UnityRESTMocker.add_request(
+            'POST',
+            '/api/instances/storageResource/res_1/action/modifyFilesystem',
+            {
+                'nfsShareModify': [
+                    {
+                        'nfsShare': {
+                            'id': 'NFSShare_1'
+                        },
+                        'nfsShareParameters': {
+                            'readWriteRootHostsString': '1.2.3.0/255.255.255.0,1.2.4.0/24,1.2.5.0/24',
+                            'readOnlyHostsString': ',1.2.6.0/24'
+                        }
+                    }
+                ]
+            },
+            200,
+            {
+                'content': {
+                    'storageResource': {
+                        'id': 'sv_1'
+                    }
+                }
+            }
+        )
+
+        with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+            results = driver.share.create_many("/vx/test_fs", [
+                ("1.2.4.0/24", "rw,no_root_squash"),
+                ("1.2.3.0/255.255.255.0", "rw,no_root_squash"),
+                ("1.2.5.0/24", "rw,no_root_squash"),
+                ("*", "ro"),
+                ("1.2.6.0/24", "ro")
+            ])
+            self.assertEqual(
+                [r.client for r in results if not isinstance(r, Exception)],
+                ["1.2.4.0/24", "1.2.5.0/24", "1.2.6.0/24"]
+            )
+            self.assertTrue(isinstance(results[1], Share.AlreadyExists))
+            self.assertTrue(isinstance(results[3], Share.AlreadyExists))
+
+    def test_share_delete_many(self):
+        self.initMock()
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/nfsShare/name:vx/test_fs?fields=filesystem.storageResource,defaultAccess,readOnlyHostsString,readWriteHostsString,readOnlyRootHostsString,readWriteRootHostsString',
+            None,
+            200,
+            {
+                'content': {
+                    'id': 'NFSShare_1',
+                    'defaultAccess': 0,
+                    "readOnlyHostsString":"",
+                    "readWriteHostsString":"",
+                    "readOnlyRootHostsString":"",
+                    "readWriteRootHostsString":"1.2.3.0/255.255.255.0,1.2.4.0/255.255.255.0",
+                    "filesystem": {
+                        "id":"fs_1",
+                        "storageResource": {
+                            "id":"res_1"
+                        }
+                    }
+                }
+            }
+        )
+        UnityRESTMocker.add_request(
+            'POST',
+            '/api/instances/storageResource/res_1/action/modifyFilesystem',
+            {
+                'nfsShareDelete': [
+                    {
+                        'nfsShare': {
+                            'id': 'NFSShare_1'
+                        }
+                    }
+                ]
+            },
+            200,
+            {
+                'content': {
+                    'storageResource': {
+                        'id': 'sv_1'
+                    }
+                }
+            }
+        )
+
+        with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+            results = driver.share.delete_many(
+                "/vx/test_fs",
+                ["1.2.4.0/24", "1.2.5.0/24", "1.2.3.0/24"]
+            )
+            self.assertEqual(results[0], None)
+            self.assertTrue(isinstance(results[1], DeletionException))
+            self.assertEqual(results[2], None)
+
     def test_snapshot_list(self):
         self.initMock()
         UnityRESTMocker.add_request(
             'GET',
-            '/api/types/snap/instances?filter=storageResource.type==1&fields=name,storageResource.name,creationTime',
+            '/api/types/snap/instances?filter=storageResource.type==1&fields=name,storageResource.name,creationTime&compact=true&per_page=500&page=1',
             None,
             200,
             {
@@ -1674,6 +1997,102 @@ class TestUnityXT(unittest.TestCase):
         with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
             driver.snapshot.delete("test_fs_snap1", "test_fs")
 
+    def test_snapshot_delete_many(self):
+        self.initMock()
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/instances/filesystem/name:test_fs?fields=storageResource',
+            None,
+            200,
+            {
+                'content': {
+                    'id': 'fs_1',
+                    'storageResource': {
+                        'id': 'res_1'
+                    }
+                }
+            }
+        )
+        for snap_id in ('1', '2'):
+            UnityRESTMocker.add_request(
+                'GET',
+                '/api/instances/snap/name:test_fs_snap%s?fields=id' % snap_id,
+                None,
+                200,
+                {
+                    'content': {
+                        'id': snap_id,
+                    }
+                }
+            )
+            UnityRESTMocker.add_request(
+                'DELETE',
+                '/api/instances/snap/%s' % snap_id,
+                None,
+                204 if snap_id == '1' else 409,
+                None if snap_id == '1' else {
+                    'error': {
+                        'messages': [{'en-US': 'The snapshot is busy'}]
+                    }
+                }
+            )
+        with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+            # a single worker keeps the order of the mocked requests
+            driver.rest.max_workers = 1
+            results = driver.snapshot.delete_many([
+                ("test_fs_snap1", "test_fs"),
+                ("test_fs_snap2", "test_fs")
+            ])
+            self.assertEqual(results[0], None)
+            self.assertTrue(isinstance(results[1], NasExecCommandException))
+            self.assertTrue('The snapshot is busy' in str(results[1]))
+
+    def test_request_executor(self):
+        import threading
+        import time
+        executor = RequestExecutor('somehost', max_workers=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def request(value):
+            with lock:
+                running.append(value)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(value)
+            if value == 3:
+                raise NasExecCommandException("failed")
+            return value * 2
+
+        # another executor of the same array shares the limit
+        other = RequestExecutor('somehost', max_workers=2)
+        future = other.submit(request, 10)
+        results = executor.map(request, [(1,), (2,), (3,), (4,)])
+        self.assertEqual(future.result(), 20)
+        self.assertEqual(results[:2] + results[3:], [2, 4, 8])
+        self.assertTrue(isinstance(results[2], NasExecCommandException))
+        self.assertTrue(max(peak) <= 2)
+        executor.shutdown()
+        other.shutdown()
+
+        # the limit doesn't depend on which executor of the array came first
+        small = RequestExecutor('otherhost', max_workers=1)
+        small.submit(lambda: None).result()
+        big = RequestExecutor('otherhost', max_workers=3)
+        del peak[:]
+        big.map(request, [(1,), (2,), (4,), (5,), (6,), (7,)])
+        self.assertEqual(max(peak), 3)
+        small.shutdown()
+
+        # a nested map from a worker runs inline instead of waiting for a
+        # thread of the same pool
+        nested = big.map(lambda x: big.map(request, [(x,), (x + 1,)]),
+                         [(1,), (4,), (6,), (8,)])
+        self.assertEqual(nested, [[2, 4], [8, 10], [12, 14], [16, 18]])
+        big.shutdown()
+
     def test_cache_list(self):
         self.initMock()
         with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
@@ -1778,6 +2197,7 @@ class TestUnityXT(unittest.TestCase):
         UnityRESTMocker.setup("hostname")
 
     def initMock(self):
+        UnitySessionPool.instance().clear()
         UnityRESTMocker.reset()
         UnityRESTMocker.add_request(
             'GET',
@@ -4565,7 +4985,7 @@ class TestUnityXT(unittest.TestCase):
         self.initMock()
         UnityRESTMocker.add_request(
             'GET',
-            '/api/types/nasServer/instances?fields=name,pool.name,homeSP.id',
+            '/api/types/nasServer/instances?fields=name,pool.name,homeSP.id&compact=true&per_page=500&page=1',
             None,
             200,
             {
@@ -4762,6 +5182,79 @@ class TestUnityXT(unittest.TestCase):
         with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
             driver.nasserver.change_sharing_protocol("nfsv3,nfsv4")
 
+    def test_session_pool(self):
+        self.initMock()
+        url = '/api/types/nasServer/instances?fields=name,pool.name,homeSP.id&compact=true&per_page=500&page=1'
+        UnityRESTMocker.add_request('GET', url, None, 200, {'entries': []})
+        # the second context re-uses the session, which has expired
+        UnityRESTMocker.add_request('GET', url, None, 401, {})
+        UnityRESTMocker.add_request(
+            'GET',
+            '/api/types/loginSessionInfo/instances',
+            None,
+            200,
+            None
+        )
+        UnityRESTMocker.add_request('GET', url, None, 200, {'entries': []})
+        logouts = lambda: len([c for c in UnityREST.mock.call_args_list
+                               if c[0][1] == UnityRESTMocker.logout_url])
+        pool = UnitySessionPool.instance()
+
+        for _ in range(2):
+            with NasConnection("hostname", "user", "password", nas_type="unityxt") as driver:
+                self.assertEqual(len(driver.nasserver.list()), 0)
+            self.assertEqual(len(pool), 1)
+        self.assertEqual(UnityRESTMocker.requests_expected, [])
+        self.assertEqual(logouts(), 0)
+        pool.clear()
+        self.assertEqual(logouts(), 1)
+
+        self.initMock()
+        with NasConnection("hostname", "user", "password", nas_type="unityxt",
+                           use_pool=False):
+            pass
+        self.assertEqual(len(pool), 0)
+        self.assertEqual(logouts(), 2)
+
+    def test_session_relogin_serialized(self):
+        import threading
+        import mock
+        tokens = iter(['token1', 'token2', 'token3'])
+        logins = []
+        expired = []
+        arrived = threading.Condition()
+
+        def request(method, url, json=None, verify=False):
+            if 'loginSessionInfo' in url:
+                token = next(tokens)
+                logins.append(token)
+                return mock.Mock(status_code=200, content='',
+                                 headers={'EMC-CSRF-TOKEN': token})
+            if rest.unity.headers.get('EMC-CSRF-TOKEN') == 'token1':
+                # both threads get the 401 before any of them logs in again
+                with arrived:
+                    expired.append(url)
+                    arrived.notify_all()
+                    while len(expired) < 2:
+                        arrived.wait(5)
+                return mock.Mock(status_code=401, content='', headers={})
+            return mock.Mock(status_code=200, content='', headers={})
+
+        UnityREST.set_mock(None)
+        rest = UnityREST(logging.getLogger('test.logger'))
+        rest.unity.request = request
+        rest.login('hostname', 'user', 'password')
+        statuses = []
+        threads = [threading.Thread(target=lambda: statuses.append(
+                       rest.request('/api/types/pool/instances').status_code))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(logins, ['token1', 'token2'])
+
     @patch('logging.Logger.log')
     @patch('naslib.unityxt.unityrest.requests.Session.request')
     def test_three_request_exceptions(self, mock_request, mock_logger):
@@ -4777,10 +5270,11 @@ class TestUnityXT(unittest.TestCase):
             self.assertRaises(NasConnectionException, unityrest.request, '/test/endpoint')
             mock_logger.assert_called_with(logging.INFO, 'request: attempts remaining=0')
 
+    @patch('naslib.unityxt.retry.random.uniform', return_value=0)
     @patch('logging.Logger.log')
     @patch('naslib.unityxt.unityrest.requests.Session.request')
     @patch('naslib.unityxt.unityrest.requests.Response')
-    def test_two_request_exceptions(self, mock_response, mock_request, mock_logger):
+    def test_two_request_exceptions(self, mock_response, mock_request, mock_logger, uniform):
         mock_request.side_effect = [
             requests.exceptions.ConnectionError('Error Message'),
             requests.exceptions.ConnectionError('Error Message'),
@@ -4794,4 +5288,38 @@ class TestUnityXT(unittest.TestCase):
             unityrest.request('/test/endpoint')
             mock_logger.assert_any_call(logging.INFO, 'request: attempts remaining=1')
             mock_logger.assert_any_call(logging.INFO, 'request: exception=Error Message endpoint=/test/endpoint')
-            mock_logger.assert_any_call(logging.INFO, 'request: delay for 3 seconds')
\ No newline at end of file
+            mock_logger.assert_any_call(logging.INFO, 'request: delay for 3 seconds')
+
+    @patch('naslib.unityxt.unityrest.sleep')
+    @patch('naslib.unityxt.unityrest.requests.Session.request')
+    def test_request_retry_policy(self, mock_request, mock_sleep):
+        unavailable = MockedRequestsResponse({}, 503)
+        unavailable.headers['Retry-After'] = '2'
+        mock_request.side_effect = [
+            unavailable,
+            MockedRequestsResponse({}, 200),
+            unavailable,
+            requests.exceptions.ConnectionError('Connection reset')
+        ]
+        logger = logging.getLogger('test.logger')
+        UnityREST.set_mock(None)
+        unityrest = UnityREST(logger)
+        unityrest.retry_policy = RetryPolicy(base_delay=1, jitter=0)
+        with patch.object(unityrest, '_UnityREST__ip_address', '1.1.1.1'):
+            # the Retry-After is longer than the backoff
+            response = unityrest.request('/test/endpoint')
+            self.assertEqual(response.status_code, 200)
+            mock_sleep.assert_called_once_with(2)
+            self.assertEqual([m['status'] for m in unityrest.request_metrics],
+                             [503, 200])
+
+            # neither the status nor the connection error are retried for
+            # a request that isn't idempotent and that could have been sent
+            response = unityrest.request('/test/endpoint', 'POST', {})
+            self.assertEqual(response.status_code, 503)
+            self.assertRaises(NasConnectionException, unityrest.request,
+                              '/test/endpoint', 'POST', {})
+            self.assertEqual(mock_request.call_count, 4)
+            self.assertEqual(mock_sleep.call_count, 1)
+            self.assertEqual(unityrest.request_metrics[-1]['error'],
+                             'ConnectionError')